@@ -0,0 +1,49 @@
+"""Time ``import pysynphot`` and the first use of the data that is
+loaded lazily (Vega, reddening laws, deprecated extinction curves and
+renormalization standard spectra).
+
+Each measurement runs in a fresh interpreter, so that module caching
+does not hide the cost. Usage::
+
+    python import_timing.py [ntrials]
+
+"""
+from __future__ import print_function
+
+import subprocess
+import sys
+
+SETUP = "import time; t0 = time.time(); import pysynphot as S; t1 = time.time()"
+
+CASES = [
+    ('import pysynphot', ''),
+    ('Vega', 'S.Vega.wave'),
+    ('RedLaws', "S.Cache.RedLaws['mwavg']"),
+    ('gal1 extinction', "S.Extinction(0.1, 'gal1')"),
+    ('StdSpectrum', 'S.units.ABMag.StdSpectrum'),
+]
+
+SCRIPT = SETUP + """
+{stmt}
+t2 = time.time()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def run(stmt):
+    out = subprocess.check_output(
+        [sys.executable, '-W', 'ignore', '-c', SCRIPT.format(stmt=stmt)])
+    return [float(x) for x in out.split()]
+
+
+def main(ntrials=5):
+    print('%-20s %12s %12s' % ('case', 'import (s)', 'first use (s)'))
+    for name, stmt in CASES:
+        results = [run(stmt) for i in range(ntrials)]
+        imp = min(r[0] for r in results)
+        use = min(r[1] for r in results)
+        print('%-20s %12.4f %12.4f' % (name, imp, use))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,73 @@
+"""Compare the time to scan and parse the spectrum expressions of the
+commissioning cases (``*_cases.txt``) with the SPARK Earley parser and
+with the recursive-descent parser used by ``parse_spec``, and check
+that both build the same trees. Usage::
+
+    python parser_benchmark.py [ntrials]
+
+"""
+from __future__ import print_function
+
+import glob
+import os
+import re
+import sys
+import time
+
+from pysynphot import Cache, spparser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def expressions():
+    exprs = set()
+    for fname in glob.glob(os.path.join(HERE, '*_cases.txt')):
+        with open(fname) as f:
+            exprs.update(re.findall(r'spectrum="([^"]*)"', f.read()))
+    return sorted(exprs)
+
+
+def dump(tree):
+    return (tree.type, getattr(tree, 'attr', None),
+            tuple(dump(kid) for kid in tree))
+
+
+def timeit(func, exprs, ntrials):
+    best = None
+    for i in range(ntrials):
+        t0 = time.time()
+        for e in exprs:
+            func(e)
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return best
+
+
+def main(ntrials=3):
+    exprs = expressions()
+    for e in exprs:
+        tokens = spparser.scan(e)
+        assert dump(spparser.parse_spark(tokens)) == dump(
+            spparser.parse(tokens)), e
+
+    # Longest expressions, e.g. sums of emission lines.
+    longest = sorted(exprs, key=len)[-10:]
+
+    def cached(e):
+        spparser.parse_text(e)
+
+    Cache.reset_ast_cache()
+    cases = [('SPARK', lambda e: spparser.parse_spark(spparser.scan(e))),
+             ('descent', lambda e: spparser.parse(spparser.scan(e))),
+             ('descent, cached', cached)]
+
+    print('%d expressions, %d characters on average' %
+          (len(exprs), sum(len(e) for e in exprs) // len(exprs)))
+    print('%-16s %12s %14s' % ('parser', 'all (s)', 'longest 10 (s)'))
+    for name, func in cases:
+        print('%-16s %12.4f %14.4f' % (name, timeit(func, exprs, ntrials),
+                                       timeit(func, longest, ntrials)))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
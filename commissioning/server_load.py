@@ -0,0 +1,58 @@
+"""Load test for ``pysynphot.server``: send many concurrent ETC-style
+requests to a running server and report throughput and latency.
+
+Start the server first, e.g.::
+
+    python -m pysynphot.server --workers 4 --warm acs,wfc1,f555w
+
+then::
+
+    python server_load.py [nrequests] [nclients] [port]
+
+"""
+from __future__ import print_function
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pysynphot.server import request
+
+REQUESTS = [
+    'calcphot&spectrum="rn(bb(5000),band(johnson,v),15,vegamag)"'
+    '&obsmode="acs,wfc1,f555w"&area="45238.93416"',
+    'countrate&spectrum="rn(unit(1.0,flam),band(johnson,v),20,vegamag)"'
+    '&instrument="acs,wfc1,f814w"&area="45238.93416"',
+    'calcspec&spectrum="rn(pl(4000.0,-1.0,flam),box(1500,1.0),'
+    '1.00E-14,flam)"&output="%s"' % os.path.join(tempfile.gettempdir(),
+                                                 'server_load.fits'),
+]
+
+
+def timed(port, line):
+    t0 = time.time()
+    reply = request('127.0.0.1', port, line, timeout=120)
+    return time.time() - t0, reply.startswith('Error:')
+
+
+def main(nrequests=200, nclients=16, port=7999):
+    lines = [REQUESTS[i % len(REQUESTS)] for i in range(nrequests)]
+    t0 = time.time()
+    with ThreadPoolExecutor(nclients) as pool:
+        results = list(pool.map(lambda l: timed(port, l), lines))
+    total = time.time() - t0
+
+    latency = sorted(r[0] for r in results)
+    nerr = sum(r[1] for r in results)
+    print('%d requests, %d clients, %d errors' % (nrequests, nclients, nerr))
+    print('throughput %10.2f req/s' % (nrequests / total))
+    for q in (0.5, 0.9, 0.99):
+        print('p%-2d latency %9.4f s' %
+              (100 * q, latency[min(int(q * nrequests), nrequests - 1)]))
+    print('max latency %9.4f s' % latency[-1])
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
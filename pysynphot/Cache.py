@@ -2,20 +2,45 @@
 read in only once, and then re-used from memory.
 
 This includes the :ref:`reddening laws <pysynphot-extinction>`
-(``pysynphot.locations.RedLaws``)
-and some indices for the `~pysynphot.catalog` model atlases
-(``pysynphot.Cache.CATALOG_CACHE``).
+(``pysynphot.locations.RedLaws``),
+some indices for the `~pysynphot.catalog` model atlases
+(``pysynphot.Cache.CATALOG_CACHE``), the preloaded catalogs themselves
+(``pysynphot.Cache.ATLAS_CACHE``), observation mode components
+(``pysynphot.Cache.COMPONENT_CACHE``), resolved observation modes
+(``pysynphot.Cache.OBSMODE_CACHE``), partial throughput products
+(``pysynphot.Cache.PREFIX_PRODUCT_CACHE``), rebinning plans
+(``pysynphot.Cache.REBIN_PLAN_CACHE``), parsed expressions
+(``pysynphot.Cache.AST_CACHE``), Vega fluxes and band integrals
+(``pysynphot.Cache.VEGA_CACHE``), renormalization integrals
+(``pysynphot.Cache.RENORM_CACHE``), and parsed spectra
+(``pysynphot.Cache.SPECTRUM_CACHE``). `ResultCache` caches the results
+of longer calculations, optionally in a persistent store.
+
+It also manages the optional on-disk cache of tables read from
+spectrum and throughput files, which persists between processes.
+It is off by default, and is enabled by setting the ``PYSYN_CACHE``
+environment variable to a directory, or with :func:`set_disk_cache`.
 
 """
 from __future__ import division
 
-from .locations import RedLaws
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
 
-# if PYSYN_CDBS is undefined RedLaws will be an empty dictionary
-# so we should check whether these assignments are possible
-if 'mwavg' in RedLaws:
-    RedLaws[None]=RedLaws['mwavg'] #Establishes default
-    RedLaws['gal3']=RedLaws['mwavg'] #Temporary: for syn_pysyn testing
+# RedLaws is filled in on first use, including the default (None)
+# and 'gal3' aliases of 'mwavg'
+from .locations import RedLaws
 
 CATALOG_CACHE = {}
 
@@ -27,3 +52,734 @@ def reset_catalog_cache():
     global CATALOG_CACHE
 
     CATALOG_CACHE.clear()
+
+
+#: `~pysynphot.catalog.Atlas` objects keyed on catalog name.
+ATLAS_CACHE = {}
+
+
+def reset_atlas_cache():
+    """
+    Empty the ``ATLAS_CACHE`` global variable.
+    """
+    ATLAS_CACHE.clear()
+
+
+def reset_component_cache():
+    """
+    Empty the ``COMPONENT_CACHE`` global variable.
+    """
+    COMPONENT_CACHE.clear()
+
+
+class LRUCache(object):
+    """Dictionary-like container that discards the least recently used
+    items when it holds more than ``maxsize`` items or, if given,
+    more than ``maxbytes`` bytes.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of items.
+
+    maxbytes : int or `None`
+        Maximum total size of the items in bytes, as given by ``sizeof``.
+        If `None`, there is no size limit.
+
+    sizeof : callable or `None`
+        Function returning the size of an item in bytes.
+        Default is :func:`array_nbytes`.
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+        Number of successful and failed look-ups, and of items discarded
+        to stay within the limits, since creation or :meth:`clear`.
+
+    nbytes : int
+        Total size of the items in bytes. This is only tracked if
+        ``maxbytes`` is given.
+
+    Notes
+    -----
+    The cache can be shared between threads. Each operation holds a
+    lock, but a look-up that follows a ``key in cache`` test may still
+    miss if the item is discarded in between; use :meth:`get` instead.
+
+    """
+    def __init__(self, maxsize=128, maxbytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = array_nbytes if sizeof is None else sizeof
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        # Sized outside of the lock, as it may look at large objects.
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+
+        with self._lock:
+            self._discard(key)
+            self._data[key] = value
+            if self.maxbytes is not None:
+                self._sizes[key] = size
+                self.nbytes += size
+
+            # The newest item is always kept, even if it is over budget
+            # on its own.
+            while len(self._data) > 1 and (
+                    len(self._data) > self.maxsize or
+                    (self.maxbytes is not None and
+                     self.nbytes > self.maxbytes)):
+                self._discard(next(iter(self._data)))
+                self.evictions += 1
+
+    def _discard(self, key):
+        # Called with the lock held.
+        if key in self._data:
+            del self._data[key]
+            self.nbytes -= self._sizes.pop(key, 0)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                return self[key]
+            except KeyError:
+                return default
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self):
+        """Remove all items and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return the counters, number of items and size as a dictionary."""
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses,
+                        evictions=self.evictions, items=len(self._data),
+                        nbytes=self.nbytes)
+
+
+def array_nbytes(obj, _depth=2):
+    """Estimate the memory used by an object from the NumPy arrays
+    it refers to, directly or through its attributes.
+
+    Parameters
+    ----------
+    obj : object
+        Array, or object whose attributes are inspected up to two
+        levels deep.
+
+    Returns
+    -------
+    nbytes : int
+        Total size of the arrays found.
+
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if _depth == 0 or not hasattr(obj, '__dict__'):
+        return 0
+    return sum(array_nbytes(v, _depth - 1) for v in vars(obj).values())
+
+
+def fingerprint(*arrays):
+    """Return a hash string identifying the contents of the given arrays,
+    suitable as a cache key.
+
+    Parameters
+    ----------
+    arrays : array_like
+        Arrays to hash. Their dtype and shape are part of the hash.
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-1 digest.
+
+    """
+    h = hashlib.sha1()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(str(a.dtype).encode())
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+#: Throughput components of observation modes, keyed on throughput file
+#: name and parameter value, for `~pysynphot.observationmode.ObservationMode`.
+COMPONENT_CACHE = LRUCache(maxsize=1024, maxbytes=256 * 1024**2)
+
+#: Tabulated products of the first components of observation modes,
+#: keyed on their throughput file names and parameter values, for
+#: `~pysynphot.obsbandpass.ObsModeBandpass`.
+PREFIX_PRODUCT_CACHE = LRUCache(maxsize=1024, maxbytes=256 * 1024**2)
+
+
+def reset_prefix_product_cache():
+    """
+    Empty the ``PREFIX_PRODUCT_CACHE`` global variable.
+    """
+    PREFIX_PRODUCT_CACHE.clear()
+
+
+#: Graph table look-ups of observation modes, keyed on graph table name
+#: and normalized keywords, for
+#: `~pysynphot.observationmode.BaseObservationMode`.
+OBSMODE_CACHE = LRUCache(maxsize=1024)
+
+
+def reset_obsmode_cache():
+    """
+    Empty the ``OBSMODE_CACHE`` global variable.
+    """
+    OBSMODE_CACHE.clear()
+
+
+#: `~pysynphot.binning.RebinPlan` objects keyed on waveset and binset.
+REBIN_PLAN_CACHE = LRUCache(maxsize=64)
+
+
+def reset_rebin_plan_cache():
+    """
+    Empty the ``REBIN_PLAN_CACHE`` global variable.
+    """
+    REBIN_PLAN_CACHE.clear()
+
+
+#: Parsed `~pysynphot.spparser.AST` of synphot expressions, keyed on text.
+AST_CACHE = LRUCache(maxsize=1024)
+
+
+def reset_ast_cache():
+    """
+    Empty the ``AST_CACHE`` global variable.
+    """
+    AST_CACHE.clear()
+
+
+def band_fingerprint(band):
+    """Return a string identifying a bandpass from its class, wavelength
+    set and throughput, suitable as a cache key. Bandpasses that agree
+    on all three are assumed to be the same.
+
+    Parameters
+    ----------
+    band : `~pysynphot.spectrum.SpectralElement`
+        Bandpass to identify.
+
+    Returns
+    -------
+    key : str
+        Class name and :func:`fingerprint` of the tabulated throughput.
+
+    """
+    wave = band.GetWaveSet()
+    if wave is None:
+        # UniformTransmission
+        wave = np.zeros(0)
+        thru = band(None)
+    else:
+        thru = band(wave)
+    return '%s:%s' % (band.__class__.__name__, fingerprint(wave, thru))
+
+
+class VegaCache(object):
+    """Flux of the Vega spectrum at given wavelengths and its integrals
+    through bandpasses, for ``vegamag`` conversions and renormalization.
+
+    Entries are keyed on the Vega spectrum object and on the
+    :func:`fingerprint` of the wavelengths or the :func:`band_fingerprint`
+    of the bandpass, so that a replaced ``pysynphot.spectrum.Vega`` and
+    the original can be used side by side.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of tabulated fluxes and of band integrals.
+
+    maxbytes : int
+        Maximum total size of the tabulated fluxes in bytes.
+
+    """
+    def __init__(self, maxsize=256, maxbytes=64 * 1024**2):
+        self.fluxes = LRUCache(maxsize=maxsize, maxbytes=maxbytes)
+        self.integrals = LRUCache(maxsize=maxsize)
+        self._tokens = weakref.WeakKeyDictionary()
+        self._counter = count()
+        self._lock = threading.Lock()
+
+    def _token(self, vega):
+        # Identifies the Vega object in keys. Unlike id(), a token is
+        # not reused by another object once this one is gone, and the
+        # entries of objects that are gone age out of the caches.
+        with self._lock:
+            token = self._tokens.get(vega)
+            if token is None:
+                token = self._tokens[vega] = next(self._counter)
+            return token
+
+    def flux(self, vega, wave, fluxunits='photlam'):
+        """Return the flux of Vega resampled at given wavelengths,
+        as by ``vega.resample(wave)``.
+
+        Parameters
+        ----------
+        vega : `~pysynphot.spectrum.SourceSpectrum`
+            Vega spectrum.
+
+        wave : array_like
+            Wavelengths in Angstrom.
+
+        fluxunits : str
+            Name of the flux unit of the result.
+
+        Returns
+        -------
+        flux : array_like
+            Read-only flux array.
+
+        """
+        wave = np.asarray(wave)
+        key = (self._token(vega), fingerprint(wave), fluxunits)
+        flux = self.fluxes.get(key)
+        if flux is None:
+            resampled = vega.resample(wave)
+            if fluxunits == 'photlam':
+                flux = resampled._fluxtable
+            else:
+                resampled.convert(fluxunits)
+                flux = resampled.flux
+            flux.setflags(write=False)
+            self.fluxes[key] = flux
+        return flux
+
+    def integral(self, vega, band, key=None):
+        """Return the integrated ``photlam`` flux of Vega through a
+        bandpass, as by ``(vega * band).integrate()``.
+
+        Parameters
+        ----------
+        vega : `~pysynphot.spectrum.SourceSpectrum`
+            Vega spectrum.
+
+        band : `~pysynphot.spectrum.SpectralElement`
+            Bandpass.
+
+        key : str or `None`
+            :func:`band_fingerprint` of the bandpass, if already known.
+
+        Returns
+        -------
+        total : float
+            Integrated flux.
+
+        """
+        if key is None:
+            key = band_fingerprint(band)
+        key = (self._token(vega), key)
+        total = self.integrals.get(key)
+        if total is None:
+            total = (vega * band).integrate()
+            self.integrals[key] = total
+        return total
+
+    def clear(self):
+        """Remove all items."""
+        self.fluxes.clear()
+        self.integrals.clear()
+
+
+#: Vega fluxes and band integrals for ``vegamag``, see `VegaCache`.
+VEGA_CACHE = VegaCache()
+
+
+def reset_vega_cache():
+    """
+    Empty the ``VEGA_CACHE`` global variable.
+    """
+    VEGA_CACHE.clear()
+
+
+#: Integrals of the standard spectra of flux units through bandpasses,
+#: and overlap checks of bandpasses, for `~pysynphot.renorm.StdRenorm`.
+RENORM_CACHE = LRUCache(maxsize=1024)
+
+
+def reset_renorm_cache():
+    """
+    Empty the ``RENORM_CACHE`` global variable.
+    """
+    RENORM_CACHE.clear()
+
+
+class _Pending(object):
+    """Computation in progress, which other callers wait for."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.elapsed = 0.0
+
+
+class ResultCache(object):
+    """Cache of computed results keyed on strings, with an in-memory
+    LRU level and an optional persistent SQLite store.
+
+    Concurrent calls to :meth:`call` with the same key are coalesced:
+    the first one computes the result and the others wait for it.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of results kept in memory.
+
+    path : str or `None`
+        SQLite database file of the persistent store, created if it
+        does not exist. If `None`, results are only kept in memory.
+        Stored results must be picklable.
+
+    Attributes
+    ----------
+    hits, disk_hits, misses : int
+        Number of look-ups answered from memory, from the persistent
+        store, and not at all.
+
+    coalesced : int
+        Number of calls that waited for the same computation in
+        another thread instead of computing it again.
+
+    saved : float
+        Total computation time, in seconds, of the results returned
+        without computing them.
+
+    """
+    def __init__(self, maxsize=1024, path=None):
+        self.path = path
+        self._memory = LRUCache(maxsize=maxsize)
+        self._db = None
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved = 0.0
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _connect(self):
+        # Opened on first use, so that a cache created before the
+        # process forks is not shared by its children.
+        if self._db is None and self.path is not None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, value BLOB, '
+                             'elapsed REAL)')
+            self._db.commit()
+        return self._db
+
+    def _lookup(self, key):
+        """Return ``(value, elapsed)`` or `None`, updating the counters."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self.hits += 1
+        else:
+            db = self._connect()
+            row = None if db is None else db.execute(
+                'SELECT value, elapsed FROM results WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            entry = (pickle.loads(bytes(row[0])), row[1])
+            self._memory[key] = entry
+            self.disk_hits += 1
+        self.saved += entry[1]
+        return entry
+
+    def get(self, key, default=None):
+        """Return the result stored for ``key``, or ``default``."""
+        with self._lock:
+            entry = self._lookup(key)
+        return default if entry is None else entry[0]
+
+    def put(self, key, value, elapsed=0.0):
+        """Store a result.
+
+        Parameters
+        ----------
+        key : str
+            Key of the result.
+
+        value : object
+            Result.
+
+        elapsed : float
+            Time it took to compute, in seconds, which is counted in
+            ``saved`` each time it is reused.
+
+        """
+        with self._lock:
+            self._memory[key] = (value, elapsed)
+            db = self._connect()
+            if db is not None:
+                blob = pickle.dumps(value, protocol=2)
+                db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                           (key, sqlite3.Binary(blob), elapsed))
+                db.commit()
+
+    def call(self, key, func, *args, **kwargs):
+        """Return the result stored for ``key``, or compute it as
+        ``func(*args, **kwargs)`` and store it.
+
+        If another thread is computing the same key, wait for its
+        result, or its exception, instead.
+
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[0]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            with self._lock:
+                self.saved += pending.elapsed
+            return pending.value
+
+        try:
+            start = time.time()
+            pending.value = func(*args, **kwargs)
+            pending.elapsed = time.time() - start
+            self.put(key, pending.value, pending.elapsed)
+            return pending.value
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.event.set()
+
+    def clear(self):
+        """Remove all results, including the persistent ones, and reset
+        the counters."""
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute('DELETE FROM results')
+                db.commit()
+            self._reset_counters()
+
+    def close(self):
+        """Close the persistent store. It is reopened if needed."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        """Return the counters, the number of ``evictions`` from memory,
+        and the number of ``items`` in memory, as a dictionary."""
+        with self._lock:
+            return dict(hits=self.hits, disk_hits=self.disk_hits,
+                        misses=self.misses, coalesced=self.coalesced,
+                        saved=self.saved, evictions=self._memory.evictions,
+                        items=len(self._memory))
+
+
+#: Spectra parsed by `~pysynphot.spparser.parse_spec_cached`, keyed on
+#: canonical expression and reference data.
+SPECTRUM_CACHE = ResultCache(maxsize=256)
+
+
+def reset_spectrum_cache():
+    """
+    Empty the ``SPECTRUM_CACHE`` global variable.
+    """
+    SPECTRUM_CACHE.clear()
+
+
+#: Directory of the on-disk table cache, or `None` if disabled.
+DISK_CACHE_DIR = os.environ.get('PYSYN_CACHE') or None
+
+# os.replace is atomic on all platforms but does not exist in Python 2,
+# where os.rename is atomic on POSIX.
+_replace = getattr(os, 'replace', os.rename)
+
+
+def set_disk_cache(path=None):
+    """
+    Enable the on-disk table cache in the given directory,
+    or disable it if `None`.
+
+    Parameters
+    ----------
+    path : str or `None`
+        Cache directory. It is created if it does not exist.
+
+    """
+    global DISK_CACHE_DIR
+
+    if path is not None:
+        path = os.path.abspath(os.path.expanduser(path))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    DISK_CACHE_DIR = path
+
+
+def _disk_cache_key(filename, variant):
+    """Key a file by its absolute path, modification time and size,
+    so that an entry is not used after the file changes.
+
+    """
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    ident = '\n'.join([path, repr(st.st_mtime), str(st.st_size), variant])
+    return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+
+def disk_cache_load(filename, variant):
+    """
+    Load the tables cached for a file.
+
+    Parameters
+    ----------
+    filename : str
+        File the tables were read from.
+
+    variant : str
+        Distinguishes different tables read from the same file,
+        e.g., by reader class and column name.
+
+    Returns
+    -------
+    entry : tuple or `None`
+        Dictionary of memory-mapped arrays and dictionary of metadata,
+        or `None` if the cache is disabled or has no entry. The arrays
+        are copy-on-write: they can be modified like arrays read from
+        the file, without changing the cache.
+
+    """
+    if DISK_CACHE_DIR is None:
+        return None
+
+    try:
+        base = os.path.join(DISK_CACHE_DIR, _disk_cache_key(filename, variant))
+        with open(base + '.json') as f:
+            meta = json.load(f)
+        arrays = dict((name, np.load('%s.%s.npy' % (base, name),
+                                     mmap_mode='c'))
+                      for name in meta.pop('arrays'))
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+    return arrays, meta
+
+
+def disk_cache_save(filename, variant, arrays, meta):
+    """
+    Store tables read from a file in the on-disk cache,
+    if it is enabled.
+
+    Files are written under temporary names and renamed into place,
+    with the metadata last, so concurrent readers never see a partial
+    entry. Errors are ignored, since the cache is only an optimization.
+
+    Parameters
+    ----------
+    filename, variant : str
+        See :func:`disk_cache_load`.
+
+    arrays : dict
+        Maps names to arrays to store.
+
+    meta : dict
+        Metadata to store. Values that JSON cannot represent are
+        stored as strings.
+
+    """
+    if DISK_CACHE_DIR is None:
+        return
+
+    try:
+        base = os.path.join(DISK_CACHE_DIR, _disk_cache_key(filename, variant))
+
+        for name, a in arrays.items():
+            _atomic_write('%s.%s.npy' % (base, name),
+                          lambda f, a=a: np.save(f, np.asarray(a)), 'wb')
+
+        meta = dict(meta, arrays=sorted(arrays))
+        _atomic_write(base + '.json',
+                      lambda f: json.dump(meta, f, default=str), 'w')
+    except (IOError, OSError, TypeError, ValueError):
+        pass
+
+
+def _atomic_write(path, writer, mode):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            writer(f)
+        _replace(tmp, path)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+
+def reset_disk_cache():
+    """
+    Delete all the entries in the on-disk table cache, if it is enabled.
+    """
+    if DISK_CACHE_DIR is None:
+        return
+
+    for name in os.listdir(DISK_CACHE_DIR):
+        if name.endswith(('.npy', '.json', '.tmp')):
+            os.remove(os.path.join(DISK_CACHE_DIR, name))
@@ -23,6 +23,7 @@ from .spectrum import Powerlaw as PowerLaw
 from .spectrum import FileSourceSpectrum as FileSpectrum
 from .spectrum import ArraySourceSpectrum as ArraySpectrum
 from .catalog import Icat
+from .batch import SpectrumBatch, BandpassBank, SensitivityKernel
 #Analytic Spectral Elements
 from .spectrum import Box, UniformTransmission
 #Tabular Spectral Elements
@@ -44,7 +45,7 @@ from . import Cache
 from .refs import setref, showref, getref
 #
 from .locations import get_data_filename
-from .spparser import parse_spec
+from .spparser import parse_spec, compile_spec
 from . import tables
 
 def _test():
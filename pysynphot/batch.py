@@ -0,0 +1,925 @@
+"""This module handles many source spectra at once.
+
+A `SpectrumBatch` holds N source spectra sampled on one shared
+wavelength set as a single (N, nwave) array in internal units
+(Angstrom and ``photlam``). Operations that would otherwise build
+N composite spectra (multiplication by a bandpass, renormalization,
+redshift, and reddening) are applied to all rows at once. Passing
+a batch to `~pysynphot.observation.Observation` gives an observation
+whose count rates and effective stimuli are length-N arrays.
+
+A `BandpassBank` does the same for M bandpasses: their throughputs
+are sampled on one wavelength set with the integration weights folded
+in, so photometry of N spectra in M bands is a matrix product.
+
+A `SensitivityKernel` is one bandpass and binset compiled into a
+single weight vector, so that a count rate is a resampling of the
+source flux and a dot product. Kernels can be saved to file and
+loaded back, e.g., by worker processes.
+
+Examples
+--------
+>>> from pysynphot.batch import SpectrumBatch
+>>> batch = SpectrumBatch.from_spectra(
+...     [S.BlackBody(t) for t in (4000, 5000, 6000)])
+>>> batch = batch.renorm(10, 'vegamag', S.ObsBandpass('johnson,v'))
+>>> obs = S.Observation(batch, S.ObsBandpass('acs,wfc1,f555w'))
+>>> obs.effstim('abmag')  # doctest: +SKIP
+array([...])
+>>> bank = BandpassBank(['acs,wfc1,f435w', 'acs,wfc1,f555w'])
+>>> bank.effstim(batch, 'abmag').shape  # doctest: +SKIP
+(3, 2)
+
+"""
+from __future__ import division
+
+import numpy as N
+
+from . import Cache
+from . import units
+from . import spectrum
+from . import reddening
+from . import renorm
+from . import binning
+from . import refs
+from .exceptions import DisjointError, OverlapError
+
+
+def interp_rows(newwave, wave, flux):
+    """Linearly interpolate every row of ``flux`` from ``wave``
+    to ``newwave``.
+
+    This gives the same result as calling :func:`numpy.interp` on each
+    row (values beyond the ends of ``wave`` are held constant), but
+    the interpolation weights are only computed once.
+
+    Parameters
+    ----------
+    newwave : array_like
+        Wavelengths to interpolate to.
+
+    wave : array_like
+        Wavelengths of the columns of ``flux``. Must be 1D and
+        monotonic, and have at least two values.
+
+    flux : array_like
+        2D array with one spectrum per row.
+
+    Returns
+    -------
+    ans : ndarray
+        Interpolated array with shape ``(len(flux), len(newwave))``.
+
+    """
+    newwave = N.asarray(newwave, dtype=N.float64)
+    wave = N.asarray(wave, dtype=N.float64)
+    flux = N.asarray(flux, dtype=N.float64)
+
+    if wave[0] > wave[-1]:
+        wave = wave[::-1]
+        flux = flux[:, ::-1]
+
+    x = N.clip(newwave, wave[0], wave[-1])
+    idx = N.clip(N.searchsorted(wave, x, side='right') - 1,
+                 0, wave.size - 2)
+    dx = wave[idx + 1] - wave[idx]
+    t = (x - wave[idx]) / dx
+
+    return flux[:, idx] * (1.0 - t) + flux[:, idx + 1] * t
+
+
+def trapz_rows(x, y):
+    """Integrate every row of ``y`` over ``x``.
+
+    This is :meth:`~pysynphot.spectrum.Integrator.trapezoidIntegration`
+    applied to each row.
+
+    Parameters
+    ----------
+    x : array_like
+        1D wavelength array.
+
+    y : array_like
+        2D array with one spectrum per row.
+
+    Returns
+    -------
+    ans : ndarray
+        Integral of each row.
+
+    """
+    if x.size == 0:
+        return N.zeros(y.shape[0])
+
+    ans = (0.5 * (y[:, 1:] + y[:, :-1]) * (x[1:] - x[:-1])).sum(axis=1)
+    if x[-1] < x[0]:
+        ans *= -1.0
+    return ans
+
+
+class SpectrumBatch(object):
+    """Class to handle many source spectra on a shared wavelength set.
+
+    Parameters
+    ----------
+    wave : array_like
+        Wavelength set shared by all the spectra.
+
+    flux : array_like
+        Flux values, with one spectrum per row. A 1D array is
+        treated as a single spectrum.
+
+    waveunits, fluxunits : str
+        Wavelength and flux units of the inputs, as accepted by
+        `~pysynphot.units.Units`. Defaults are Angstrom and ``photlam``.
+
+    names : list of str or `None`
+        Description of each spectrum.
+
+    Attributes
+    ----------
+    names : list of str
+        Same as input, or row numbers if not given.
+
+    waveunits, fluxunits : `~pysynphot.units.Units`
+        User units for wavelength and flux.
+
+    isAnalytic : bool
+        This is always `False`.
+
+    primary_area : number or `None`
+        :ref:`pysynphot-area` of the telescope, used for conversions
+        involving counts.
+
+    warnings : dict
+        To store warnings.
+
+    wave, flux : array_like
+        Wavelength set and associated fluxes, with shape
+        (N, nwave), in user units.
+
+    Raises
+    ------
+    ValueError
+        Inputs have inconsistent shapes.
+
+    """
+    def __init__(self, wave, flux, waveunits='angstrom', fluxunits='photlam',
+                 names=None):
+        wave = N.asarray(wave, dtype=N.float64)
+        flux = N.atleast_2d(N.asarray(flux, dtype=N.float64))
+
+        if wave.ndim != 1 or wave.size < 2:
+            raise ValueError('wave must be 1D with at least two values.')
+        if flux.ndim != 2 or flux.shape[1] != wave.size:
+            raise ValueError('flux must have one row of %d values per '
+                             'spectrum.' % wave.size)
+
+        self.waveunits = units.Units(waveunits)
+        self.fluxunits = units.Units(fluxunits)
+
+        angwave = self.waveunits.ToAngstrom(wave)
+        photlam = self.fluxunits.ToPhotlam(angwave, flux)
+
+        if angwave[0] > angwave[-1]:
+            angwave = angwave[::-1]
+            photlam = photlam[:, ::-1]
+
+        self._wavetable = N.ascontiguousarray(angwave)
+        self._fluxtable = N.ascontiguousarray(photlam)
+
+        if names is None:
+            names = [str(i) for i in range(len(self._fluxtable))]
+        elif len(names) != len(self._fluxtable):
+            raise ValueError('names must have one entry per spectrum.')
+        self.names = list(names)
+
+        self.isAnalytic = False
+        self.primary_area = None
+        self.warnings = {}
+
+    @classmethod
+    def from_spectra(cls, spectra, wave=None):
+        """Sample source spectra on a shared wavelength set.
+
+        Parameters
+        ----------
+        spectra : list of `~pysynphot.spectrum.SourceSpectrum`
+            Spectra to put in the batch.
+
+        wave : array_like or `None`
+            Wavelength set in Angstrom. If `None`, the union of the
+            wavelength sets of all the spectra is used.
+
+        Returns
+        -------
+        batch : `SpectrumBatch`
+
+        """
+        spectra = list(spectra)
+
+        if wave is None:
+            wave = spectrum.MergeWaveSets(
+                *[sp.GetWaveSet() for sp in spectra])
+
+        wave = N.asarray(wave, dtype=N.float64)
+        flux = N.empty((len(spectra), wave.size))
+        for i, sp in enumerate(spectra):
+            flux[i] = sp(wave)
+
+        return cls(wave, flux, names=[str(sp) for sp in spectra])
+
+    def _copy(self, wave, flux, names=None):
+        """Make a new batch from internal-unit arrays, keeping the user
+        units and metadata of this one.
+
+        """
+        ans = SpectrumBatch.__new__(SpectrumBatch)
+        ans._wavetable = wave
+        ans._fluxtable = flux
+        ans.names = list(self.names if names is None else names)
+        ans.waveunits = self.waveunits
+        ans.fluxunits = self.fluxunits
+        ans.isAnalytic = False
+        ans.primary_area = self.primary_area
+        ans.warnings = dict(self.warnings)
+        return ans
+
+    def __len__(self):
+        return self._fluxtable.shape[0]
+
+    def __getitem__(self, key):
+        """A single row is returned as an
+        `~pysynphot.spectrum.ArraySourceSpectrum`; anything else
+        selects rows into a new batch.
+
+        """
+        if isinstance(key, (int, N.integer)):
+            sp = spectrum.ArraySourceSpectrum(wave=self._wavetable.copy(),
+                                              flux=self._fluxtable[key].copy(),
+                                              name=self.names[key],
+                                              keepneg=True)
+            sp.convert(self.waveunits.name)
+            sp.convert(self.fluxunits.name)
+            return sp
+
+        idx = N.arange(len(self))[key]
+        return self._copy(self._wavetable, self._fluxtable[idx],
+                          names=[self.names[i] for i in idx])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __str__(self):
+        return 'SpectrumBatch(%d spectra)' % len(self)
+
+    def __call__(self, wavelength):
+        """Return ``photlam`` fluxes at the given wavelengths in Angstrom,
+        with one row per spectrum.
+
+        """
+        return interp_rows(wavelength, self._wavetable, self._fluxtable)
+
+    def GetWaveSet(self):
+        """Obtain the wavelength set shared by all the spectra.
+
+        Returns
+        -------
+        waveset : array_like
+            Wavelength set in internal unit.
+
+        """
+        return self._wavetable.copy()
+
+    def getArrays(self, waveunits=None, fluxunits=None):
+        """Return wavelength and flux arrays in user units, or in the
+        given units, as in
+        :meth:`~pysynphot.spectrum.SourceSpectrum.getArrays`.
+
+        Parameters
+        ----------
+        waveunits, fluxunits : str or `None`
+            Wavelength and flux units. If `None`, ``self.waveunits``
+            and ``self.fluxunits`` are used.
+
+        Returns
+        -------
+        wave : array_like
+            Wavelength array in ``waveunits``.
+
+        flux : array_like
+            Flux array in ``fluxunits``, with one row per spectrum.
+
+        """
+        if waveunits is None:
+            waveunits = self.waveunits
+        if fluxunits is None:
+            fluxunits = self.fluxunits
+
+        wave = self._wavetable
+        flux = units.Photlam().Convert(wave, self._fluxtable,
+                                       units.Units(fluxunits).name,
+                                       area=self.primary_area)
+        wave = units.Angstrom().Convert(wave, units.Units(waveunits).name)
+        return wave, flux
+
+    def _getWaveProp(self):
+        wave, flux = self.getArrays()
+        return wave
+
+    def _getFluxProp(self):
+        wave, flux = self.getArrays()
+        return flux
+
+    wave = property(_getWaveProp, doc="Wavelength property.")
+    flux = property(_getFluxProp, doc="Flux property.")
+
+    def convert(self, targetunits):
+        """Set new user unit, for either wavelength or flux.
+
+        Parameters
+        ----------
+        targetunits : str
+            New unit name, as accepted by `~pysynphot.units.Units`.
+
+        """
+        nunits = units.Units(targetunits)
+
+        if nunits.isFlux:
+            self.fluxunits = nunits
+        else:
+            self.waveunits = nunits
+
+    def __mul__(self, other):
+        """Multiply by a bandpass, a constant, or one constant
+        per spectrum.
+
+        Multiplying by a `~pysynphot.spectrum.SpectralElement` samples the
+        result on the union of the wavelength sets, as for a
+        `~pysynphot.spectrum.CompositeSourceSpectrum`.
+
+        """
+        if isinstance(other, spectrum.SpectralElement):
+            wave = spectrum.MergeWaveSets(self._wavetable,
+                                          other.GetWaveSet())
+            flux = self(wave) * other(wave)
+            return self._copy(wave, flux)
+
+        if N.isscalar(other):
+            return self._copy(self._wavetable, self._fluxtable * other)
+
+        other = N.asarray(other, dtype=N.float64)
+        if other.shape != (len(self),):
+            raise TypeError("SpectrumBatch objects can only be multiplied by "
+                            "SpectralElement objects, constants, or one "
+                            "constant per spectrum")
+        return self._copy(self._wavetable, self._fluxtable * other[:, None])
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def integrate(self, fluxunits='photlam'):
+        """Integrate the flux of every spectrum in given unit.
+
+        Parameters
+        ----------
+        fluxunits : str
+            Flux unit to integrate in.
+
+        Returns
+        -------
+        result : array_like
+            Integrated sum of each spectrum.
+
+        """
+        wave = units.Angstrom().Convert(self._wavetable, self.waveunits.name)
+        flux = units.Photlam().Convert(self._wavetable, self._fluxtable,
+                                       fluxunits, area=self.primary_area)
+        return trapz_rows(wave, flux)
+
+    def renorm(self, RNval, RNUnits, band, force=False):
+        """:ref:`Renormalize <pysynphot-renorm>` every spectrum.
+
+        This follows :func:`~pysynphot.renorm.StdRenorm`, with the
+        spectrum fluxes through the band integrated for all rows at once.
+
+        Parameters
+        ----------
+        RNval : number or array_like
+            Flux value for renormalization, either one for all spectra
+            or one per spectrum.
+
+        RNUnits : str
+            Unit name, as accepted by `~pysynphot.units.Units`, for ``RNval``.
+
+        band : `~pysynphot.spectrum.SpectralElement`
+            Bandpass that ``RNval`` is based on.
+
+        force : bool
+            Force renormalization regardless of overlap status with given
+            bandpass. Default is `False`.
+
+        Returns
+        -------
+        newbatch : `SpectrumBatch`
+            Renormalized spectra.
+
+        Raises
+        ------
+        ValueError
+            Integrated flux of any spectrum is zero, negative, NaN,
+            or infinite.
+
+        pysynphot.exceptions.DisjointError
+            Spectra and bandpass are disjoint.
+
+        pysynphot.exceptions.OverlapError
+            Spectra and bandpass do not fully overlap.
+
+        """
+        bandkey = Cache.band_fingerprint(band)
+        warnings = {}
+        if not force:
+            stat, sig = renorm.BandOverlap(self, band, bandkey)
+            if stat == 'partial':
+                if sig:
+                    warnings['PartialRenorm'] = True
+                    print('Warning: Spectrum is not defined everywhere in '
+                          'renormalization bandpass. At least 99% of the band '
+                          'throughput has data, therefore proceeding anyway. '
+                          'Spectrum will be extrapolated at constant value.')
+                else:
+                    raise OverlapError('Spectrum and renormalization band do '
+                                       'not fully overlap. You may use '
+                                       'force=True to force the '
+                                       'renormalization to proceed.')
+            elif stat == 'none':
+                raise DisjointError('Spectrum and renormalization band are '
+                                    'disjoint.')
+
+        totalflux = (self * band).integrate()
+        if not (N.isfinite(totalflux) & (totalflux > 0)).all():
+            raise ValueError('Integrated flux is <= 0, NaN, or infinite')
+
+        RNunits = units.Units(RNUnits)
+        stdflux = renorm.StdIntegral(RNunits, band, bandkey)
+
+        RNval = N.asarray(RNval, dtype=N.float64)
+        if RNunits.isMag:
+            dmag = RNval + 2.5 * N.log10(totalflux / stdflux)
+            factor = 10**(-0.4 * dmag)
+        else:
+            factor = RNval * (stdflux / totalflux)
+
+        ans = self * N.broadcast_to(factor, (len(self),))
+        ans.warnings.update(warnings)
+        return ans
+
+    def redshift(self, z):
+        """Apply :ref:`redshift <pysynphot-redshift>` to every spectrum.
+
+        With a single redshift, the wavelength set is shifted as in
+        :meth:`~pysynphot.spectrum.SourceSpectrum.redshift`. With one
+        redshift per spectrum, each shifted spectrum is resampled onto
+        the union of the shifted wavelength sets, with zero flux outside
+        of its own.
+
+        Parameters
+        ----------
+        z : number or array_like
+            Redshift value(s).
+
+        Returns
+        -------
+        newbatch : `SpectrumBatch`
+            Redshifted spectra.
+
+        """
+        if N.isscalar(z):
+            return self._copy(self._wavetable * (1.0 + z),
+                              self._fluxtable.copy())
+
+        z = N.asarray(z, dtype=N.float64)
+        if z.shape != (len(self),):
+            raise ValueError('z must be a scalar or have one value per '
+                             'spectrum.')
+
+        wave = spectrum.MergeWaveSets(
+            *[self._wavetable * (1.0 + zi) for zi in z])
+        flux = N.empty((len(self), wave.size), dtype=N.float64)
+        for i, zi in enumerate(z):
+            flux[i] = N.interp(wave, self._wavetable * (1.0 + zi),
+                               self._fluxtable[i], left=0.0, right=0.0)
+        return self._copy(wave, flux)
+
+    def redden(self, extval, name=None):
+        """Apply :ref:`extinction <pysynphot-extinction>` with one
+        :math:`E(B-V)` per spectrum.
+
+        For a single value, this is the same as multiplying by
+        `~pysynphot.reddening.Extinction`. Otherwise, the throughput of
+        each row is that of the law tabulated at :math:`E(B-V)=1`
+        raised to the power of its :math:`E(B-V)`.
+
+        Parameters
+        ----------
+        extval : number or array_like
+            Value(s) of :math:`E(B-V)` in magnitudes.
+
+        name : str or `None`
+            Name of reddening law, as accepted by
+            `~pysynphot.reddening.Extinction`.
+
+        Returns
+        -------
+        newbatch : `SpectrumBatch`
+            Reddened spectra.
+
+        """
+        if N.isscalar(extval):
+            return self * reddening.Extinction(extval, name)
+
+        extval = N.asarray(extval, dtype=N.float64)
+        if extval.shape != (len(self),):
+            raise ValueError('extval must be a scalar or have one value per '
+                             'spectrum.')
+
+        unit = reddening.Extinction(1.0, name)
+        wave = spectrum.MergeWaveSets(self._wavetable, unit.GetWaveSet())
+        thru = unit.GetWaveSet(), unit(unit.GetWaveSet())
+        thru = interp_rows(wave, thru[0], thru[1][None, :] ** extval[:, None])
+
+        return self._copy(wave, self(wave) * thru)
+
+    def taper(self):
+        """Taper the spectra by adding zero flux to each end, as in
+        :meth:`~pysynphot.spectrum.TabularSourceSpectrum.taper`.
+
+        Returns
+        -------
+        newbatch : `SpectrumBatch`
+            Tapered spectra.
+
+        """
+        w = self._wavetable
+        wave = N.concatenate(([w[0] * w[0] / w[1]], w,
+                              [w[-1] * w[-1] / w[-2]]))
+        flux = N.zeros((len(self), wave.size))
+        flux[:, 1:-1] = self._fluxtable
+        return self._copy(wave, flux)
+
+
+def _sampleFlux(spectra, wave):
+    """Sample a batch, a single spectrum, or a list of spectra on
+    ``wave`` in ``photlam``. A single spectrum gives a 1D array.
+
+    """
+    if isinstance(spectra, (SpectrumBatch, spectrum.SourceSpectrum)):
+        return spectra(wave)
+    return N.array([sp(wave) for sp in spectra], dtype=N.float64)
+
+
+class BandpassBank(object):
+    """Class to handle many bandpasses on a shared wavelength set.
+
+    The throughputs are sampled on one wavelength set and stored as an
+    (M, nwave) matrix, together with the trapezoid integration weights
+    and the bin widths used for conversion to counts. Photometry of N
+    spectra through all the bands is then a matrix product giving an
+    (N, M) table.
+
+    .. note::
+
+        Spectra are sampled on ``self.wave``. Results agree with
+        `~pysynphot.observation.Observation` up to the difference
+        between integrating on this wavelength set and on the merged
+        wavelength set of each spectrum and bandpass.
+
+    Parameters
+    ----------
+    bands : list
+        Bandpasses, as `~pysynphot.spectrum.SpectralElement` or
+        observation mode strings for `~pysynphot.obsbandpass.ObsBandpass`.
+
+    wave : array_like or `None`
+        Wavelength set in Angstrom. If `None`, the union of the
+        wavelength sets of all the bandpasses is used.
+
+    Attributes
+    ----------
+    bands : list of `~pysynphot.spectrum.SpectralElement`
+        Bandpasses.
+
+    names : list of str
+        Description of each bandpass.
+
+    wave : array_like
+        Shared wavelength set in Angstrom.
+
+    throughput : array_like
+        Throughput of each bandpass, with shape (M, nwave).
+
+    primary_area : array_like
+        :ref:`pysynphot-area` of each bandpass, or the default one if
+        the bandpass does not define it.
+
+    """
+    def __init__(self, bands, wave=None):
+        from .obsbandpass import ObsBandpass
+
+        self.bands = [ObsBandpass(b) if isinstance(b, str) else b
+                      for b in bands]
+        self.names = [str(b) for b in self.bands]
+
+        if wave is None:
+            wave = spectrum.MergeWaveSets(
+                *[b.GetWaveSet() for b in self.bands])
+        self.wave = N.asarray(wave, dtype=N.float64)
+
+        self.throughput = N.empty((len(self.bands), self.wave.size))
+        for i, b in enumerate(self.bands):
+            self.throughput[i] = b(self.wave)
+
+        self.primary_area = N.array(
+            [getattr(b, 'primary_area', None) or refs.PRIMARY_AREA
+             for b in self.bands], dtype=N.float64)
+
+        # Trapezoid rule: each point gets half of the interval on
+        # either side.
+        dx = 0.5 * (self.wave[1:] - self.wave[:-1])
+        trapz = N.zeros_like(self.wave)
+        trapz[:-1] += dx
+        trapz[1:] += dx
+        self._rateweights = self.throughput * trapz
+
+        # Same as units.Photlam().ToCounts() on the shared wavelength set.
+        widths = binning.calculate_bin_widths(
+            binning.calculate_bin_edges(self.wave))
+        self._countweights = (self.throughput * widths *
+                              self.primary_area[:, None])
+
+        self._uresp = {}
+
+    def __len__(self):
+        return len(self.bands)
+
+    def __getitem__(self, i):
+        return self.bands[i]
+
+    def _flux(self, spectra):
+        """Sample spectra on ``self.wave`` as an (N, nwave)
+        ``photlam`` array.
+
+        """
+        return N.atleast_2d(_sampleFlux(spectra, self.wave))
+
+    def unitResponse(self, fluxunits):
+        """Unit response of every bandpass in the given flux unit,
+        from the unit's ``unitResponse``.
+
+        Parameters
+        ----------
+        fluxunits : str
+            Flux unit.
+
+        Returns
+        -------
+        ans : array_like
+            One value per bandpass.
+
+        """
+        x = units.Units(fluxunits)
+        if x.name not in self._uresp:
+            self._uresp[x.name] = N.array([x.unitResponse(b)
+                                           for b in self.bands])
+        return self._uresp[x.name]
+
+    def unit_response(self):
+        """Calculate :ref:`pysynphot-formula-uresp` of every bandpass,
+        as in :meth:`~pysynphot.spectrum.SpectralElement.unit_response`.
+
+        Returns
+        -------
+        ans : array_like
+            One value per bandpass.
+
+        """
+        return N.array([b.unit_response() for b in self.bands])
+
+    def countrate(self, spectra):
+        """Count rate of each spectrum through each bandpass.
+
+        Parameters
+        ----------
+        spectra : `SpectrumBatch`, `~pysynphot.spectrum.SourceSpectrum`, or list
+            Source spectra.
+
+        Returns
+        -------
+        ans : array_like
+            Count rates with shape (N, M).
+
+        """
+        return N.dot(self._flux(spectra), self._countweights.T)
+
+    def effstim(self, spectra, fluxunits='photlam'):
+        """Compute :ref:`effective stimulus <pysynphot-formula-effstim>`
+        of each spectrum through each bandpass, as in
+        :meth:`~pysynphot.observation.Observation.effstim`.
+
+        Parameters
+        ----------
+        spectra : `SpectrumBatch`, `~pysynphot.spectrum.SourceSpectrum`, or list
+            Source spectra.
+
+        fluxunits : str
+            Flux unit.
+
+        Returns
+        -------
+        ans : array_like
+            Effective stimulus with shape (N, M). It is NaN where the
+            integrated flux is zero, negative, NaN, or infinite.
+
+        """
+        x = units.Units(fluxunits)
+
+        if x.isDensity:
+            rate = N.dot(self._flux(spectra), self._rateweights.T)
+        else:
+            rate = self.countrate(spectra)
+
+        with N.errstate(divide='ignore', invalid='ignore'):
+            rate = N.where(N.isfinite(rate) & (rate > 0), rate, N.nan)
+            if x.isDensity:
+                if x.isMag:
+                    ans = self.unitResponse(x.name) - 2.5 * N.log10(rate)
+                else:
+                    ans = rate * self.unitResponse(x.name)
+            elif x.isMag:
+                ans = -2.5 * N.log10(rate)
+            else:
+                ans = rate
+
+        return ans
+
+
+class SensitivityKernel(object):
+    """Bandpass and binset compiled for count rate calculations.
+
+    For a given bandpass and binset, the count rate of
+    `~pysynphot.observation.Observation` is linear in the source flux:
+    it is the flux times the throughput, binned and multiplied by the
+    bin widths and the collecting area. The kernel holds that product
+    as one weight per point of its integration grid, which is the
+    wavelength set of the bandpass merged with the bin centers and
+    edges. :meth:`countrate` then only samples the source there.
+
+    .. note::
+
+        Spectra are sampled on ``self.wave``. Results agree with
+        `~pysynphot.observation.Observation` up to the difference
+        between integrating on this wavelength set and on the merged
+        wavelength set of each spectrum and bandpass.
+
+    Parameters
+    ----------
+    band : `~pysynphot.spectrum.SpectralElement` or str
+        Bandpass, or observation mode for
+        `~pysynphot.obsbandpass.ObsBandpass`.
+
+    binset : array_like or `None`
+        Bin centers in Angstrom. If `None`, the binset of the bandpass
+        is used, or its wavelength set if it has none.
+
+    Attributes
+    ----------
+    name : str
+        Description of the bandpass.
+
+    wave : array_like
+        Integration grid in Angstrom.
+
+    throughput : array_like
+        Throughput on ``self.wave``.
+
+    binwave : array_like
+        Bin centers in Angstrom.
+
+    primary_area : float
+        :ref:`pysynphot-area` of the bandpass, or the default one if
+        the bandpass does not define it.
+
+    weights, native_weights : array_like
+        Count rate per ``photlam`` of the source at each point of
+        ``self.wave``, for binned and native data.
+
+    Examples
+    --------
+    >>> kernel = SensitivityKernel('acs,wfc1,f555w')
+    >>> kernel.save('f555w.npz')
+    >>> kernel = SensitivityKernel.load('f555w.npz')
+    >>> kernel.countrate(S.BlackBody(5000))  # doctest: +SKIP
+
+    """
+    def __init__(self, band, binset=None):
+        from .obsbandpass import ObsBandpass
+
+        if isinstance(band, str):
+            band = ObsBandpass(band)
+
+        if binset is None:
+            binset = getattr(band, 'binset', None)
+            if binset is None:
+                binset = band.wave
+
+        self.name = str(band)
+        self.primary_area = (getattr(band, 'primary_area', None) or
+                             refs.PRIMARY_AREA)
+
+        plan = binning.RebinPlan(band.GetWaveSet(), binset)
+        self.wave = N.array(plan.wave)
+        self.binwave = N.array(plan.binwave)
+        self.throughput = band(self.wave)
+
+        # Binned: counts per bin are the average flux in the bin times
+        # the bin width and area, as in units.Photlam().ToCounts().
+        binwidths = binning.calculate_bin_widths(plan.edges)
+        rows = N.repeat(N.arange(plan.binwave.size), N.diff(plan.indptr))
+        colweights = N.bincount(
+            plan.columns, weights=plan.weights * binwidths[rows],
+            minlength=self.wave.size)
+        self.weights = self.throughput * colweights * self.primary_area
+
+        # Native: every point of the grid is its own bin.
+        widths = binning.calculate_bin_widths(
+            binning.calculate_bin_edges(self.wave))
+        self.native_weights = self.throughput * widths * self.primary_area
+
+    def __str__(self):
+        return self.name
+
+    def countrate(self, spectra, binned=True):
+        """Count rate of source spectra, as in
+        :meth:`~pysynphot.observation.Observation.countrate`
+        without a range.
+
+        Parameters
+        ----------
+        spectra : `~pysynphot.spectrum.SourceSpectrum`, `SpectrumBatch`, or list
+            Source spectra.
+
+        binned : bool
+            If `True` (default), use binned data.
+            Otherwise, use native data.
+
+        Returns
+        -------
+        ans : float or array_like
+            Count rate, or one per spectrum if ``spectra`` is a batch
+            or a list.
+
+        """
+        flux = _sampleFlux(spectra, self.wave)
+        if binned:
+            return N.dot(flux, self.weights)
+        else:
+            return N.dot(flux, self.native_weights)
+
+    def save(self, filename):
+        """Write the kernel to a NumPy ``.npz`` file.
+
+        Parameters
+        ----------
+        filename : str
+            Output file name.
+
+        """
+        N.savez(filename, name=N.array(self.name), wave=self.wave,
+                throughput=self.throughput, binwave=self.binwave,
+                primary_area=N.array(self.primary_area),
+                weights=self.weights, native_weights=self.native_weights)
+
+    @classmethod
+    def load(cls, filename):
+        """Read a kernel written by :meth:`save`.
+
+        Parameters
+        ----------
+        filename : str
+            Input file name.
+
+        Returns
+        -------
+        kernel : `SensitivityKernel`
+
+        """
+        kernel = cls.__new__(cls)
+        with N.load(filename) as f:
+            kernel.name = str(f['name'])
+            kernel.primary_area = float(f['primary_area'])
+            for key in ('wave', 'throughput', 'binwave', 'weights',
+                        'native_weights'):
+                setattr(kernel, key, f[key])
+        return kernel
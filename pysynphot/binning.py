@@ -3,6 +3,8 @@ from __future__ import division
 
 import numpy as np
 
+from . import Cache
+
 
 def calculate_bin_edges(centers):
     """
@@ -99,3 +101,156 @@ def calculate_bin_centers(edges):
         centers[i] = 2. * edges[i] - centers[i - 1]
 
     return centers
+
+
+class RebinPlan(object):
+    """
+    Precomputed linear operator that bins flux sampled on a fixed native
+    wavelength set into a fixed set of bins.
+
+    Flux is integrated over each bin with the trapezoid rule and divided
+    by the width covered, which gives the average flux density in the
+    bin. This is linear in flux, so for a given native wavelength set
+    and binset, the merged wavelength
+    set, the edge indices, and the trapezoid weights are computed once
+    and stored as a sparse weight matrix in compressed sparse row (CSR)
+    form, with one row per bin. Binning a flux vector, or a 2D stack of
+    them, is then a single sparse matrix product. Use :func:`get_rebin_plan`
+    to share plans between observations.
+
+    Parameters
+    ----------
+    wave : array_like
+        Native wavelength set, e.g., the merged wavelength set of a
+        spectrum and a bandpass.
+
+    binwave : array_like
+        Bin centers.
+
+    Attributes
+    ----------
+    wave : ndarray
+        Wavelength set on which flux must be sampled for :meth:`rebin`.
+        This is ``wave`` merged with the bin centers and edges.
+
+    binwave : ndarray
+        Bin centers.
+
+    edges : ndarray
+        Bin edges from :func:`calculate_bin_edges`.
+
+    indices : ndarray
+        Indices of ``edges`` in ``self.wave``.
+
+    intwave : ndarray
+        Wavelength interval integrated in each bin.
+
+    indptr, columns, weights : ndarray
+        The weight matrix in CSR form: the weights of bin ``i`` are
+        ``weights[indptr[i]:indptr[i+1]]``, applied to the flux values at
+        ``columns[indptr[i]:indptr[i+1]]``.
+
+    """
+    def __init__(self, wave, binwave):
+        from .spectrum import MergeWaveSets
+
+        self.binwave = np.array(binwave)
+        self.edges = calculate_bin_edges(self.binwave)
+        self.wave = np.asarray(MergeWaveSets(wave, self.edges, self.binwave),
+                               dtype=np.float64)
+        self.indices = np.searchsorted(self.wave, self.edges)
+
+        first = self.indices[:-1]
+        last = self.indices[1:]
+        deltaw = self.wave[1:] - self.wave[:-1]
+        halfw = 0.5 * np.append(deltaw, 0.0)
+
+        # Bin i uses the flux at columns first..last (inclusive).
+        nnz = np.where(last > first, last - first + 1, 0)
+        self.indptr = np.concatenate(([0], np.cumsum(nnz)))
+        rows = np.repeat(np.arange(first.size), nnz)
+        self.columns = first[rows] + (np.arange(self.indptr[-1]) -
+                                      self.indptr[rows])
+
+        # Each column gets half of the interval on its right, unless it is
+        # the last one of the bin, and half of the interval on its left,
+        # unless it is the first one.
+        cols = self.columns
+        left = np.where(cols < last[rows], halfw[cols], 0.0)
+        right = np.where(cols > first[rows], halfw[np.maximum(cols - 1, 0)],
+                         0.0)
+
+        cumw = np.concatenate(([0.0], np.cumsum(deltaw)))
+        self.intwave = np.where(last > first,
+                                cumw[last] - cumw[first], 0.0)
+        self._empty = nnz == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.weights = (left + right) / self.intwave[rows]
+
+        # Plans are shared through the cache, so guard against
+        # accidental modification by their users.
+        for a in (self.binwave, self.edges, self.wave, self.indices,
+                  self.intwave, self.indptr, self.columns, self.weights):
+            a.flags.writeable = False
+
+    def rebin(self, flux):
+        """
+        Bin flux sampled on ``self.wave``.
+
+        Parameters
+        ----------
+        flux : array_like
+            Flux values, 1D or 2D with one spectrum per row. The last
+            axis must match ``self.wave``.
+
+        Returns
+        -------
+        binflux : ndarray
+            Average flux in each bin, with the same number of dimensions
+            as ``flux``. Empty bins are NaN.
+
+        """
+        flux = np.asanyarray(flux, dtype=np.float64)
+
+        if flux.shape[-1:] != self.wave.shape:
+            raise ValueError('last axis of flux must match plan wave.')
+
+        products = np.zeros(flux.shape[:-1] + (self.columns.size + 1,))
+        products[..., :-1] = flux[..., self.columns] * self.weights
+
+        starts = np.minimum(self.indptr, self.columns.size)
+        binflux = np.add.reduceat(products, starts, axis=-1)[..., :-1]
+        binflux[..., self._empty] = np.nan
+
+        return binflux
+
+
+def get_rebin_plan(wave, binwave):
+    """
+    Return a `RebinPlan`, reusing a cached one built for the same
+    native wavelength set and binset.
+
+    Plans are kept in ``pysynphot.Cache.REBIN_PLAN_CACHE``.
+
+    Parameters
+    ----------
+    wave : array_like
+        Native wavelength set.
+
+    binwave : array_like
+        Bin centers.
+
+    Returns
+    -------
+    plan : `RebinPlan`
+
+    """
+    key = (Cache.fingerprint(wave), Cache.fingerprint(binwave))
+
+    try:
+        plan = Cache.REBIN_PLAN_CACHE[key]
+    except KeyError:
+        plan = RebinPlan(wave, binwave)
+        Cache.REBIN_PLAN_CACHE[key] = plan
+
+    return plan
@@ -16,6 +16,10 @@ The range of parameters available may vary from catalog to catalog.
 
 More information on catalogs can be found in :ref:`pysynphot-appendixa`.
 
+For many models from the same catalog, `Atlas` loads all its basis
+spectra once on a common wavelength set, and interpolates them with
+array operations; see ``Icat(..., atlas=True)`` and `Icat.batch`.
+
 """
 from __future__ import division
 
@@ -25,12 +29,209 @@ from astropy.io import fits as pyfits
 
 from . import spectrum
 from . import locations
+from . import Cache
 
-from .Cache import CATALOG_CACHE
+from .Cache import CATALOG_CACHE, ATLAS_CACHE
 
 import pysynphot.exceptions as exceptions
 
 
+class CatalogIndex(object):
+    """Parameters and basis spectrum names of a catalog, as read from
+    its master file, with sorted axes for bracketing.
+
+    Use :meth:`get` to share the index of a catalog, which is kept in
+    ``pysynphot.Cache.CATALOG_CACHE``.
+
+    Parameters
+    ----------
+    index : list of str
+        ``INDEX`` column: comma-separated
+        :math:`T_{\\textnormal{eff}}`, metallicity, and
+        :math:`\\log g` of each model.
+
+    filenames : list of str
+        ``FILENAME`` column: ``file[column]`` of each model.
+
+    Attributes
+    ----------
+    params : array_like
+        Structured array with fields ``Teff``, ``metallicity``, and
+        ``log_g``, in catalog order.
+
+    filenames : array_like
+        Same as input.
+
+    teff : array_like
+        Sorted unique :math:`T_{\\textnormal{eff}}` values.
+
+    """
+    names = ('Teff', 'metallicity', 'log_g')
+
+    # Names used in error messages.
+    parameter_names = ['Teff', 'metallicity', 'log G']
+
+    def __init__(self, index, filenames):
+        values = N.array(','.join(index).split(','), dtype=N.float64)
+        values = values.reshape(len(index), 3)
+
+        self.params = N.empty(len(index), dtype=[(n, N.float64)
+                                                 for n in self.names])
+        for i, name in enumerate(self.names):
+            self.params[name] = values[:, i]
+        self.filenames = N.asarray(filenames)
+
+        # Rows sorted by Teff, then metallicity, then log g. The sort
+        # is stable, so duplicates stay in catalog order.
+        self._order = N.lexsort((values[:, 2], values[:, 1], values[:, 0]))
+        t, z, g = values[self._order].T
+
+        # Metallicities available at each Teff, and log g available at
+        # each (Teff, metallicity), as segments of sorted arrays.
+        tz_new = N.ones(len(t), dtype=bool)
+        tz_new[1:] = (t[1:] != t[:-1]) | (z[1:] != z[:-1])
+        self._tz_start = N.append(N.flatnonzero(tz_new), len(t))
+        self._tz_t = t[tz_new]
+        self._tz_z = z[tz_new]
+        self._g = g
+
+        t_new = N.ones(len(self._tz_t), dtype=bool)
+        t_new[1:] = self._tz_t[1:] != self._tz_t[:-1]
+        self._t_start = N.append(N.flatnonzero(t_new), len(self._tz_t))
+        self.teff = self._tz_t[t_new]
+
+    @classmethod
+    def get(cls, filename):
+        """Return the index of a catalog master file, reading it on
+        first use."""
+        if filename not in CATALOG_CACHE:
+            table = pyfits.open(filename)
+            index = table[1].data.field('INDEX')
+            filenames = table[1].data.field('FILENAME')
+            table.close()
+            CATALOG_CACHE[filename] = cls(index, filenames)
+        return CATALOG_CACHE[filename]
+
+    def __len__(self):
+        return len(self.params)
+
+    def entry(self, row):
+        """Parameters and file name of a model, as a list
+        ``[Teff, metallicity, log_g, filename]``."""
+        return [float(v) for v in self.params[row]] + [
+            str(self.filenames[row])]
+
+    def _breakSegments(self, values, start, stop, par, which):
+        """Bracket each ``par`` within its segment ``values[start:stop]``
+        of sorted values.
+
+        Returns
+        -------
+        upper, lower : array_like
+            Positions in ``values`` of the first occurrence of the
+            smallest value >= ``par`` and of the largest value <= ``par``.
+
+        """
+        upper = N.empty(len(par), dtype=N.intp)
+        lower = N.empty(len(par), dtype=N.intp)
+
+        # Queries sharing a segment are searched together.
+        segments, inverse = N.unique(start, return_inverse=True)
+        for k, first in enumerate(segments):
+            sel = N.flatnonzero(inverse == k)
+            seg = values[first:stop[sel[0]]]
+            p = par[sel]
+
+            hi = N.searchsorted(seg, p, side='left')
+            lo = N.searchsorted(seg, p, side='right') - 1
+
+            bad = hi == len(seg)
+            if bad.any():
+                s = "Parameter '%s' exceeds data. Max allowed=%f, entered=%f."
+                s = s % (self.parameter_names[which], seg.max(),
+                         p[bad][0])
+                raise exceptions.ParameterOutOfBounds(s)
+            bad = lo < 0
+            if bad.any():
+                s = "Parameter '%s' exceeds data. Min allowed=%f, entered=%f."
+                s = s % (self.parameter_names[which], seg.min(),
+                         p[bad][0])
+                raise exceptions.ParameterOutOfBounds(s)
+
+            upper[sel] = first + hi
+            lower[sel] = first + N.searchsorted(seg, seg[lo], side='left')
+
+        return upper, lower
+
+    def bracket(self, Teff, metallicity, log_g):
+        """Find the eight basis models around each set of parameters,
+        and their interpolation weights.
+
+        Teff is bracketed first, then metallicity among the models at
+        each of the two Teff, then log g among the models at each of the
+        four (Teff, metallicity). Each pair of models is interpolated
+        linearly in its parameter, so that the weight of the second is
+        ``(par1 - par) / (par1 - par2)``.
+
+        Parameters
+        ----------
+        Teff, metallicity, log_g : array_like
+            Model parameters, with the same length.
+
+        Returns
+        -------
+        rows : array_like
+            Rows in catalog order of the models, with shape (N, 8), in
+            the order upper Teff, upper metallicity, upper log g; upper,
+            upper, lower; upper, lower, upper; and so on.
+
+        weights : array_like
+            Weight of each model, with shape (N, 8).
+
+        Raises
+        ------
+        pysynphot.exceptions.ParameterOutOfBounds
+            A parameter value is out of bounds.
+
+        """
+        pars = [N.atleast_1d(N.asarray(p, dtype=N.float64))
+                for p in (Teff, metallicity, log_g)]
+        n = len(pars[0])
+        zeros = N.zeros(n, dtype=N.intp)
+
+        def pair(v1, v2, par):
+            with N.errstate(invalid='ignore', divide='ignore'):
+                a = N.where(v1 == v2, 0.0, (v1 - par) / (v1 - v2))
+            return 1.0 - a, a
+
+        # Positions in the sorted axis of each level, and the weights.
+        t_hi, t_lo = self._breakSegments(self.teff, zeros,
+                                         zeros + len(self.teff), pars[0], 0)
+        wt = pair(self.teff[t_hi], self.teff[t_lo], pars[0])
+
+        # All the metallicities are bracketed before any log g, so that
+        # errors are reported in the same order as before.
+        zs = []
+        for t, w1 in zip((t_hi, t_lo), wt):
+            z_hi, z_lo = self._breakSegments(
+                self._tz_z, self._t_start[t], self._t_start[t + 1], pars[1], 1)
+            wz = pair(self._tz_z[z_hi], self._tz_z[z_lo], pars[1])
+            zs.extend([(z_hi, w1 * wz[0]), (z_lo, w1 * wz[1])])
+
+        rows = N.empty((n, 8), dtype=N.intp)
+        weights = N.empty((n, 8))
+        for j, (z, w2) in enumerate(zs):
+            g_hi, g_lo = self._breakSegments(
+                self._g, self._tz_start[z], self._tz_start[z + 1], pars[2], 2)
+            wg = pair(self._g[g_hi], self._g[g_lo], pars[2])
+            rows[:, 2 * j] = self._order[g_hi]
+            rows[:, 2 * j + 1] = self._order[g_lo]
+            weights[:, 2 * j] = w2 * wg[0]
+            weights[:, 2 * j + 1] = w2 * wg[1]
+
+        return rows, weights
+
+
 class Icat(spectrum.TabularSourceSpectrum):
     """This class constructs a model from the grid available in
     :ref:`catalogs <pysynphot-spec-atlas>`.
@@ -58,6 +259,11 @@ class Icat(spectrum.TabularSourceSpectrum):
     log_g : float
         Log surface gravity of model.
 
+    atlas : bool
+        If `True`, interpolate the spectra of the `Atlas` of the
+        catalog, which is loaded on first use, instead of reading
+        the basis spectra from file.
+
     Attributes
     ----------
     name : str
@@ -88,7 +294,7 @@ class Icat(spectrum.TabularSourceSpectrum):
     >>> spec = S.Icat('k93models', 6440, 0, 4.3)
 
     """
-    def __init__(self,catdir,Teff,metallicity,log_g):
+    def __init__(self,catdir,Teff,metallicity,log_g,atlas=False):
         self.isAnalytic=False
 
         # this is useful for reporting in exceptions which parameter is
@@ -98,38 +304,21 @@ class Icat(spectrum.TabularSourceSpectrum):
         filename = locations.CAT_TEMPLATE.replace('*',catdir)
         self.name="%s(Teff=%g,z=%g,logG=%g)"%(catdir,Teff,metallicity,log_g)
 
-        if filename in CATALOG_CACHE:
-            indices = CATALOG_CACHE[filename]
-        else:
-            table = pyfits.open(filename)
-
-            indexList = table[1].data.field('INDEX')
-            filenameList = table[1].data.field('FILENAME')
-
-            table.close()
-
-            indices = self._getArgs(indexList, filenameList)
-
-            CATALOG_CACHE[filename] = indices
-
-        list0,list1 = self._breakList(indices, 0, Teff)
-
-        list2,list3 = self._breakList(list0, 1, metallicity)
-        list4,list5 = self._breakList(list1, 1, metallicity)
+        if atlas:
+            cat = Atlas.get(catdir)
+            self._wavetable = cat.wave
+            self._fluxtable = cat.interpolate(
+                [Teff], [metallicity], [log_g])[0]
+            self.waveunits = cat.waveunits
+            self.fluxunits = cat.fluxunits
+            self.warnings = {}
+            return
 
-        list6,list7   = self._breakList(list2, 2, log_g)
-        list8,list9   = self._breakList(list3, 2, log_g)
-        list10,list11 = self._breakList(list4, 2, log_g)
-        list12,list13 = self._breakList(list5, 2, log_g)
+        index = CatalogIndex.get(filename)
+        rows = index.bracket([Teff], [metallicity], [log_g])[0][0]
 
-        sp1 = self._getSpectrum(list6[0],  catdir)
-        sp2 = self._getSpectrum(list7[0],  catdir)
-        sp3 = self._getSpectrum(list8[0],  catdir)
-        sp4 = self._getSpectrum(list9[0],  catdir)
-        sp5 = self._getSpectrum(list10[0], catdir)
-        sp6 = self._getSpectrum(list11[0], catdir)
-        sp7 = self._getSpectrum(list12[0], catdir)
-        sp8 = self._getSpectrum(list13[0], catdir)
+        sp1, sp2, sp3, sp4, sp5, sp6, sp7, sp8 = [
+            self._getSpectrum(index.entry(row), catdir) for row in rows]
 
         spa1 = self._interpolateSpectrum(sp1, sp2, log_g)
         spa2 = self._interpolateSpectrum(sp3, sp4, log_g)
@@ -149,50 +338,46 @@ class Icat(spectrum.TabularSourceSpectrum):
         self.fluxunits = sp.fluxunits
         self.warnings = {}
 
-    def _getArgs(self, indices, filenames):
-        results = []
+    @classmethod
+    def batch(cls, catdir, Teff, metallicity, log_g):
+        """Interpolate many models from the `Atlas` of a catalog.
 
-        for i,index in enumerate(indices):
-            list1 = [float(x) for x in index.split(',')]
-            list1.append(filenames[i])
-            results.append(list1)
+        Parameters
+        ----------
+        catdir : {'ck04models', 'k93models', 'phoenix'}
+            Name of directory holding the catalogs.
 
-        return results
+        Teff, metallicity, log_g : number or array_like
+            Model parameters, broadcast against each other.
 
-    def _breakList(self, inList, index, parameter):
-        par = float(parameter)
+        Returns
+        -------
+        batch : `~pysynphot.batch.SpectrumBatch`
+            One spectrum per model, in catalog units.
 
-        array = [parameters[index] for parameters in inList]
-        array = N.array(array, dtype=N.float64)
+        Raises
+        ------
+        pysynphot.exceptions.ParameterOutOfBounds
+            A parameter value is out of bounds.
 
-        upperArray = array[array >= par]
-        lowerArray = array[array <= par]
+        """
+        from .batch import SpectrumBatch
 
-        if upperArray.size == 0:
-            maxAllowed = array.max()
-            s = "Parameter '%s' exceeds data. Max allowed=%f, entered=%f."
-            s = s % (self.parameter_names[index], maxAllowed, parameter)
-            raise exceptions.ParameterOutOfBounds(s)
+        Teff, metallicity, log_g = [
+            N.atleast_1d(a) for a in N.broadcast_arrays(
+                N.asarray(Teff, dtype=N.float64),
+                N.asarray(metallicity, dtype=N.float64),
+                N.asarray(log_g, dtype=N.float64))]
 
-        elif lowerArray.size == 0:
-            minAllowed = array.min()
-            s = "Parameter '%s' exceeds data. Min allowed=%f, entered=%f."
-            s = s % (self.parameter_names[index], minAllowed, parameter)
-            raise exceptions.ParameterOutOfBounds(s)
+        cat = Atlas.get(catdir)
+        flux = cat.interpolate(Teff, metallicity, log_g)
+        names = ["%s(Teff=%g,z=%g,logG=%g)" % (catdir, t, z, g)
+                 for t, z, g in zip(Teff, metallicity, log_g)]
 
-        upper = upperArray.min()
-        lower = lowerArray.max()
-
-        upperList = []
-        lowerList = []
-
-        for i,parameters in enumerate(inList):
-            if array[i] >= par and array[i] <= upper:
-                upperList.append(parameters)
-            if array[i] >= lower and array[i] <= par:
-                lowerList.append(parameters)
-
-        return upperList, lowerList
+        ans = SpectrumBatch(cat.wave, flux, names=names)
+        ans.convert(cat.waveunits.name)
+        ans.convert(cat.fluxunits.name)
+        return ans
 
     def _getSpectrum(self, parlist, basename):
         name = parlist[3]
@@ -233,3 +418,114 @@ class Icat(spectrum.TabularSourceSpectrum):
         result.append(sp)
 
         return result
+
+
+class Atlas(object):
+    """All the basis spectra of a catalog, sampled on a common
+    wavelength set, for fast interpolation of many models.
+
+    The catalog grids are not regular (the available :math:`\\log g`
+    depend on :math:`T_{\\textnormal{eff}}`, for instance), so the
+    spectra are stored as the rows of a 2D array in the order of the
+    catalog index, rather than as a 4D cube. Models are interpolated
+    between the same eight basis spectra, with the same weights, as
+    by `Icat`.
+
+    The arrays are stored in the on-disk table cache if it is enabled
+    (see `~pysynphot.Cache.set_disk_cache`), and memory-mapped from
+    there by later processes.
+
+    Use :meth:`get` to share the atlas of a catalog, which is kept in
+    ``pysynphot.Cache.ATLAS_CACHE``.
+
+    Parameters
+    ----------
+    catdir : {'ck04models', 'k93models', 'phoenix'}
+        Name of directory holding the catalogs.
+
+    Attributes
+    ----------
+    catdir : str
+        Same as input.
+
+    wave : array_like
+        Common wavelength set, in Angstrom: the union of the
+        wavelength sets of the basis spectra.
+
+    flux : array_like
+        Basis spectra in ``photlam``, one row per catalog entry.
+
+    waveunits, fluxunits : `~pysynphot.units.Units`
+        Catalog units for wavelength and flux.
+
+    """
+    def __init__(self, catdir):
+        from . import units
+
+        self.catdir = catdir
+        filename = locations.CAT_TEMPLATE.replace('*', catdir)
+        self.index = CatalogIndex.get(filename)
+
+        entry = Cache.disk_cache_load(filename, 'atlas')
+        if entry is None:
+            arrays, meta = self._load()
+            Cache.disk_cache_save(filename, 'atlas', arrays, meta)
+        else:
+            arrays, meta = entry
+
+        self.wave = arrays['wave']
+        self.flux = arrays['flux']
+        self.waveunits = units.Units(meta['waveunits'])
+        self.fluxunits = units.Units(meta['fluxunits'])
+
+    @classmethod
+    def get(cls, catdir):
+        """Return the atlas of a catalog, loading it on first use."""
+        if catdir not in ATLAS_CACHE:
+            ATLAS_CACHE[catdir] = cls(catdir)
+        return ATLAS_CACHE[catdir]
+
+    def _load(self):
+        """Read all the basis spectra of the catalog."""
+        icat = Icat.__new__(Icat)
+        spectra = [icat._getSpectrum(self.index.entry(i), self.catdir)[-1]
+                   for i in range(len(self.index))]
+
+        wave = spectra[0].GetWaveSet()
+        if not all(N.array_equal(sp.GetWaveSet(), wave) for sp in spectra):
+            wave = spectrum.MergeWaveSets(
+                *[sp.GetWaveSet() for sp in spectra])
+
+        flux = N.empty((len(spectra), len(wave)))
+        for i, sp in enumerate(spectra):
+            flux[i] = sp(wave)
+
+        meta = dict(waveunits=spectra[0].waveunits.name,
+                    fluxunits=spectra[0].fluxunits.name)
+        return dict(wave=wave, flux=flux), meta
+
+    def interpolate(self, Teff, metallicity, log_g):
+        """Interpolate models.
+
+        Parameters
+        ----------
+        Teff, metallicity, log_g : array_like
+            Model parameters, with the same length.
+
+        Returns
+        -------
+        flux : array_like
+            Fluxes in ``photlam`` on ``wave``, one row per model.
+
+        Raises
+        ------
+        pysynphot.exceptions.ParameterOutOfBounds
+            A parameter value is out of bounds.
+
+        """
+        rows, weights = self.index.bracket(Teff, metallicity, log_g)
+
+        flux = N.zeros((len(rows), len(self.wave)))
+        for k in range(8):
+            flux += weights[:, k, None] * self.flux[rows[:, k]]
+        return flux
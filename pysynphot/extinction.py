@@ -101,15 +101,22 @@ def _computeSMC(x):
 def _computeXgal(x):
     return 2.43 * ((0.011 * x - 0.198) * x + 1.509) * x
 
-# extinction curves are computed at load time, once and for all, on top
-# of the default wave set. Note that this is not thread safe.
+# extinction curves are computed on first use, once and for all, on top
+# of the default wave set at load time. Note that this is not thread safe.
 
 _waveset = _buildDefaultWaveset()
 
-_seaton  = _computeSeaton(_waveset)
-_lmc     = _computeLMC(_waveset)
-_smc     = _computeSMC(_waveset)
-_xgal    = _computeXgal(_waveset)
+_curves = {}
+_curvefuncs = {'seaton': _computeSeaton,
+               'lmc': _computeLMC,
+               'smc': _computeSMC,
+               'xgal': _computeXgal}
+
+
+def _getCurve(name):
+    if name not in _curves:
+        _curves[name] = _curvefuncs[name](_waveset)
+    return _curves[name]
 
 
 
@@ -143,9 +150,9 @@ class Gal1(_ExtinctionLaw):
     citation = 'Seaton 1979 (MNRAS 187:75)'
     name = 'gal1'
     def __init__(self, extval):
-        global _seaton
         self._wavetable = _waveset.copy()
-        self.transparencytable = self._computeTransparency(extval, _seaton)
+        self.transparencytable = self._computeTransparency(
+            extval, _getCurve('seaton'))
 
 
 class Gal2(_ExtinctionLaw):
@@ -189,9 +196,9 @@ class Smc(_ExtinctionLaw):
     citation='Prevot et al.1984 (A&A 132:389)'
     name='SMC'
     def __init__(self, extval):
-        global _smc
         self._wavetable = _waveset.copy()
-        self.transparencytable = self._computeTransparency(extval, _smc)
+        self.transparencytable = self._computeTransparency(
+            extval, _getCurve('smc'))
 
 
 class Lmc(_ExtinctionLaw):
@@ -220,9 +227,9 @@ class Lmc(_ExtinctionLaw):
     name='LMC'
     def __init__(self, extval):
         self.name = 'LMC'
-        global _lmc
         self._wavetable = _waveset.copy()
-        self.transparencytable = self._computeTransparency(extval, _lmc)
+        self.transparencytable = self._computeTransparency(
+            extval, _getCurve('lmc'))
 
 
 class Xgal(_ExtinctionLaw):
@@ -250,9 +257,9 @@ class Xgal(_ExtinctionLaw):
     citation = 'Calzetti, Kinney and Storchi-Bergmann, 1994 (ApJ 429:582)'
     name='XGAL'
     def __init__(self, extval):
-        global _xgal
         self._wavetable = _waveset.copy()
-        self.transparencytable = self._computeTransparency(extval, _xgal)
+        self.transparencytable = self._computeTransparency(
+            extval, _getCurve('xgal'))
 
 
 reddeningClasses = {'gal1': Gal1,
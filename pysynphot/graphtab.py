@@ -42,6 +42,121 @@ class GraphNode(object):
     def get_named(self,kwd):
         return self.named[kwd]
 
+class CompiledGraph(object):
+    """Graph table compiled into a hashed adjacency structure, so that
+    resolving an obsmode costs a few dictionary look-ups per node
+    instead of scans of the table columns.
+
+    ``nodes`` maps each innode to a dict of
+    ``keyword -> [(outnode, compname, thcompname), ...]``, in table
+    order. The ``'default'`` keyword is stored like any other.
+    Component names are kept as in the table (``'clear'`` included),
+    as `pysynphot.tables.GraphTable` returns them.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def add_row(self, keyword, innode, outnode, compname, thcompname):
+        """Add one graph table row. Keywords are matched in lower case."""
+        node = self.nodes.setdefault(int(innode), {})
+        node.setdefault(keyword.lower(), []).append(
+            (int(outnode), compname, thcompname))
+
+    def order_matters(self, modes):
+        """Return `True` if more than one of ``modes`` is a keyword at
+        the same node. Only then does the order of the keywords change
+        the result of :meth:`resolve`.
+        """
+        modes = set(modes)
+        for node in self.nodes.values():
+            if len(modes.intersection(node)) > 1:
+                return True
+        return False
+
+    def resolve(self, modes, innode=1, debug=False):
+        """Obtain optical and thermal component names for the given
+        obsmode keywords, starting from ``innode``.
+
+        This has the same behavior as
+        :meth:`pysynphot.tables.GraphTable.GetComponentsFromGT`:
+        at each node the default entry is taken unless one of the
+        keywords matches (the last one in ``modes`` wins), and the
+        traversal ends at a node that is not in the table.
+
+        Raises
+        ------
+        KeyError
+            More than one entry for a keyword used at a node.
+
+        ValueError
+            Incomplete obsmode or unused keyword(s).
+        """
+        components = []
+        thcomponents = []
+        outnode = 0
+        used_modes = set()
+        used_default = False
+        count = 0
+
+        while outnode >= 0:
+            previous_outnode = outnode
+
+            node = self.nodes.get(innode)
+            if node is None:
+                if debug:
+                    print("no such innode %d: stop condition"%innode)
+                break
+
+            entries = node.get('default')
+            if entries:
+                outnode, component, thcomponent = entries[0]
+                used_default = True
+            else:
+                # There's no default, so fail if you don't match anything
+                # in the keyword matching step.
+                outnode = -2
+                component = thcomponent = None
+
+            for mode in modes:
+                entries = node.get(mode)
+                if entries:
+                    used_modes.add(mode)
+                    if len(entries) > 1:
+                        raise KeyError('%d matches found for %s'%(len(entries),mode))
+                    outnode, component, thcomponent = entries[0]
+                    used_default = False
+
+            if debug:
+                print("Innode %d  Outnode %d  Compname %s"%(innode, outnode, component))
+            components.append(component)
+            thcomponents.append(thcomponent)
+
+            innode = outnode
+
+            if outnode == previous_outnode:
+                if debug:
+                    print("Innode: %d  Outnode:%d  Used default: %s"%(innode, outnode,used_default))
+                count += 1
+                if count > 3:
+                    if debug:
+                        print("same outnode %d > 3 times: stop condition"%outnode)
+                    break
+
+        if outnode < 0:
+            if debug:
+                print("outnode == %d: stop condition"%outnode)
+            raise ValueError("Incomplete obsmode %s"%str(modes))
+
+        # Check for unused modes
+        inmodes = set(modes)
+        if inmodes != used_modes:
+            unused=str(inmodes.difference(used_modes))
+            raise ValueError("Warning: unused keywords %s"%unused)
+
+        return (components, thcomponents)
+
+
 class GraphPath(object):
     """Simple class containing the result of a traversal of the GraphTable"""
 
@@ -32,6 +32,7 @@ from __future__ import division
 import glob
 import os
 import re
+import threading
 import warnings
 
 from astropy.io import fits as pyfits
@@ -87,6 +88,14 @@ def get_data_filename(filename):
     """
     global _data_map
 
+    # Most look-ups are for the few files directly under the top-level
+    # directories, which do not need the full walk.
+    if _data_map is None:
+        for subdir in ('generic', 'wavecat'):
+            path = os.path.join(specdir, subdir, filename)
+            if os.path.isfile(path):
+                return path
+
     if _data_map is None:
         _data_map = {}
         for root, dirs, files in os.walk(specdir):
@@ -140,11 +149,57 @@ def _refTable(template):
                                                      template)
         raise IOError(msg)
 
-RedLaws = {}
+# Held while a _LazyDict is filled in, so that other threads wait for it.
+_lazy_lock = threading.RLock()
+
 
-def _get_RedLaws():
-    global RedLaws
+class _LazyDict(dict):
+    """Dictionary that is filled in by ``loader(self)`` the first time
+    its contents are used, so that the work is not done on import.
 
+    """
+    def __init__(self, loader):
+        dict.__init__(self)
+        self._loader = loader
+        self._loading = False
+
+    def _load(self):
+        if self._loader is None:
+            return
+        with _lazy_lock:
+            # The loader fills in the dictionary through the methods
+            # that call this, so it is not run again from within.
+            if self._loader is None or self._loading:
+                return
+            self._loading = True
+            try:
+                self._loader(self)
+                self._loader = None
+            finally:
+                self._loading = False
+
+
+def _loadFirst(name):
+    method = getattr(dict, name)
+
+    def wrapper(self, *args, **kwargs):
+        self._load()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+for _name in ('__contains__', '__delitem__', '__eq__', '__getitem__',
+              '__iter__', '__len__', '__ne__', '__repr__', '__setitem__',
+              'copy', 'get', 'items', 'keys', 'pop', 'popitem',
+              'setdefault', 'update', 'values'):
+    setattr(_LazyDict, _name, _loadFirst(_name))
+del _name
+
+
+def _get_RedLaws(RedLaws):
     extdir = os.path.join(rootdir, EXTDIR)
 
     # get all the fits files in EXTDIR
@@ -168,8 +223,12 @@ def _get_RedLaws():
 
         RedLaws[key.lower()] = lawf
 
-# load the extintion law file names
-_get_RedLaws()
+    if 'mwavg' in RedLaws:
+        RedLaws[None] = RedLaws['mwavg']  # Establishes default
+        RedLaws['gal3'] = RedLaws['mwavg']  # Temporary: for syn_pysyn testing
+
+# the extinction law file names are looked up on first use
+RedLaws = _LazyDict(_get_RedLaws)
 
 
 
@@ -6,9 +6,11 @@ from .observationmode import ObservationMode
 from .spectrum import CompositeSpectralElement, TabularSpectralElement
 from . import units
 from . import exceptions
+from . import Cache
 
 
-def ObsBandpass(obstring, graphtable=None, comptable=None, component_dict={}):
+def ObsBandpass(obstring, graphtable=None, comptable=None, component_dict=None,
+                prefix_dict=None):
     """Generate a bandpass object from observation mode.
 
     If the bandpass consists of multiple throughput files
@@ -28,6 +30,9 @@ def ObsBandpass(obstring, graphtable=None, comptable=None, component_dict={}):
     graphtable, comptable, component_dict
         See `~pysynphot.observationmode.ObservationMode`.
 
+    prefix_dict : dict-like or `None`
+        See `ObsModeBandpass`.
+
     Returns
     -------
     bp : `~pysynphot.spectrum.TabularSpectralElement` or `ObsModeBandpass`
@@ -43,11 +48,53 @@ def ObsBandpass(obstring, graphtable=None, comptable=None, component_dict={}):
     ob=ObservationMode(obstring,graphtable=graphtable,
                        comptable=comptable,component_dict=component_dict)
     if len(ob) > 1:
-        return ObsModeBandpass(ob)
+        return ObsModeBandpass(ob, prefix_dict=prefix_dict)
     else:
         return TabularSpectralElement(ob.components[0].throughput_name)
 
 
+def _tabulate(product):
+    """Tabulate a throughput product on its own wavelength set, as in
+    :meth:`~pysynphot.observationmode.ObservationMode.Throughput`."""
+    thru = TabularSpectralElement()
+    thru._wavetable = product.GetWaveSet()
+    thru._throughputtable = product(thru._wavetable)
+    thru.waveunits = product.waveunits
+    thru.throughputunits = 'none'
+    thru.name = str(product)
+    thru.warnings = dict(product.warnings)
+    return thru
+
+
+def _chainPrefix(components, prefix_dict):
+    """Return the product of the throughputs of ``components``.
+
+    The longest leading run of components whose product is in
+    ``prefix_dict`` is taken from there. The remaining components are
+    multiplied in one at a time, and each new partial product is
+    tabulated and stored in ``prefix_dict``.
+
+    """
+    keys = tuple((c.throughput_name, c.interpval) for c in components)
+
+    n = len(components)
+    product = None
+    while n > 1:
+        product = prefix_dict.get(keys[:n])
+        if product is not None:
+            break
+        n -= 1
+
+    if product is None:
+        product = components[0].throughput
+
+    for i in range(n, len(components)):
+        product = _tabulate(product * components[i].throughput)
+        prefix_dict[keys[:i+1]] = product
+
+    return product
+
+
 class ObsModeBandpass(CompositeSpectralElement):
     """Bandpass instantiated from an ``obsmode`` string.
     Also see :ref:`pysynphot-obsmode-bandpass`, :ref:`pysynphot-appendixb`,
@@ -58,6 +105,14 @@ class ObsModeBandpass(CompositeSpectralElement):
     ob : str
         Observation mode.
 
+    prefix_dict : dict-like or `None`
+        Maps the ``(throughput_name, interpval)`` pairs of the first
+        components of an observation mode to their product, tabulated on
+        its wavelength set. Observation modes that start with the same
+        components share these products, so only the remaining
+        components are multiplied in. If `None`,
+        ``pysynphot.Cache.PREFIX_PRODUCT_CACHE`` is used.
+
     Attributes
     ----------
     obsmode, name
@@ -102,12 +157,12 @@ class ObsModeBandpass(CompositeSpectralElement):
     # Instantiate a COmpositeSpectralElement by means of an
     # ObservationMode (which the caller must have already created from
     # an  obstring
-    def __init__(self,ob):
-        #Chain the individual components
-        chain=ob.components[0].throughput*ob.components[1].throughput
+    def __init__(self, ob, prefix_dict=None):
+        if prefix_dict is None:
+            prefix_dict = Cache.PREFIX_PRODUCT_CACHE
 
-        for i in range(2,len(ob)-1):
-            chain = chain*ob.components[i].throughput
+        #Chain the individual components
+        chain = _chainPrefix(ob.components[:-1], prefix_dict)
 
         CompositeSpectralElement.__init__(self,chain,
                                           ob.components[-1].throughput)
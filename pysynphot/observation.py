@@ -7,6 +7,7 @@ from __future__ import division
 import numpy as np
 import math
 
+from . import refs
 from . import spectrum
 from . import units
 from . import binning
@@ -14,13 +15,7 @@ from . import exceptions
 
 from .obsbandpass import pixel_range, wave_range
 from .spectrum import ArraySourceSpectrum
-
-
-try:
-    import pysynphot_utils
-    utils_imported = True
-except ImportError:
-    utils_imported = False
+from .batch import SpectrumBatch, trapz_rows
 
 
 def check_overlap(a, b):
@@ -208,6 +203,13 @@ class Observation(spectrum.CompositeSourceSpectrum):
         Input spectra have different telescope areas defined.
 
     """
+    def __new__(cls, spec=None, *args, **kwargs):
+        # A batch of spectra gives a batch of observations, so that
+        # existing code computes count rates for all of them at once.
+        if cls is Observation and isinstance(spec, SpectrumBatch):
+            return BatchObservation(spec, *args, **kwargs)
+        return super(Observation, cls).__new__(cls)
+
     def __init__(self,spec,band,binset=None,force=None):
         self.spectrum = spec
         self.bandpass = band
@@ -233,6 +235,27 @@ class Observation(spectrum.CompositeSourceSpectrum):
         self.initbinset(binset)
         #self.initbinflux()
 
+    def _mergeWaveSet(self):
+        """Merge the wavelength sets of the spectrum and bandpass.
+        With adaptive sampling (see
+        :func:`~pysynphot.refs.set_adaptive_waveset`), the sampling of
+        analytic sources is clipped to where the bandpass is non-zero.
+
+        """
+        support = None
+        if refs._waveset_tolerance is not None:
+            support = self.bandpass._support()
+        if support is None:
+            return spectrum.CompositeSourceSpectrum._mergeWaveSet(self)
+
+        wavesets = []
+        for comp, clip in ((self.spectrum, support), (self.bandpass, None)):
+            if isinstance(comp, spectrum.CompositeCache):
+                comp._collectWaveSets(wavesets, clip)
+            else:
+                wavesets.append(spectrum._leafWaveSet(comp, clip))
+        return spectrum.MergeWaveSets(*wavesets)
+
     def validate_overlap(self,force):
         """Validate that spectrum and bandpass overlap.
         Warnings are stored in ``self.warnings``.
@@ -297,52 +320,56 @@ class Observation(spectrum.CompositeSourceSpectrum):
             Assumes that the wavelength values in the binned
             wavelength set are the *centers* of the bins.
 
-            Uses ``pysynphot.pysynphot_utils.calcbinflux()`` C-extension,
-            if available, for binned flux calculation.
+            Uses :func:`~pysynphot.binning.get_rebin_plan`
+            for binned flux calculation.
 
         """
-        endpoints = binning.calculate_bin_edges(self.binwave)
+        # The merged waveset, edge indices and weights only depend on the
+        # natural waveset and the binset, so they are shared between
+        # observations through a cached rebinning plan.
+        plan = binning.get_rebin_plan(self.wave, self.binwave)
+        endpoints = plan.edges
+        spwave = plan.wave
+
+        self._indices = plan.indices[:-1]
+        self._indices_last = plan.indices[1:]
+        self._deltaw = spwave[1:] - spwave[:-1]
 
-        # merge these endpoints in with the natural waveset
-        spwave = spectrum.MergeWaveSets(self.wave, endpoints)
-        spwave = spectrum.MergeWaveSets(spwave,self.binwave)
+        #Save the endpoints for future use
+        self._bin_edges = endpoints
+        self._intwave = plan.intwave
 
-        # compute indices associated to each endpoint.
-        indices = np.searchsorted(spwave, endpoints)
-        self._indices = indices[:-1]
-        self._indices_last = indices[1:]
+        # sum over each bin. This is set last because it marks the
+        # binned data as ready.
+        self._binflux = plan.rebin(self(spwave))
 
-        # prepare integration variables.
-        flux = self(spwave)
-        avflux = (flux[1:] + flux[:-1]) / 2.0
-        self._deltaw = spwave[1:] - spwave[:-1]
+    def getBinArrays(self, fluxunits=None):
+        """Return binned wavelength and flux arrays.
 
-        # sum over each bin.
-        if utils_imported is True:
-            self._binflux, self._intwave = \
-              pysynphot_utils.calcbinflux(len(self.binwave),
-                                          self._indices,
-                                          self._indices_last,
-                                          avflux,
-                                          self._deltaw)
-        else:
-            #Note that, like all Python striding, the range over which
-            #we integrate is [first:last).
-            self._binflux = np.empty(shape=self.binwave.shape,dtype=np.float64)
-            self._intwave = np.empty(shape=self.binwave.shape,dtype=np.float64)
-            for i in range(len(self._indices)):
-                first = self._indices[i]
-                last = self._indices_last[i]
-                self._binflux[i]=(avflux[first:last]*self._deltaw[first:last]).sum()/self._deltaw[first:last].sum()
-                self._intwave[i]=self._deltaw[first:last].sum()
+        This is the binned counterpart of
+        :meth:`~pysynphot.spectrum.SourceSpectrum.getArrays`, and it
+        does not change ``self.fluxunits`` either.
 
-        #Save the endpoints for future use
-        self._bin_edges = endpoints
+        Parameters
+        ----------
+        fluxunits : str or `None`
+            Flux unit. If `None`, ``self.fluxunits`` is used.
 
-    def _getBinfluxProp(self):
+        Returns
+        -------
+        binwave : array_like
+            Binned wavelength set, as ``self.binwave``.
+
+        binflux : array_like
+            Binned flux in ``fluxunits``.
+
+        """
         if self._binflux is None:
             self.initbinflux()
 
+        if fluxunits is None:
+            fluxunits = self.fluxunits
+
         if hasattr(self.bandpass, 'primary_area'):
             area = self.bandpass.primary_area
         else:
@@ -350,8 +377,12 @@ class Observation(spectrum.CompositeSourceSpectrum):
 
         binflux = units.Photlam().Convert(self.binwave,
                                           self._binflux,
-                                          self.fluxunits.name,
+                                          units.Units(fluxunits).name,
                                           area=area)
+        return self.binwave, binflux
+
+    def _getBinfluxProp(self):
+        binwave, binflux = self.getBinArrays()
         return binflux
 
     def _getBinwaveProp(self):
@@ -471,8 +502,6 @@ class Observation(spectrum.CompositeSourceSpectrum):
         if self._binflux is None:
           self.initbinflux()
 
-        myfluxunits = self.fluxunits.name
-        self.convert('counts')
         warn=False
         if binned:
             #No range specified - use full range
@@ -499,16 +528,17 @@ class Observation(spectrum.CompositeSourceSpectrum):
                     ux=np.searchsorted(self._bin_edges,range[1])
 
 
-            ans = self.binflux[lx:ux].sum()
+            binwave, binflux = self.getBinArrays('counts')
+            ans = binflux[lx:ux].sum()
             if warn and not force:
                 raise exceptions.PartialOverlap("%s does not fully overlap binwave range %s. Countrate in overlap area is %f"%(range,[self.binwave[0],self.binwave[-1]],ans))
 
         else:
             if range is None:
-                ans = self.flux.sum()
+                wave, flux = self.getArrays(fluxunits='counts')
+                ans = flux.sum()
             else:
                 raise NotImplementedError("Sorry, range+binned=False not yet implemented")
-        self.convert(myfluxunits)
         return ans
 
     def effstim(self,fluxunits='photlam'):
@@ -533,30 +563,33 @@ class Observation(spectrum.CompositeSourceSpectrum):
             Invalid integrated flux.
 
         """
-        oldunits=self.fluxunits
-        self.convert(fluxunits)
         x=units.Units(fluxunits)
-        try:
-            if x.isDensity:
-                rate=self.integrate()
-                self._fluxcheck(rate)
-                if x.isMag:
-                    ans=x.unitResponse(self.bandpass) - 2.5*math.log10(rate)
-                else:
-                    ans=rate*x.unitResponse(self.bandpass)
+        if x.isDensity:
+            # Analytic sources through piecewise-constant bandpasses are
+            # integrated in closed form if the unit response can be too,
+            # so that both are computed the same way.
+            rate = None
+            if x.StdSpectrum.isAnalytic:
+                rate=spectrum._analyticIntegral(self)
+            analytic = rate is not None
+            if not analytic:
+                rate=self.integrate(analytic=False)
+            self._fluxcheck(rate)
+            if x.isMag:
+                ans=x.unitResponse(self.bandpass, analytic) - 2.5*math.log10(rate)
             else:
-                if x.isMag:
-                    #its linear unit must be counts
-                    self.convert('counts')
-                    total=self.flux.sum()
-                    self._fluxcheck(total)
-                    ans=-2.5*math.log10(total)
-                else:
-                    ans=self.flux.sum()
-                    self._fluxcheck(ans)
-        finally:
-            self.convert(oldunits)
-            del x
+                ans=rate*x.unitResponse(self.bandpass, analytic)
+        else:
+            if x.isMag:
+                #its linear unit must be counts
+                wave, flux = self.getArrays(fluxunits='counts')
+                total=flux.sum()
+                self._fluxcheck(total)
+                ans=-2.5*math.log10(total)
+            else:
+                wave, flux = self.getArrays(fluxunits=x)
+                ans=flux.sum()
+                self._fluxcheck(ans)
 
         return ans
 
@@ -624,18 +657,13 @@ class Observation(spectrum.CompositeSourceSpectrum):
             Effective wavelength.
 
         """
-        myfluxunits=self.fluxunits.name
-        self.convert('flam')
         if binned:
-            wave=self.binwave
-            flux=self.binflux
+            wave, flux = self.getBinArrays('flam')
         else:
-            wave=self.wave
-            flux=self.flux
+            wave, flux = self.getArrays(fluxunits='flam')
 
         num = self.trapezoidIntegration(wave,flux*wave*wave)
         den = self.trapezoidIntegration(wave,flux*wave)
-        self.convert(myfluxunits)
 
         if num == 0.0 or den == 0.0:
             return 0.0
@@ -678,12 +706,6 @@ class Observation(spectrum.CompositeSourceSpectrum):
         if fluxunits != 'counts':
             s = "Sorry, only counts are supported at this time"
             raise NotImplementedError(s)
-        else:
-            #Save current fluxunits, in case they're different
-            saveunits = None
-            if not units.ismatch('counts', self.fluxunits):
-                saveunits = self.fluxunits
-                self.convert('counts')
 
 
         if binned:
@@ -698,7 +720,8 @@ class Observation(spectrum.CompositeSourceSpectrum):
                 #idx[-1] is the largest edge that is still smaller
                 #than swave
                 try:
-                    ans = self.binflux[idx[-1]]
+                    binwave, binflux = self.getBinArrays('counts')
+                    ans = binflux[idx[-1]]
                 except IndexError:
                     s = 'Value out of range: wavelength %g not contained in range [%g, %g]'
                     s = s % (swave, self.binwave[0], self.binwave[-1])
@@ -711,18 +734,15 @@ class Observation(spectrum.CompositeSourceSpectrum):
 
         else:
             #Then we do interpolate on wave/flux
+            wave, flux = self.getArrays(fluxunits='counts')
             if np.isscalar(swave):
                 delta = 0.00001
                 wv = np.array([swave - delta, swave, swave + delta])
-                ans = np.interp(wv, self.wave, self.flux)[1]
+                ans = np.interp(wv, wave, flux)[1]
             else:
                 # This raises UnboundLocalError -- needs to be fixed!
-                ans = np.interp(wv, self.wave, self.flux)
-
+                ans = np.interp(wv, wave, flux)
 
-        #Change units back, if necessary, then return
-        if saveunits is not None:
-            self.convert(saveunits)
         return ans
 
     def pixel_range(self, waverange, waveunits=None, round='round'):
@@ -861,3 +881,190 @@ class Observation(spectrum.CompositeSourceSpectrum):
                                      keepneg = True)
 
         return result
+
+
+class BatchObservation(object):
+    """Class to handle the observations of a
+    `~pysynphot.batch.SpectrumBatch` through one bandpass.
+
+    This is what `Observation` returns when given a batch of spectra.
+    The product of all the spectra and the bandpass is kept as one
+    (N, nwave) array, and binned with a single shared
+    `~pysynphot.binning.RebinPlan`, so count rates and effective
+    stimuli are computed for all the spectra at once.
+
+    Parameters
+    ----------
+    spec : `~pysynphot.batch.SpectrumBatch`
+        Source spectra.
+
+    band : `~pysynphot.spectrum.SpectralElement`
+        Bandpass.
+
+    binset, force
+        See `Observation`.
+
+    Attributes
+    ----------
+    spectrum, bandpass, binset
+        Same as inputs, except that ``spectrum`` might be tapered.
+
+    warnings : dict
+        To store warnings.
+
+    primary_area : number or `None`
+        :ref:`pysynphot-area` of the telescope, from either input.
+
+    waveunits, fluxunits : `~pysynphot.units.Units`
+        User units inherited from source spectra.
+
+    wave, flux : array_like
+        Native dataset in user units; ``flux`` has one row per spectrum.
+
+    binwave, binflux : array_like
+        Binned dataset; ``binflux`` has one row per spectrum.
+
+    """
+    def __init__(self, spec, band, binset=None, force=None):
+        self.spectrum, self.bandpass, self.warnings = \
+            validate_overlap(spec, band, force)
+        self.binset = binset
+
+        self.primary_area = getattr(self.bandpass, 'primary_area', None)
+        if self.primary_area is None:
+            self.primary_area = self.spectrum.primary_area
+
+        self.waveunits = self.spectrum.waveunits
+        self.fluxunits = self.spectrum.fluxunits
+        self.name = '(%s * %s)' % (str(self.spectrum), str(self.bandpass))
+
+        self._wavetable = spectrum.MergeWaveSets(
+            self.spectrum.GetWaveSet(), self.bandpass.GetWaveSet())
+        self._fluxtable = (self.spectrum(self._wavetable) *
+                           self.bandpass(self._wavetable))
+        self._binflux = None
+
+        self.initbinset(binset)
+
+    def initbinset(self, binset=None):
+        """Set ``self.binwave``, as in :meth:`Observation.initbinset`."""
+        if binset is None:
+            try:
+                binset = self.bandpass.binset
+            except (KeyError, AttributeError):
+                binset = None
+            if binset is None:
+                print("(%s) does not have a defined binset in the wavecat "
+                      "table. The waveset of the spectrum will be used "
+                      "instead." % str(self.bandpass))
+                binset = self.spectrum.wave
+        self.binwave = binset
+
+    def __len__(self):
+        return self._fluxtable.shape[0]
+
+    def __str__(self):
+        return self.name
+
+    def convert(self, targetunits):
+        """Set new user unit, for either wavelength or flux.
+
+        Parameters
+        ----------
+        targetunits : str
+            New unit name, as accepted by `~pysynphot.units.Units`.
+
+        """
+        nunits = units.Units(targetunits)
+
+        if nunits.isFlux:
+            self.fluxunits = nunits
+        else:
+            self.waveunits = nunits
+
+    def _convertFlux(self, wave, flux, fluxunits):
+        return units.Photlam().Convert(wave, flux, fluxunits,
+                                       area=self.primary_area)
+
+    def _getWaveProp(self):
+        return units.Angstrom().Convert(self._wavetable, self.waveunits.name)
+
+    def _getFluxProp(self):
+        return self._convertFlux(self._wavetable, self._fluxtable,
+                                 self.fluxunits.name)
+
+    def _getBinfluxProp(self):
+        if self._binflux is None:
+            plan = binning.get_rebin_plan(self._wavetable, self.binwave)
+            self._binflux = plan.rebin(
+                self.spectrum(plan.wave) * self.bandpass(plan.wave))
+        return self._convertFlux(self.binwave, self._binflux,
+                                 self.fluxunits.name)
+
+    wave = property(_getWaveProp, doc='Wavelength property.')
+    flux = property(_getFluxProp, doc='Flux property.')
+    binflux = property(_getBinfluxProp, doc='Flux of binned wavelength set.')
+
+    def countrate(self, binned=True):
+        """Calculate effective stimulus in count/s of every spectrum,
+        as in :meth:`Observation.countrate` without a range.
+
+        Parameters
+        -----------
+        binned : bool
+            If `True` (default), use binned data.
+            Otherwise, use native data.
+
+        Returns
+        -------
+        ans : array_like
+            Count rate of each spectrum.
+
+        """
+        if binned:
+            self.binflux
+            counts = self._convertFlux(self.binwave, self._binflux, 'counts')
+        else:
+            counts = self._convertFlux(self._wavetable, self._fluxtable,
+                                       'counts')
+        return counts.sum(axis=1)
+
+    def effstim(self, fluxunits='photlam'):
+        """Compute :ref:`effective stimulus <pysynphot-formula-effstim>`
+        of every spectrum, as in :meth:`Observation.effstim`.
+
+        Parameters
+        ----------
+        fluxunits : str
+            Flux unit.
+
+        Returns
+        -------
+        ans : array_like
+            Effective stimulus of each spectrum. It is NaN where the
+            integrated flux is zero, negative, NaN, or infinite.
+
+        """
+        x = units.Units(fluxunits)
+
+        if x.isDensity:
+            # Same as integrate() on an Observation, which is always
+            # done in photlam.
+            rate = trapz_rows(self.wave, self._fluxtable)
+        else:
+            rate = self._convertFlux(self._wavetable, self._fluxtable,
+                                     'counts').sum(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.where(np.isfinite(rate) & (rate > 0), rate, np.nan)
+            if x.isDensity:
+                if x.isMag:
+                    ans = x.unitResponse(self.bandpass) - 2.5 * np.log10(rate)
+                else:
+                    ans = rate * x.unitResponse(self.bandpass)
+            elif x.isMag:
+                ans = -2.5 * np.log10(rate)
+            else:
+                ans = rate
+
+        return ans
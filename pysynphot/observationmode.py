@@ -23,6 +23,7 @@ from astropy.io import fits as pyfits
 
 from . import refs
 from . import spectrum
+from . import Cache
 from . import units
 from . import locations
 from .locations import irafconvert
@@ -42,6 +43,62 @@ wavecat = locations.wavecat
 CLEAR = 'clear'
 
 
+#Marks OBSMODE_CACHE entries whose keyword order matters
+_ORDERED = 'ordered'
+
+
+class _ResolvedObsmode(object):
+    """Graph table and wavelength table look-ups for one obsmode,
+    shared by all `BaseObservationMode` objects with the same keywords.
+
+    Parameters
+    ----------
+    gt : `~pysynphot.tables.GraphTable`
+        Graph table.
+
+    modes : list of str
+        Keywords, as in `BaseObservationMode`.
+
+    obm : str
+        Lower case obsmode for ``pysynphot.wavetable.wavetable``.
+
+    Attributes
+    ----------
+    compnames, thcompnames : tuple of str
+        Optical and thermal component names.
+
+    primary_area : number or `None`
+        Primary area from the graph table, if it has one.
+
+    binset, binset_warning : str or `None`
+        Optimal wavelength set, or the reason why it is ambiguous.
+
+    filenames : dict
+        Maps ``(component table name, component names)`` to the
+        resolved throughput or thermal filenames.
+
+    """
+    def __init__(self, gt, modes, obm):
+        compnames, thcompnames = gt.GetComponentsFromGT(modes,1)
+        self.compnames = tuple(compnames)
+        self.thcompnames = tuple(thcompnames)
+
+        self.primary_area = getattr(gt, 'primary_area', None)
+
+        self.binset = None
+        self.binset_warning = None
+        try:
+            self.binset = wavetable.wavetable[obm]
+        except KeyError as e:
+            #If zero candidates were found, that's ok.
+            pass
+        except ValueError as e:
+            #wavetable will raise a ValueError if the key was ambiguous
+            self.binset_warning = str(e)
+
+        self.filenames = {}
+
+
 class BaseObservationMode(object):
     """Class that handles the graph table, common to both optical and
     thermal observation modes. Also see :ref:`pysynphot-appendixc`.
@@ -115,10 +172,13 @@ class BaseObservationMode(object):
 
         self.gtname = graphtable
 
-        self.compnames, self.thcompnames = gt.GetComponentsFromGT(self.modes,1)
+        self._resolved = self._getResolved(gt)
 
-        if hasattr(gt, 'primary_area'):
-            self.primary_area = gt.primary_area
+        self.compnames = list(self._resolved.compnames)
+        self.thcompnames = list(self._resolved.thcompnames)
+
+        if self._resolved.primary_area is not None:
+            self.primary_area = self._resolved.primary_area
         else:
             self.primary_area = refs.PRIMARY_AREA
 
@@ -129,16 +189,10 @@ class BaseObservationMode(object):
         self.components = None #Will be filled by subclasses
         self.pixscale = None
 
-        obm=self._obsmode.lower()
-
-        try:
-            self.binset = wavetable.wavetable[obm]
-        except KeyError as e:
-            #If zero candidates were found, that's ok.
-            pass
-        except ValueError as e:
-            #wavetable will raise a ValueError if the key was ambiguous
-            print("Warning, %s"%str(e))
+        if self._resolved.binset is not None:
+            self.binset = self._resolved.binset
+        elif self._resolved.binset_warning is not None:
+            print("Warning, %s"%self._resolved.binset_warning)
 
     def __str__(self):
         return self._obsmode
@@ -146,20 +200,51 @@ class BaseObservationMode(object):
     def __len__(self):
         return len(self.components)
 
+    def _getResolved(self, gt):
+        """Look up the graph table results for this obsmode in
+        ``pysynphot.Cache.OBSMODE_CACHE``, resolving them on a miss.
+
+        The cache is keyed on the sorted keywords, without the values of
+        parameterized keywords, because neither changes the look-up.
+        The keyword order is only kept when two keywords are at the same
+        graph table node, where the last one wins.
+
+        """
+        key = (self.gtname, tuple(sorted(set(self.modes))))
+        resolved = Cache.OBSMODE_CACHE.get(key)
+        if resolved is _ORDERED:
+            key = (self.gtname, tuple(self.modes))
+            resolved = Cache.OBSMODE_CACHE.get(key)
+
+        if resolved is None:
+            resolved = _ResolvedObsmode(gt, self.modes, self._obsmode.lower())
+            if gt.compiled.order_matters(self.modes):
+                Cache.OBSMODE_CACHE[key] = _ORDERED
+                key = (self.gtname, tuple(self.modes))
+            Cache.OBSMODE_CACHE[key] = resolved
+
+        return resolved
+
     def _getFileNames(self, comptable, compnames):
+        cachekey = (comptable.name, tuple(compnames))
+        try:
+            return list(self._resolved.filenames[cachekey])
+        except KeyError:
+            pass
+
         files = []
         for compname in compnames:
             if compname not in [None, '', CLEAR]:
-                index = N.where(comptable.compnames == compname)
                 try:
-                    iraffilename = comptable.filenames[index[0][0]]
-                    filename = irafconvert(iraffilename)
-                    files.append(filename.lstrip())
-                except IndexError:
+                    iraffilename = comptable.compdict[compname.rstrip()]
+                except KeyError:
                     raise IndexError("Can't find %s in comptable %s"%(compname,comptable.name))
+                filename = irafconvert(iraffilename)
+                files.append(filename.lstrip())
             else:
                 files.append(CLEAR)
 
+        self._resolved.filenames[cachekey] = tuple(files)
         return files
 
     def GetFileNames(self):
@@ -261,8 +346,9 @@ class ObservationMode(BaseObservationMode):
     comptable : str or `None`
         Component table name. If `None`, it is taken from `~pysynphot.refs`.
 
-    component_dict : dict
-        Maps component filename to corresponding component object.
+    component_dict : dict-like or `None`
+        Maps ``(throughput_name, interpval)`` to corresponding component
+        object. If `None`, ``pysynphot.Cache.COMPONENT_CACHE`` is used.
 
     Attributes
     ----------
@@ -297,7 +383,7 @@ class ObservationMode(BaseObservationMode):
 
     """
     def __init__(self, obsmode, method='HSTGraphTable',graphtable=None,
-                 comptable=None, component_dict = {}):
+                 comptable=None, component_dict=None):
 
         if graphtable is None:
             graphtable = refs.GRAPHTABLE
@@ -315,6 +401,9 @@ class ObservationMode(BaseObservationMode):
 
         self.ctname = comptable
 
+        if component_dict is None:
+            component_dict = Cache.COMPONENT_CACHE
+
         self._throughput_filenames = self._getFileNames(ct, self.compnames)
 
         self.components = self._getOpticalComponents(self._throughput_filenames,
@@ -329,12 +418,13 @@ class ObservationMode(BaseObservationMode):
             else:
                 parkey=None
 
-            if (throughput_name, self.pardict.get(parkey)) in component_dict.keys():
-              component = component_dict[(throughput_name, self.pardict.get(parkey))]
-            else:
-              component = _Component(throughput_name,
-                                     interpval=self.pardict.get(parkey))
-              component_dict[(throughput_name, self.pardict.get(parkey))] = component
+            key = (throughput_name, self.pardict.get(parkey))
+            try:
+                component = component_dict[key]
+            except KeyError:
+                component = _Component(throughput_name,
+                                       interpval=self.pardict.get(parkey))
+                component_dict[key] = component
 
             if not component.isEmpty():
                 components.append(component)
@@ -579,21 +669,10 @@ class _ThermalObservationMode(BaseObservationMode):
         return result
 
     def _mergeEmissivityWavesets(self):
-        index = 1
-
-        for component in self.components:
-            emissivity = component.emissivity
-            if emissivity == None:
-                index = index + 1
-            else:
-                result = emissivity.GetWaveSet()
-                break;
-
-        for component in self.components[index:]:
-            if component.emissivity != None:
-                result = spectrum.MergeWaveSets(result, \
-                         component.emissivity.GetWaveSet())
-        return result
+        wavesets = [component.emissivity.GetWaveSet()
+                    for component in self.components
+                    if component.emissivity is not None]
+        return spectrum.MergeWaveSets(*wavesets)
 
     def _bb(self, wave, temperature):
         sp = spectrum.ArraySourceSpectrum(wave=wave,
@@ -605,6 +684,7 @@ class _ThermalObservationMode(BaseObservationMode):
 class _Component(object):
     def __init__(self, throughput_name, interpval):
         self.throughput_name = throughput_name
+        self.interpval = interpval
 
         self._empty = True
 
@@ -635,6 +715,7 @@ class _ThermalComponent(_Component):
     def __init__(self, throughput_name, thermal_name, interpval):
         self.throughput_name = throughput_name
         self.thermal_name = thermal_name
+        self.interpval = interpval
 
         self._empty = True
 
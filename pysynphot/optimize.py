@@ -0,0 +1,353 @@
+"""This module contains an optional optimization pass for
+:ref:`composite spectra <pysynphot-composite-spectrum>`.
+
+Arithmetic on spectra and bandpasses builds binary trees of
+`~pysynphot.spectrum.CompositeSourceSpectrum` and
+`~pysynphot.spectrum.CompositeSpectralElement` nodes, which are
+evaluated node by node. :func:`optimize` rewrites such a tree into an
+equivalent flat sum of products:
+
+* Numeric factors and `~pysynphot.spectrum.UniformTransmission`
+  are folded into a single coefficient per product.
+* Nested sums and products are flattened into n-ary nodes.
+* Identical leaves (same tabulated data, e.g., the same file or the
+  same extinction law and :math:`E(B-V)`, or the same analytic
+  parameters) are evaluated only once per call.
+
+The optimized object evaluates to the same values, up to rounding,
+and has the same wavelength set as the original expression.
+
+Examples
+--------
+>>> from pysynphot.optimize import optimize
+>>> sp = S.BlackBody(5000) * 2 * 0.5 * S.Extinction(0.1, 'mwavg')
+>>> opt = optimize(sp)
+
+"""
+from __future__ import division
+
+import numpy as N
+
+from . import spectrum
+from . import Cache
+
+
+def optimize(sp):
+    """Rewrite a composite spectrum or bandpass into an equivalent
+    flattened expression.
+
+    Objects that are not composites (and
+    `~pysynphot.observation.Observation`, which carries binned data)
+    are returned unchanged.
+
+    Parameters
+    ----------
+    sp : `~pysynphot.spectrum.SourceSpectrum` or `~pysynphot.spectrum.SpectralElement`
+        Spectrum or bandpass to optimize.
+
+    Returns
+    -------
+    opt : `OptimizedSourceSpectrum`, `OptimizedSpectralElement`, or ``sp``
+        Optimized expression.
+
+    """
+    if isinstance(sp, (OptimizedSourceSpectrum, OptimizedSpectralElement)):
+        return sp
+
+    if type(sp) is spectrum.CompositeSourceSpectrum:
+        return OptimizedSourceSpectrum(sp)
+    elif isinstance(sp, spectrum.CompositeSpectralElement):
+        return OptimizedSpectralElement(sp)
+    else:
+        return sp
+
+
+def _isFlattenable(sp):
+    """Observations are kept as leaves; everything else that is
+    a composite is flattened.
+
+    """
+    return (type(sp) is spectrum.CompositeSourceSpectrum or
+            isinstance(sp, (spectrum.CompositeSpectralElement,
+                            OptimizedSourceSpectrum,
+                            OptimizedSpectralElement)))
+
+
+def _leafKey(leaf):
+    """Return a string that is identical for leaves that evaluate
+    to the same values.
+
+    Tabulated spectra and bandpasses are keyed on their internal tables,
+    analytic ones on their type and scalar parameters. Anything else is
+    keyed on its identity, so it is never merged with another leaf.
+
+    """
+    name = type(leaf).__name__
+
+    wave = getattr(leaf, '_wavetable', None)
+    values = getattr(leaf, '_fluxtable', None)
+    if values is None:
+        values = getattr(leaf, '_throughputtable', None)
+
+    if (isinstance(wave, N.ndarray) and isinstance(values, N.ndarray) and
+            not isinstance(leaf, spectrum.Box)):
+        return 'T:%s:%s' % (name, Cache.fingerprint(wave, values))
+
+    if isinstance(leaf, (spectrum.AnalyticSpectrum, spectrum.Box)):
+        params = []
+        for k, v in sorted(leaf.__dict__.items()):
+            if isinstance(v, (int, float, str)):
+                params.append('%s=%r' % (k, v))
+            elif hasattr(v, 'name') and not isinstance(v, N.ndarray):
+                params.append('%s=%r' % (k, v.name))
+        return 'A:%s:%s' % (name, ','.join(params))
+
+    return 'I:%s:%d' % (name, id(leaf))
+
+
+class _Product(object):
+    """A coefficient times an unordered collection of factors, which
+    are leaf keys or nested `_Sum` nodes.
+
+    """
+    def __init__(self, coef=1.0, factors=()):
+        self.coef = coef
+        self.factors = list(factors)
+
+    def key(self):
+        return '*(%s)' % ','.join(sorted(_nodeKey(f) for f in self.factors))
+
+    def evaluate(self, wavelength, leaves, memo):
+        ans = None
+        for f in self.factors:
+            val = _evaluateNode(f, wavelength, leaves, memo)
+            ans = val if ans is None else ans * val
+
+        if ans is None:
+            return N.zeros_like(wavelength, dtype=N.float64) + self.coef
+        if self.coef != 1.0:
+            ans = ans * self.coef
+        return ans
+
+
+class _Sum(object):
+    """A list of `_Product` terms. Terms with the same factors have
+    their coefficients combined.
+
+    """
+    def __init__(self, terms):
+        combined = {}
+        order = []
+        for t in terms:
+            k = t.key()
+            if k in combined:
+                combined[k].coef += t.coef
+            else:
+                combined[k] = _Product(t.coef, t.factors)
+                order.append(k)
+        self.terms = [combined[k] for k in order]
+
+    def key(self):
+        return '+(%s)' % ','.join(
+            sorted('%r%s' % (t.coef, t.key()) for t in self.terms))
+
+    def evaluate(self, wavelength, leaves, memo):
+        ans = None
+        for t in self.terms:
+            val = t.evaluate(wavelength, leaves, memo)
+            ans = val if ans is None else ans + val
+        return ans
+
+
+def _nodeKey(node):
+    if isinstance(node, _Sum):
+        return node.key()
+    return node
+
+
+def _evaluateNode(node, wavelength, leaves, memo):
+    """Evaluate a leaf key or a nested sum, once per call."""
+    key = _nodeKey(node)
+    if key not in memo:
+        if isinstance(node, _Sum):
+            memo[key] = node.evaluate(wavelength, leaves, memo)
+        else:
+            memo[key] = spectrum._evaluateComponent(leaves[key], wavelength)
+    return memo[key]
+
+
+def _flatten(sp, leaves):
+    """Turn an expression into a `_Sum` of `_Product` terms,
+    registering leaves in ``leaves`` by key.
+
+    """
+    if isinstance(sp, (OptimizedSourceSpectrum, OptimizedSpectralElement)):
+        leaves.update(sp._leaves)
+        return sp._root
+
+    if isinstance(sp, spectrum.UniformTransmission):
+        return _Sum([_Product(sp.value)])
+
+    if not _isFlattenable(sp):
+        key = _leafKey(sp)
+        leaves.setdefault(key, sp)
+        return _Sum([_Product(1.0, [key])])
+
+    s1 = _flatten(sp.component1, leaves)
+    s2 = _flatten(sp.component2, leaves)
+
+    if getattr(sp, 'operation', 'multiply') == 'add':
+        return _Sum(s1.terms + s2.terms)
+
+    # A product of two sums. Single-term sums are merged into one
+    # product; otherwise the sum is kept as a factor rather than being
+    # expanded.
+    coef = 1.0
+    factors = []
+    for s in (s1, s2):
+        if len(s.terms) == 1:
+            coef *= s.terms[0].coef
+            factors.extend(s.terms[0].factors)
+        else:
+            factors.append(s)
+    return _Sum([_Product(coef, factors)])
+
+
+class _OptimizedExpression(spectrum.CompositeCache):
+    """Behavior shared by optimized source spectra and bandpasses."""
+    def _setup(self, sp):
+        self._leaves = {}
+        self._root = _flatten(sp, self._leaves)
+        self._clearCache()
+
+        self.name = str(sp)
+        self.warnings = dict(sp.warnings)
+        self.isAnalytic = sp.isAnalytic
+        self.primary_area = getattr(sp, 'primary_area', None)
+        self.waveunits = sp.waveunits
+
+    def __str__(self):
+        return self.name
+
+    def __iter__(self):
+        return self.complist().__iter__()
+
+    def complist(self):
+        """Return a list of the unique leaves of the expression."""
+        return list(self._leaves.values())
+
+    def _evaluate(self, wavelength):
+        return self._root.evaluate(wavelength, self._leaves, {})
+
+    def _children(self):
+        return list(self._leaves.values())
+
+
+class OptimizedSourceSpectrum(_OptimizedExpression, spectrum.SourceSpectrum):
+    """Flattened equivalent of a
+    `~pysynphot.spectrum.CompositeSourceSpectrum`.
+
+    Parameters
+    ----------
+    sp : `~pysynphot.spectrum.CompositeSourceSpectrum`
+        Expression to optimize.
+
+    Attributes
+    ----------
+    name : str
+        Description of the original expression.
+
+    warnings : dict
+        Warnings of the original expression.
+
+    isAnalytic : bool
+        Same as in the original expression.
+
+    primary_area : number or `None`
+        Same as in the original expression.
+
+    waveunits, fluxunits : `~pysynphot.units.Units`
+        User units of the original expression.
+
+    wave, flux : array_like
+        Wavelength set and associated flux in user units.
+
+    """
+    def __init__(self, sp):
+        self._setup(sp)
+        self.fluxunits = sp.fluxunits
+
+    def __call__(self, wavelength):
+        return self._cachedCall(wavelength)
+
+    def GetWaveSet(self):
+        """Obtain the wavelength set, which is the union of the
+        wavelength sets of all the leaves.
+
+        Returns
+        -------
+        waveset : array_like
+            Composite wavelength set.
+
+        """
+        return self._cachedWaveSet()
+
+
+class OptimizedSpectralElement(_OptimizedExpression, spectrum.SpectralElement):
+    """Flattened equivalent of a
+    `~pysynphot.spectrum.CompositeSpectralElement`.
+
+    Parameters
+    ----------
+    bp : `~pysynphot.spectrum.CompositeSpectralElement`
+        Expression to optimize.
+
+    Attributes
+    ----------
+    name : str
+        Description of the original expression.
+
+    warnings : dict
+        Warnings of the original expression.
+
+    isAnalytic : bool
+        Same as in the original expression.
+
+    primary_area : number or `None`
+        Same as in the original expression.
+
+    binset : array_like or `None`
+        Same as in the original expression.
+
+    waveunits : `~pysynphot.units.Units`
+        User unit of the original expression.
+
+    throughputunits : `None`
+        This is only to inform user that throughput is unitless.
+
+    wave, throughput : array_like
+        Wavelength set in user unit and associated unitless throughput.
+
+    """
+    def __init__(self, bp):
+        spectrum.SpectralElement.__init__(self)
+        self._setup(bp)
+        self.binset = getattr(bp, 'binset', None)
+        self.throughputunits = None
+
+    def __call__(self, wavelength):
+        return self._cachedCall(wavelength)
+
+    def GetWaveSet(self):
+        """Obtain the wavelength set, which is the union of the
+        wavelength sets of all the leaves.
+
+        Returns
+        -------
+        waveset : array_like
+            Composite wavelength set.
+
+        """
+        return self._cachedWaveSet()
+
+    wave = property(GetWaveSet, doc='Wavelength property.')
@@ -6,6 +6,9 @@
   instrument-specific values found.
 * ``pysynphot.refs._default_waveset_str`` - Description of the default
   wavelength set above.
+* ``pysynphot.refs._waveset_tolerance`` - Tolerance of the adaptive
+  wavelength sampling of analytic spectra, or `None` to use the default
+  wavelength set. See :func:`set_adaptive_waveset`.
 * ``pysynphot.refs.PRIMARY_AREA`` - Telescope collecting area, i.e., the primary
   mirror, in :math:`\\textnormal{cm}^{2}`. The value for HST is 45238.93416.
 
@@ -22,15 +25,18 @@ a given bandpass:
 """
 from __future__ import print_function
 
+import hashlib
 import os.path
 import warnings
 
 import numpy as np
 
 from .locations import irafconvert, _refTable
+from . import Cache
 
 _default_waveset = None
 _default_waveset_str = None
+_waveset_tolerance = None
 
 #Constants to hold tables.
 GRAPHTABLE= ''
@@ -99,6 +105,48 @@ def set_default_waveset(minwave=500, maxwave=26000, num=10000.,
     _default_waveset_str = s
 
 
+def set_adaptive_waveset(tolerance=None):
+    """Turn adaptive wavelength sampling of analytic spectra on or off,
+    ``pysynphot.refs._waveset_tolerance``.
+
+    By default, analytic spectra are sampled on the default wavelength
+    set (see :func:`set_default_waveset`), which has many more points
+    than needed where the spectrum is smooth or the bandpass is narrow.
+    With adaptive sampling, they only contribute the points needed for
+    linear interpolation to be within ``tolerance`` of their values:
+
+    * `~pysynphot.spectrum.BlackBody`, `~pysynphot.spectrum.Powerlaw`, and
+      `~pysynphot.spectrum.FlatSpectrum` refine a coarse grid over the
+      range of the default wavelength set where their curvature needs it.
+    * `~pysynphot.spectrum.GaussianSource` uses a grid centred on the
+      line, out to where the line is below ``tolerance`` of its peak.
+    * `~pysynphot.spectrum.Box` only has the points at its edges.
+
+    In an `~pysynphot.observation.Observation`, the sampling of analytic
+    sources is also clipped to where the bandpass is non-zero.
+
+    Parameters
+    ----------
+    tolerance : float or `None`, optional
+        Relative tolerance of the sampling, for example ``1e-4``.
+        If `None`, adaptive sampling is turned off.
+
+    Raises
+    ------
+    ValueError
+        Tolerance is not positive.
+
+    """
+    global _waveset_tolerance
+
+    if tolerance is not None:
+        tolerance = float(tolerance)
+        if not tolerance > 0:
+            raise ValueError('Waveset tolerance must be positive')
+
+    _waveset_tolerance = tolerance
+
+
 def _set_default_refdata():
     """Default refdata set on import."""
     global GRAPHTABLE, COMPTABLE, THERMTABLE, PRIMARY_AREA
@@ -167,6 +215,11 @@ def setref(graphtable=None, comptable=None, thermtable=None,
     COMPDICT = {}
     THERMDICT = {}
 
+    # Components and obsmode look-ups may come from the previous tables.
+    Cache.reset_component_cache()
+    Cache.reset_prefix_product_cache()
+    Cache.reset_obsmode_cache()
+
     #Check for all None, which means reset
     kwds=set([graphtable,comptable,thermtable,area,waveset])
     if kwds == set([None]):
@@ -234,6 +287,30 @@ def getref():
     return ans
 
 
+def fingerprint():
+    """Hash string identifying the current reference data, for keys of
+    cached results.
+
+    It covers the values returned by :func:`getref`, and the
+    modification time and size of the graph, component, and thermal
+    tables, so that it changes when a table is replaced in place.
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-1 digest.
+
+    """
+    ident = [repr(sorted(getref().items()))]
+    for name in (GRAPHTABLE, COMPTABLE, THERMTABLE):
+        try:
+            st = os.stat(name)
+        except (OSError, TypeError):
+            continue
+        ident.append('%s %r %d' % (name, st.st_mtime, st.st_size))
+    return hashlib.sha1('\n'.join(ident).encode('utf-8')).hexdigest()
+
+
 def showref():
     """Like :func:`getref` but print results to screen instead of returning
     a dictionary.
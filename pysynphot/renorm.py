@@ -3,8 +3,10 @@ from __future__ import division, print_function
 
 import math
 import numpy as np
+from . import Cache
 from . import units
-from .spectrum import FlatSpectrum, Vega
+from . import refs
+from .spectrum import Box, FlatSpectrum, Vega, _analyticIntegral
 from .refs import _default_waveset
 from .exceptions import DisjointError, OverlapError
 
@@ -13,9 +15,9 @@ def DefineStdSpectraForUnits():
     """Define ``StdSpectrum`` attribute for all the supported
     :ref:`pysynphot-flux-units`.
 
-    This is automatically done on module import. The attribute
-    stores the source spectrum necessary for normalization in
-    the corresponding flux unit.
+    This is automatically done the first time a ``StdSpectrum``
+    attribute is looked up. The attribute stores the source spectrum
+    necessary for normalization in the corresponding flux unit.
 
     For ``photlam``, ``photnu``, ``flam``, ``fnu``, Jy, and mJy,
     the spectrum is flat in the respective units with flux value of 1.
@@ -51,8 +53,104 @@ def DefineStdSpectraForUnits():
     units.VegaMag.StdSpectrum = Vega
 
 
-# Call this function so the attributes get added upon import.
-DefineStdSpectraForUnits()
+def StdIntegral(RNunits, band, bandkey=None, analytic=False):
+    """Integrated ``photlam`` flux of the standard spectrum of a flux
+    unit, through the bandpass for flux-density units. The result is
+    kept in ``pysynphot.Cache.RENORM_CACHE``, or in
+    ``pysynphot.Cache.VEGA_CACHE`` for ``vegamag``.
+
+    Parameters
+    ----------
+    RNunits : `~pysynphot.units.FluxUnits`
+        Flux unit.
+
+    band : `~pysynphot.spectrum.SpectralElement`
+        Bandpass.
+
+    bandkey : str or `None`
+        :func:`~pysynphot.Cache.band_fingerprint` of the bandpass,
+        if already known.
+
+    analytic : bool
+        Integrate in closed form where possible, as done for the
+        spectrum to renormalize (see
+        :meth:`~pysynphot.spectrum.SourceSpectrum.integrate`).
+
+    Returns
+    -------
+    total : float
+        Integrated flux.
+
+    """
+    if not RNunits.isDensity:
+        bandkey = None
+    elif bandkey is None:
+        bandkey = Cache.band_fingerprint(band)
+
+    if RNunits.name == 'vegamag':
+        return Cache.VEGA_CACHE.integral(RNunits.StdSpectrum, band, bandkey)
+
+    # The standard spectra are analytic, so the default wavelength set
+    # and adaptive sampling tolerance are part of the key.
+    key = ('std', RNunits.name, bandkey, refs._default_waveset_str,
+           refs._waveset_tolerance, analytic)
+    total = Cache.RENORM_CACHE.get(key)
+    if total is None:
+        if RNunits.isDensity:
+            up = RNunits.StdSpectrum * band
+        else:
+            up = RNunits.StdSpectrum
+        total = up.integrate(analytic=analytic)
+        Cache.RENORM_CACHE[key] = total
+    return total
+
+
+def BandOverlap(spectrum, band, bandkey=None):
+    """Overlap of a spectrum with a bandpass, as given by
+    :meth:`~pysynphot.spectrum.SpectralElement.check_overlap` and, for
+    partial overlap, :meth:`~pysynphot.spectrum.SpectralElement.check_sig`.
+
+    Both only depend on the bandpass and on the wavelength range of the
+    spectrum, so the result is kept in ``pysynphot.Cache.RENORM_CACHE``
+    for other spectra covering the same range.
+
+    Parameters
+    ----------
+    spectrum : `~pysynphot.spectrum.SourceSpectrum`
+        Spectrum to renormalize.
+
+    band : `~pysynphot.spectrum.SpectralElement`
+        Bandpass.
+
+    bandkey : str or `None`
+        :func:`~pysynphot.Cache.band_fingerprint` of the bandpass,
+        if already known.
+
+    Returns
+    -------
+    stat : {'full', 'partial', 'none'} or `None`
+        Overlap status.
+
+    sig : bool or `None`
+        Whether the lack of overlap is insignificant, for partial overlap.
+
+    """
+    if bandkey is None:
+        bandkey = Cache.band_fingerprint(band)
+
+    if spectrum.isAnalytic and not isinstance(spectrum, Box):
+        srange = None
+    else:
+        wave = spectrum.wave
+        srange = (wave.min(), wave.max())
+
+    key = ('overlap', bandkey, band.waveunits.name, srange)
+    ans = Cache.RENORM_CACHE.get(key)
+    if ans is None:
+        stat = band.check_overlap(spectrum)
+        sig = band.check_sig(spectrum) if stat == 'partial' else None
+        ans = Cache.RENORM_CACHE[key] = (stat, sig)
+    return ans
 
 
 def StdRenorm(spectrum, band, RNval, RNunitstring, force=False):
@@ -73,13 +171,15 @@ def StdRenorm(spectrum, band, RNval, RNunitstring, force=False):
         Renormalized spectrum.
 
     """
+    bandkey = Cache.band_fingerprint(band)
+
     # Validate the overlap
     if not force:
-        stat = band.check_overlap(spectrum)
+        stat, sig = BandOverlap(spectrum, band, bandkey)
         if stat == 'full':
             pass
         elif stat == 'partial':
-            if band.check_sig(spectrum):
+            if sig:
                 spectrum.warnings['PartialRenorm'] = True
                 print ('Warning: Spectrum is not defined everywhere in '
                        'renormalization bandpass. At least 99% of the band '
@@ -93,11 +193,20 @@ def StdRenorm(spectrum, band, RNval, RNunitstring, force=False):
             raise DisjointError('Spectrum and renormalization band are '
                                 'disjoint.')
 
+    RNunits = units.Units(RNunitstring)
+
     # Compute the flux of the spectrum through the bandpass and make sure
-    # the result makes sense.
+    # the result makes sense. Analytic spectra through piecewise-constant
+    # bandpasses are integrated in closed form if the standard spectrum
+    # can be too, so that both are computed the same way.
     sp = spectrum * band
 
-    totalflux = sp.integrate()
+    totalflux = None
+    if RNunits.isDensity and RNunits.StdSpectrum.isAnalytic:
+        totalflux = _analyticIntegral(sp)
+    analytic = totalflux is not None
+    if not analytic:
+        totalflux = sp.integrate(analytic=False)
     if totalflux <= 0.0:
         raise ValueError('Integrated flux is <= 0')
     if np.isnan(totalflux):
@@ -106,21 +215,17 @@ def StdRenorm(spectrum, band, RNval, RNunitstring, force=False):
         raise ValueError('Integrated flux is infinite')
 
     # Get the standard unit spectrum in the renormalization units
-    RNunits = units.Units(RNunitstring)
-    if RNunits.isDensity:
-        up = RNunits.StdSpectrum * band
-    else:
-        up = RNunits.StdSpectrum
+    stdflux = StdIntegral(RNunits, band, bandkey, analytic)
 
     # Renormalize in magnitudes....
     if RNunits.isMag:
-        ratio = totalflux / up.integrate()
+        ratio = totalflux / stdflux
         dmag = RNval + 2.5 * math.log10(ratio)
         newsp = spectrum.addmag(dmag)
 
     #...or in linear flux units.
     else:
-        const = RNval * (up.integrate() / totalflux)
+        const = RNval * (stdflux / totalflux)
         newsp = spectrum * const
 
     # Return the new spectrum
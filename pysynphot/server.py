@@ -0,0 +1,691 @@
+"""This module implements a TCP server for Exposure Time Calculator
+(ETC) requests, following ``planning/etc_icd.txt``.
+
+Requests are single lines in the synphot-like grammar used by the ETC::
+
+    calcphot&spectrum="rn(unit(1,flam),box(5500.0,1),1.0E-18,flam)"&obsmode="acs,hrc,f220w"
+
+that is, a task name followed by ``&key="value"`` pairs. Parameters that
+a task does not use (e.g., ``area``, ``mode``, ``grtbl``, ``cmptbl``) are
+ignored. The supported tasks are listed in ``TASKS``, plus:
+
+* ``ping`` - Reply ``pong``.
+* ``version`` - Reply the version of ``pysynphot``.
+* ``metrics`` - Reply server counters as JSON (see `ETCServer.metrics`).
+* ``quit`` - Reply ``bye`` and shut the server down, if the server
+  allows it (see ``allow_quit`` in `ETCServer`).
+
+Each request gets one line in reply. Exceptions are caught and replied
+as ``Error: <type>: <message>``.
+
+The front end runs on :mod:`asyncio` and hands the calculations to a
+pool of worker processes, which are started and warmed up (graph and
+component tables, Vega, and the given observation modes) before the
+server accepts connections. Caches built by a worker stay warm for all
+the requests it serves. Each request is limited to ``timeout`` seconds.
+A timeout may leave the caches of a worker half updated, and a worker
+may die, which breaks the pool, so in both cases the pool is replaced
+by a new one.
+
+The ``output`` files of the tasks are written in the output directory
+of the server, and their names cannot leave it. Without an output
+directory, the tasks cannot write files.
+
+The replies of the tasks in ``CACHED_TASKS``, which do not write files,
+are kept in a `~pysynphot.Cache.ResultCache` by the front end, keyed on
+the canonical request and the reference data, and optionally persisted
+to a SQLite file. Identical requests that arrive while one is being
+computed wait for its reply instead of computing it again.
+
+.. note:: This module requires Python 3.7 or later.
+
+Examples
+--------
+Run a server on port 7999 with four workers, writing its output files
+in ``/tmp/etc``, from the shell::
+
+    python -m pysynphot.server --port 7999 --workers 4 --warm acs,wfc1,f555w \
+        --output-dir /tmp/etc
+
+and send it a request:
+
+>>> from pysynphot.server import request
+>>> request('localhost', 7999, 'ping')  # doctest: +SKIP
+'pong'
+
+"""
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import __version__
+from . import refs
+from .Cache import ResultCache
+from .exceptions import PysynphotError
+from .obsbandpass import ObsBandpass
+from .observation import Observation
+from .spparser import canonical_spec, parse_spec_cached
+
+
+class RequestTimeout(PysynphotError):
+    """Request took longer than the server timeout."""
+    pass
+
+
+_PARAM = re.compile(r'&\s*(\w+)\s*=\s*"([^"]*)"')
+
+
+def parse_request(line):
+    """Split a request into its task name and parameters.
+
+    Parameters
+    ----------
+    line : str
+        Request, as ``task&key="value"&...``.
+
+    Returns
+    -------
+    task : str
+        Task name, in lower case.
+
+    params : dict
+        Parameter values, keyed on lower case names.
+
+    Raises
+    ------
+    ValueError
+        Request is empty or has text outside ``&key="value"`` pairs.
+
+    """
+    line = line.strip()
+    task, sep, rest = line.partition('&')
+    task = task.strip().lower()
+    if not task:
+        raise ValueError('Empty request')
+
+    params = {}
+    pos = 0
+    rest = sep + rest
+    for m in _PARAM.finditer(rest):
+        if rest[pos:m.start()].strip():
+            break
+        params[m.group(1).lower()] = m.group(2)
+        pos = m.end()
+    if rest[pos:].strip():
+        raise ValueError('Cannot parse request parameters: %s' % rest[pos:])
+
+    return task, params
+
+
+def _param(params, *names):
+    """Return the first of the given parameters that is present."""
+    for name in names:
+        if name in params:
+            return params[name]
+    raise ValueError('Missing parameter: %s' % names[0])
+
+
+def output_path(output_dir, name):
+    """Return the path of an output file requested by a client.
+
+    Parameters
+    ----------
+    output_dir : str or `None`
+        Directory where the server writes output files.
+
+    name : str
+        File name given in the request, relative to ``output_dir``.
+
+    Returns
+    -------
+    path : str
+        Path of the file in ``output_dir``.
+
+    Raises
+    ------
+    ValueError
+        The server does not write output files, or the name is empty,
+        absolute, or leads out of ``output_dir``.
+
+    """
+    if output_dir is None:
+        raise ValueError('This server does not write output files')
+    parts = re.split(r'[\\/]', name)
+    if (not name.strip() or os.path.isabs(name) or
+            os.path.splitdrive(name)[0] or '..' in parts):
+        raise ValueError('Invalid output file name: %s' % name)
+
+    root = os.path.realpath(output_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(os.path.join(root, '')):
+        raise ValueError('Invalid output file name: %s' % name)
+    return path
+
+
+# Calculators. Each one takes the request parameters and returns the
+# reply string. Most ETC parameters are ignored, as in synphot.
+
+def calcphot(params):
+    """Count rate of ``spectrum`` through ``obsmode``."""
+    sp = parse_spec_cached(_param(params, 'spectrum'))
+    bp = ObsBandpass(_param(params, 'obsmode', 'instrument'))
+    obs = Observation(sp, bp)
+    return str(float(obs.effstim('counts')))
+
+
+def countrate(params):
+    """Count rate and effective wavelength of ``spectrum`` through
+    ``instrument``."""
+    sp = parse_spec_cached(_param(params, 'spectrum'))
+    bp = ObsBandpass(_param(params, 'instrument', 'obsmode'))
+    obs = Observation(sp, bp)
+    return str((float(obs.countrate()), float(obs.efflam())))
+
+
+def specsourceratespec(params):
+    """Like `countrate`, but also write the observation to ``output``."""
+    sp = parse_spec_cached(_param(params, 'spectrum'))
+    bp = ObsBandpass(_param(params, 'instrument', 'obsmode'))
+    obs = Observation(sp, bp)
+    output = _param(params, 'output')
+    obs.writefits(output)
+    return '%s;%s' % (float(obs.countrate()), output)
+
+
+def thermback(params):
+    """Thermal background of ``obsmode``."""
+    bp = ObsBandpass(_param(params, 'obsmode', 'instrument'))
+    return str(float(bp.thermback()))
+
+
+def calcspec(params):
+    """Write ``spectrum`` to ``output``."""
+    sp = parse_spec_cached(_param(params, 'spectrum'))
+    sp.writefits(_param(params, 'output'))
+    return str(sp)
+
+
+def showfiles(params):
+    """Throughput files of ``obsmode``, also written to ``output``
+    if given."""
+    bp = ObsBandpass(_param(params, 'obsmode', 'instrument'))
+    files = [f for f in bp.obsmode.GetFileNames() if f != 'clear']
+    if 'output' in params:
+        with open(params['output'], 'w') as f:
+            f.write('\n'.join(files) + '\n')
+    return ';'.join(files)
+
+
+#: Tasks run by the workers, keyed on lower case task name.
+TASKS = {'calcphot': calcphot,
+         'countrate': countrate,
+         'specsourceratespec': specsourceratespec,
+         'thermback': thermback,
+         'calcspec': calcspec,
+         'showfiles': showfiles}
+
+#: Tasks whose replies only depend on the request and the reference data.
+CACHED_TASKS = ('calcphot', 'countrate', 'thermback')
+
+
+def cache_key(task, params):
+    """Key of the reply to a request in ``CACHED_TASKS``, made of the
+    task name and the parameters it uses, in canonical form.
+
+    Raises
+    ------
+    ValueError
+        Missing parameter.
+
+    Exception
+        The spectrum cannot be scanned.
+
+    """
+    parts = [task, _param(params, 'obsmode', 'instrument').strip().lower()]
+    if task != 'thermback':
+        parts.append(canonical_spec(_param(params, 'spectrum')))
+    return '\n'.join(parts)
+
+
+# Worker process side
+
+def _raiseTimeout(signum, frame):
+    raise RequestTimeout('Request timed out')
+
+
+def _initWorker(warm_obsmodes):
+    """Load what every request needs, so that the first requests served
+    by this worker are not slower than the others.
+
+    """
+    # The server handles Ctrl-C and shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from .tables import CompTable, GraphTable
+    from .spectrum import Vega
+
+    for name, tables, cls in ((refs.GRAPHTABLE, refs.GRAPHDICT, GraphTable),
+                              (refs.COMPTABLE, refs.COMPDICT, CompTable),
+                              (refs.THERMTABLE, refs.THERMDICT, CompTable)):
+        if name is not None and name not in tables:
+            try:
+                tables[name] = cls(name)
+            except Exception:
+                pass
+
+    try:
+        Vega.wave
+    except Exception:
+        pass
+
+    for obsmode in warm_obsmodes:
+        try:
+            ObsBandpass(obsmode)
+        except Exception:
+            # The tables are still loaded, which is the point.
+            pass
+
+
+def _ready(delay):
+    """Keep a worker busy for a moment, so that the pool starts all its
+    processes at once."""
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _runTask(task, params, timeout):
+    """Run a task in a worker, interrupting it after ``timeout``
+    seconds where the platform allows it. The server replaces the
+    worker afterwards, as the interrupted task may have left its
+    caches half updated.
+
+    """
+    use_alarm = timeout and hasattr(signal, 'setitimer')
+    if use_alarm:
+        old = signal.signal(signal.SIGALRM, _raiseTimeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return TASKS[task](params)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old)
+
+
+# Front end
+
+class ETCServer(object):
+    """Asynchronous ETC request server with a pool of worker processes.
+
+    Parameters
+    ----------
+    host : str
+        Address to listen on. Default is localhost only.
+
+    port : int
+        Port to listen on. If 0, a free port is picked; see ``port``
+        after :meth:`start`.
+
+    workers : int or `None`
+        Number of worker processes. Default is the number of CPUs.
+
+    timeout : float or `None`
+        Maximum time for one request, in seconds. `None` means no limit.
+
+    warm_obsmodes : list of str
+        Observation modes that every worker builds before serving
+        requests.
+
+    cache_size : int
+        Number of replies kept in memory. If 0, replies are not cached
+        and identical requests are not coalesced.
+
+    cache_path : str or `None`
+        SQLite file where replies are also kept between runs.
+
+    output_dir : str or `None`
+        Directory where the ``output`` files of the tasks are written,
+        given as names relative to it. If `None`, requests that write
+        files are refused.
+
+    allow_quit : bool
+        Whether clients can shut the server down with ``quit``.
+
+    Attributes
+    ----------
+    host, port, workers, timeout, warm_obsmodes, output_dir, allow_quit
+        As above.
+
+    cache : `~pysynphot.Cache.ResultCache` or `None`
+        Cache of replies.
+
+    worker_pids : list of int
+        Process IDs of the workers of the current pool.
+
+    """
+    def __init__(self, host='127.0.0.1', port=0, workers=None, timeout=60.0,
+                 warm_obsmodes=(), cache_size=1024, cache_path=None,
+                 output_dir=None, allow_quit=False):
+        self.host = host
+        self.port = port
+        self.workers = workers or multiprocessing.cpu_count()
+        self.timeout = timeout
+        self.warm_obsmodes = list(warm_obsmodes)
+        self.output_dir = output_dir
+        self.allow_quit = allow_quit
+        self.worker_pids = []
+        self.cache = (ResultCache(cache_size, cache_path) if cache_size
+                      else None)
+
+        self._pool = None
+        self._server = None
+        self._done = None
+        self._started = None
+        self._counts = {}
+        self._latency = {}
+        self._inflight = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._restarts = 0
+        self._running = {}
+        self._refkey = None
+
+    async def start(self):
+        """Start and warm up the workers, then start listening."""
+        self._pool = self._newPool()
+        await self._warmPool(self._pool)
+        # The workers are forked with the reference data of this process.
+        self._refkey = refs.fingerprint()
+
+        self._done = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host,
+                                                  self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started = time.time()
+
+    def _newPool(self):
+        try:
+            ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            ctx = None
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=ctx,
+            initializer=_initWorker, initargs=(self.warm_obsmodes,))
+
+    async def _warmPool(self, pool):
+        """Start all the workers of a pool."""
+        loop = asyncio.get_event_loop()
+        pids = await asyncio.gather(
+            *[loop.run_in_executor(pool, _ready, 0.1)
+              for i in range(self.workers)])
+        if pool is self._pool:
+            self.worker_pids = sorted(set(pids))
+
+    async def _replacePool(self, pool, terminate=False):
+        """Replace a pool that is broken, or whose workers cannot be
+        trusted after a timeout, unless it was already replaced.
+
+        Requests in progress in the old pool are completed, unless
+        ``terminate`` is set, for a worker that is stuck.
+
+        """
+        if pool is not self._pool:
+            return
+        self._restarts += 1
+        self._pool = self._newPool()
+        if terminate:
+            for process in list((getattr(pool, '_processes', None) or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False)
+        try:
+            await self._warmPool(self._pool)
+        except Exception:
+            # The server was stopped, or the new pool broke too; the
+            # next request finds out.
+            pass
+
+    async def stop(self):
+        """Stop listening and shut the workers down."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.get_event_loop().run_in_executor(None, pool.shutdown)
+        if self.cache is not None:
+            self.cache.close()
+        if self._done is not None:
+            self._done.set()
+
+    async def serve_forever(self):
+        """Start the server and run until it is stopped."""
+        await self.start()
+        print('pysynphot %s server on %s:%d with %d workers' %
+              (__version__, self.host, self.port, len(self.worker_pids)))
+        await self._done.wait()
+
+    def metrics(self):
+        """Return the server counters.
+
+        Returns
+        -------
+        metrics : dict
+            ``uptime`` in seconds, number of ``requests``, ``errors``,
+            and ``timeouts``, number of requests being processed
+            (``inflight``), number of ``workers``, number of times the
+            pool was replaced (``restarts``), and, per task, the
+            number of requests and their mean and maximum latency in
+            seconds (``tasks``), and the statistics of the reply cache
+            (``cache``; see `~pysynphot.Cache.ResultCache.stats`).
+
+        """
+        tasks = {}
+        for task, n in self._counts.items():
+            total, worst = self._latency[task]
+            tasks[task] = dict(count=n, mean=total / n, max=worst)
+        return dict(uptime=time.time() - self._started,
+                    requests=sum(self._counts.values()),
+                    errors=self._errors, timeouts=self._timeouts,
+                    inflight=self._inflight, restarts=self._restarts,
+                    workers=len(self.worker_pids), tasks=tasks,
+                    cache=self.cache.stats() if self.cache is not None
+                    else None)
+
+    def _record(self, task, elapsed):
+        self._counts[task] = self._counts.get(task, 0) + 1
+        total, worst = self._latency.get(task, (0.0, 0.0))
+        self._latency[task] = (total + elapsed, max(worst, elapsed))
+
+    async def _handle(self, reader, writer):
+        """Serve one connection, which may send several requests, one
+        per line."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self.dispatch(line.decode('utf-8', 'replace'))
+                writer.write((reply + '\n').encode('utf-8'))
+                await writer.drain()
+                if reply == 'bye':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, line):
+        """Process one request and return the reply."""
+        start = time.time()
+        try:
+            task, params = parse_request(line)
+        except ValueError as e:
+            self._errors += 1
+            return 'Error: %s' % e
+
+        if task == 'ping':
+            return 'pong'
+        if task == 'version':
+            return __version__
+        if task == 'metrics':
+            return json.dumps(self.metrics(), sort_keys=True)
+        if task == 'quit':
+            if not self.allow_quit:
+                self._errors += 1
+                return 'Error: This server cannot be shut down by clients'
+            asyncio.get_event_loop().call_soon(
+                lambda: asyncio.ensure_future(self.stop()))
+            return 'bye'
+        if task not in TASKS:
+            self._errors += 1
+            return 'Error: Unknown task %s' % task
+        # The cached tasks ignore ``output``, as in synphot.
+        if 'output' in params and task not in CACHED_TASKS:
+            try:
+                params['output'] = output_path(self.output_dir,
+                                               params['output'])
+            except ValueError as e:
+                self._errors += 1
+                return 'Error: %s' % e
+
+        key = None
+        if self.cache is not None and task in CACHED_TASKS:
+            try:
+                key = '%s\n%s' % (self._refkey, cache_key(task, params))
+            except Exception:
+                # The worker reports the error.
+                pass
+
+        if key is None:
+            reply = await self._compute(task, params)
+        else:
+            reply = self.cache.get(key)
+            if reply is None and key in self._running:
+                self.cache.coalesced += 1
+                reply = await asyncio.shield(self._running[key])
+            elif reply is None:
+                future = asyncio.ensure_future(self._compute(task, params))
+                self._running[key] = future
+                try:
+                    reply = await future
+                finally:
+                    del self._running[key]
+                if not reply.startswith('Error:'):
+                    self.cache.put(key, reply, time.time() - start)
+
+        self._record(task, time.time() - start)
+        return reply
+
+    async def _compute(self, task, params):
+        """Run a task in the pool and return the reply, or the error."""
+        loop = asyncio.get_event_loop()
+        pool = self._pool
+        self._inflight += 1
+        try:
+            future = loop.run_in_executor(pool, _runTask, task, params,
+                                          self.timeout)
+            if self.timeout:
+                # The worker interrupts itself; this is a backstop for
+                # platforms or code that cannot be interrupted.
+                reply = await asyncio.wait_for(future, self.timeout + 1.0)
+            else:
+                reply = await future
+        except (RequestTimeout, asyncio.TimeoutError) as e:
+            self._timeouts += 1
+            self._errors += 1
+            reply = 'Error: Request timed out after %g s' % self.timeout
+            asyncio.ensure_future(self._replacePool(
+                pool, terminate=isinstance(e, asyncio.TimeoutError)))
+        except BrokenProcessPool as e:
+            self._errors += 1
+            reply = 'Error: %s: %s' % (type(e).__name__, e)
+            asyncio.ensure_future(self._replacePool(pool))
+        except Exception as e:
+            self._errors += 1
+            reply = 'Error: %s: %s' % (type(e).__name__, e)
+        finally:
+            self._inflight -= 1
+
+        return reply.replace('\n', ' ')
+
+
+def request(host, port, line, timeout=None):
+    """Send one request to a server and return the reply.
+
+    Parameters
+    ----------
+    host : str
+        Server address.
+
+    port : int
+        Server port.
+
+    line : str
+        Request.
+
+    timeout : float or `None`
+        Socket timeout in seconds.
+
+    Returns
+    -------
+    reply : str
+
+    """
+    sock = socket.create_connection((host, port), timeout=timeout)
+    try:
+        sock.sendall((line.strip() + '\n').encode('utf-8'))
+        f = sock.makefile('rb')
+        reply = f.readline()
+        f.close()
+    finally:
+        sock.close()
+    return reply.decode('utf-8').rstrip('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve ETC requests with pysynphot.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7999)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='seconds per request, 0 for no limit')
+    parser.add_argument('--warm', action='append', default=[],
+                        metavar='OBSMODE',
+                        help='obsmode to build in every worker at start')
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help='replies kept in memory, 0 for no cache')
+    parser.add_argument('--cache-db', default=None, metavar='FILE',
+                        help='SQLite file to keep replies between runs')
+    parser.add_argument('--output-dir', default=None, metavar='DIR',
+                        help='directory for output files, none by default')
+    parser.add_argument('--allow-quit', action='store_true',
+                        help='let clients shut the server down with quit')
+    args = parser.parse_args(argv)
+
+    server = ETCServer(args.host, args.port, args.workers,
+                       args.timeout or None, args.warm, args.cache_size,
+                       args.cache_db, args.output_dir, args.allow_quit)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        loop.run_until_complete(server.stop())
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ from __future__ import absolute_import, division, print_function
 import re
 import os
 import math
+import threading
 import warnings
 
 from astropy.io import fits as pyfits
@@ -19,6 +20,7 @@ from . import refs
 from . import units
 from . import locations
 from . import planck
+from . import Cache
 import pysynphot.exceptions as exceptions  # custom pysyn exceptions
 
 from pysynphot import __version__
@@ -43,60 +45,165 @@ MERGETHRESH = 1.e-12
 syn_epsilon = 0.00032
 
 
-def MergeWaveSets(waveset1, waveset2):
-    """Return the union of the two wavelength sets.
+def MergeWaveSets(*wavesets):
+    """Return the union of the given wavelength sets.
 
-    The union is computed using `numpy.union1d`, unless one or
-    both of them is `None`.
+    All the inputs that are not `None` are concatenated and sorted once.
+    If only one such input is given, it is returned as-is.
 
     The merged result may sometimes contain numbers which are nearly
     equal but differ at levels as small as 1E-14. Having values this
     close together can cause problems due to effectively duplicate
     wavelength values. Therefore, wavelength values having differences
     smaller than or equal to ``pysynphot.spectrum.MERGETHRESH``
-    (defaults to 1E-12) are considered as the same.
+    (defaults to 1E-12) are considered as the same. Exact duplicates
+    are removed by the same test.
 
     Parameters
     ----------
-    waveset1, waveset2 : array_like or `None`
+    waveset1, waveset2, ... : array_like or `None`
         Wavelength sets to combine.
 
     Returns
     -------
     MergedWaveSet : array_like or `None`
-        Merged wavelength set. It is `None` if both inputs are such.
+        Merged wavelength set. It is `None` if all inputs are such.
 
     """
-    if waveset1 is None and waveset2 is not None:
-        MergedWaveSet = waveset2
-    elif waveset2 is None and waveset1 is not None:
-        MergedWaveSet = waveset1
-    elif waveset1 is None and waveset2 is None:
+    wavesets = [w for w in wavesets if w is not None]
+
+    if len(wavesets) == 0:
         MergedWaveSet = None
+    elif len(wavesets) == 1:
+        MergedWaveSet = wavesets[0]
     else:
-        MergedWaveSet = N.union1d(waveset1, waveset2)
-
-        # The merged wave sets may sometimes contain numbers which are nearly
-        # equal but differ at levels as small as 1e-14. Having values this
-        # close together can cause problems down the line so here we test
-        # whether any such small differences are present, with a small
-        # difference defined as less than MERGETHRESH.
-        #
-        # If small differences are present we make a copy of the union'ed array
-        # with the lower of the close together pairs removed.
-        delta = MergedWaveSet[1:] - MergedWaveSet[:-1]
-
-        if not (delta > MERGETHRESH).all():
-            newlen = len(delta[delta > MERGETHRESH]) + 1
-            newmerged = N.zeros(newlen, dtype=MergedWaveSet.dtype)
-            newmerged[:-1] = MergedWaveSet[:-1][delta > MERGETHRESH]
-            newmerged[-1] = MergedWaveSet[-1]
-
-            MergedWaveSet = newmerged
+        MergedWaveSet = N.sort(
+            N.concatenate([N.ravel(w) for w in wavesets]))
+
+        # The merged wave sets may contain duplicates, or numbers which are
+        # nearly equal but differ at levels as small as 1e-14. Having values
+        # this close together can cause problems down the line, so the lower
+        # of each pair closer than MERGETHRESH is removed.
+        keep = N.empty(MergedWaveSet.size, dtype=bool)
+        keep[:-1] = (MergedWaveSet[1:] - MergedWaveSet[:-1]) > MERGETHRESH
+        keep[-1] = True
+
+        if not keep.all():
+            MergedWaveSet = MergedWaveSet[keep]
 
     return MergedWaveSet
 
 
+# Linear flux-density units, as (factor, power) such that a flux of 1
+# in that unit is factor * wave**power in photlam (wave in Angstrom).
+# These are used for closed-form integrals of analytic spectra.
+_PHOTLAM_POWERS = {'photlam': (1.0, 0),
+                   'flam': (1.0 / units.HC, 1),
+                   'photnu': (units.C, -2),
+                   'fnu': (1.0 / units.H, -1),
+                   'jy': (1.0e-23 / units.H, -1),
+                   'mjy': (1.0e-26 / units.H, -1),
+                   'mujy': (1.0e-29 / units.H, -1),
+                   'njy': (1.0e-32 / units.H, -1)}
+
+
+def _powerIntegral(lo, hi, power):
+    """Integral of ``wave**power`` from ``lo`` to ``hi``."""
+    if power == -1:
+        return math.log(hi / lo)
+    return (hi ** (power + 1) - lo ** (power + 1)) / (power + 1)
+
+
+def _analyticIntegral(sp):
+    """Integrate the ``photlam`` flux of an analytic source spectrum
+    over its wavelength set in closed form, as an exact counterpart of
+    :meth:`SourceSpectrum.integrate`.
+
+    Parameters
+    ----------
+    sp : `SourceSpectrum`
+        Source spectrum.
+
+    Returns
+    -------
+    ans : float or `None`
+        Integrated flux, or `None` if the spectrum or one of its
+        components has no closed-form integral, or if its wavelength
+        unit is not Angstrom.
+
+    """
+    if not sp.isAnalytic or sp.waveunits.name != 'angstrom':
+        return None
+
+    wrange = sp._waveRange()
+    if wrange is None:
+        return None
+
+    return sp._integral(*wrange)
+
+
+def _refineWaveSet(func, wave, tolerance, maxiter=30):
+    """Refine a wavelength set for linear interpolation of a function,
+    for adaptive sampling (see :func:`~pysynphot.refs.set_adaptive_waveset`).
+
+    Midpoints are inserted into every interval where the function at
+    the midpoint differs from the mean of its values at the ends by
+    more than ``tolerance`` times its value there. Values below the
+    square root of ``tolerance`` times the peak are compared to that
+    instead, so that tails going to zero are not refined as much.
+
+    Parameters
+    ----------
+    func : callable
+        Function of wavelength.
+
+    wave : array_like
+        Sorted wavelength set to refine.
+
+    tolerance : float
+        Relative tolerance.
+
+    maxiter : int
+        Maximum number of times an interval is halved.
+
+    Returns
+    -------
+    wave : array_like
+        Refined wavelength set.
+
+    """
+    wave = N.asarray(wave, dtype=N.float64)
+    values = N.asarray(func(wave), dtype=N.float64)
+    floor = math.sqrt(tolerance) * N.abs(values).max()
+
+    for i in range(maxiter):
+        mid = 0.5 * (wave[1:] + wave[:-1])
+        midvalues = N.asarray(func(mid), dtype=N.float64)
+        error = N.abs(midvalues - 0.5 * (values[1:] + values[:-1]))
+        refine = error > tolerance * N.maximum(N.abs(midvalues), floor)
+        if not refine.any():
+            break
+
+        idx = N.flatnonzero(refine) + 1
+        wave = N.insert(wave, idx, mid[refine])
+        values = N.insert(values, idx, midvalues[refine])
+
+    return wave
+
+
+def _leafWaveSet(component, clip=None):
+    """Return the wavelength set of a component that is not a composite.
+    If ``clip`` is a ``(min, max)`` range, the adaptive sampling of
+    analytic components is clipped to it.
+
+    """
+    waveset = component.GetWaveSet()
+    if (clip is not None and waveset is not None and
+            getattr(component, 'isAnalytic', False)):
+        waveset = waveset[(waveset >= clip[0]) & (waveset <= clip[1])]
+    return waveset
+
+
 def trimSpectrum(sp, minw, maxw):
     """Create a new spectrum with trimmed upper and lower ranges.
 
@@ -170,6 +277,16 @@ class Integrator(object):
         else:
             return 0.0
 
+    def _waveRange(self):
+        """Return the smallest and largest values of the wavelength set
+        in internal unit, or `None` if it is undefined.
+
+        """
+        wave = self.GetWaveSet()
+        if wave is None:
+            return None
+        return wave.min(), wave.max()
+
     def _columnsFromASCII(self, filename):
         """Following synphot/TABLES, ASCII files may contain blank lines,
         comment lines (beginning with '#'), or terminal comments. This routine
@@ -256,6 +373,116 @@ class Integrator(object):
                       len(idx[0]), len(self._fluxtable)))
 
 
+class CompositeCache(object):
+    """Mix-in class that memoizes the merged wavelength set and the
+    last tabulation of a composite spectrum or bandpass.
+
+    Composite objects are evaluated by walking their whole expression
+    tree, which is repeated every time ``wave``, ``flux``, or
+    ``throughput`` is accessed. This class keeps the merged wavelength
+    set (valid for as long as ``pysynphot.refs._default_waveset`` and
+    ``pysynphot.refs._waveset_tolerance`` are unchanged) and the
+    values computed for the most recently requested wavelength array.
+    Components are treated as immutable once the composite is built.
+    Changing units with ``convert()`` on the composite drops the cache.
+
+    Copies are returned, so callers are free to modify the results
+    in place.
+
+    """
+    def _clearCache(self):
+        """Discard memoized wavelength set and tabulation."""
+        self._waveset_cache = None
+        self._tabulation_cache = None
+
+    def _collectWaveSets(self, wavesets, clip=None):
+        """Append the wavelength sets of all the leaves below this
+        composite to ``wavesets``, clipped as in :func:`_leafWaveSet`.
+
+        """
+        for comp in self._children():
+            if isinstance(comp, CompositeCache):
+                comp._collectWaveSets(wavesets, clip)
+            else:
+                wavesets.append(_leafWaveSet(comp, clip))
+
+    def _waveRange(self):
+        """Return the range of the merged wavelength set from the ranges
+        of the components, without merging them.
+
+        """
+        ranges = [r for r in (comp._waveRange() for comp in self._children())
+                  if r is not None]
+        if not ranges:
+            return None
+        return min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+    def _mergeWaveSet(self):
+        """Merge the leaf wavelength sets of the whole tree at once."""
+        wavesets = []
+        self._collectWaveSets(wavesets)
+        return MergeWaveSets(*wavesets)
+
+    def _cachedWaveSet(self):
+        """Return a copy of the merged wavelength set, computing it
+        with :meth:`_mergeWaveSet` on cache miss.
+
+        """
+        cache = getattr(self, '_waveset_cache', None)
+
+        if (cache is not None and cache[0] is refs._default_waveset and
+                cache[1] == refs._waveset_tolerance):
+            waveset = cache[2]
+        else:
+            waveset = self._mergeWaveSet()
+            self._waveset_cache = (refs._default_waveset,
+                                   refs._waveset_tolerance, waveset)
+
+        if waveset is None:
+            return None
+
+        return waveset.copy()
+
+    def _cachedCall(self, wavelength):
+        """Return the values at given wavelengths, computing them with
+        :meth:`_evaluate` on cache miss. Scalar input is never cached.
+
+        """
+        if N.isscalar(wavelength) or N.ndim(wavelength) == 0:
+            return self._evaluate(wavelength)
+
+        wavelength = N.asarray(wavelength)
+        cache = getattr(self, '_tabulation_cache', None)
+
+        if cache is not None:
+            cwave, cvalues = cache
+            if (cwave.shape == wavelength.shape and
+                    N.array_equal(cwave, wavelength)):
+                return cvalues.copy()
+
+        values = self._evaluate(wavelength)
+
+        if isinstance(values, N.ndarray) and values.shape == wavelength.shape:
+            # Stored as a single tuple so a concurrent reader never sees
+            # the wavelengths of one call with the values of another.
+            self._tabulation_cache = (wavelength.copy(), values)
+            values = values.copy()
+
+        return values
+
+
+def _evaluateComponent(component, wavelength):
+    """Evaluate a component of a composite spectrum, bypassing the
+    tabulation cache of nested composites so that only the outermost
+    composite keeps a copy of the result.
+
+    """
+    if isinstance(component, CompositeCache):
+        return component._evaluate(wavelength)
+    else:
+        return component(wavelength)
+
+
 class SourceSpectrum(Integrator):
     """This is the base class for all
     :ref:`source spectra <pysynphot-spectrum>`.
@@ -324,19 +551,35 @@ class SourceSpectrum(Integrator):
         else:
             raise TypeError(".addmag() only takes a constant scalar argument")
 
-    def getArrays(self):
-        """Return wavelength and flux arrays in user units.
+    def getArrays(self, waveunits=None, fluxunits=None):
+        """Return wavelength and flux arrays in user units, or in the
+        given units.
+
+        This does not change ``self.waveunits`` or ``self.fluxunits``,
+        so it can be used instead of :meth:`convert` on objects that are
+        shared, e.g., between threads.
+
+        Parameters
+        ----------
+        waveunits, fluxunits : str or `None`
+            Wavelength and flux units. If `None`, ``self.waveunits``
+            and ``self.fluxunits`` are used.
 
         Returns
         -------
         wave : array_like
-            Wavelength array in ``self.waveunits``.
+            Wavelength array in ``waveunits``.
 
         flux : array_like
-            Flux array in ``self.fluxunits``.
+            Flux array in ``fluxunits``.
             When necessary, ``self.primary_area`` is used for unit conversion.
 
         """
+        if waveunits is None:
+            waveunits = self.waveunits
+        if fluxunits is None:
+            fluxunits = self.fluxunits
+
         if hasattr(self, 'primary_area'):
             area = self.primary_area
         else:
@@ -346,8 +589,8 @@ class SourceSpectrum(Integrator):
         flux = self(wave)
 
         flux = units.Photlam().Convert(
-            wave, flux, self.fluxunits.name, area=area)
-        wave = units.Angstrom().Convert(wave, self.waveunits.name)
+            wave, flux, units.Units(fluxunits).name, area=area)
+        wave = units.Angstrom().Convert(wave, units.Units(waveunits).name)
 
         return wave, flux
 
@@ -533,7 +776,7 @@ class SourceSpectrum(Integrator):
         hdulist.append(hdu)
         hdulist.writeto(filename)
 
-    def integrate(self, fluxunits='photlam'):
+    def integrate(self, fluxunits='photlam', analytic=True):
         """Integrate the flux in given unit.
 
         Integration is done using :meth:`~Integrator.trapezoidIntegration`
@@ -544,25 +787,45 @@ class SourceSpectrum(Integrator):
 
             \\textnormal{result} = \\int F_{\\lambda} d\\lambda
 
+        In ``photlam`` and Angstrom, analytic spectra and their sums,
+        scalings, and products with `Box` bandpasses are integrated
+        over the same range in closed form instead, without tabulating
+        them. This differs from the trapezoid sum by up to the 0.01
+        Angstrom step of the `Box` table at each edge, so ratios of
+        integrals should be computed the same way on both sides.
+
         Parameters
         ----------
         fluxunits : str
             Flux unit to integrate in.
 
+        analytic : bool
+            Use closed-form integrals where available. Default is `True`.
+
         Returns
         -------
         result : float
             Integrated sum.
 
         """
+        if analytic and units.Units(fluxunits).name == 'photlam':
+            ans = _analyticIntegral(self)
+            if ans is not None:
+                return ans
+
         # Extract the flux in the desired units
-        u = self.fluxunits
-        self.convert(fluxunits)
-        wave, flux = self.getArrays()
-        self.convert(u)
+        wave, flux = self.getArrays(fluxunits=fluxunits)
         # then do the integration
         return self.trapezoidIntegration(wave, flux)
 
+    def _integral(self, lo, hi):
+        """Return the integral of the ``photlam`` flux from ``lo`` to
+        ``hi`` Angstrom in closed form, or `None` if there is none.
+        Analytic spectra override this.
+
+        """
+        return None
+
     def sample(self, wave, interp=True):
         """Sample the spectrum at given wavelength(s).
 
@@ -671,19 +934,14 @@ class SourceSpectrum(Integrator):
         """
         # By default, apply only the doppler shift.
 
-        waveunits = self.waveunits
-        fluxunits = self.fluxunits
-        self.convert('angstrom')
-        self.convert('photlam')
-        newwave = self.wave.astype(N.float64) * (1.0 + z)
+        wave, flux = self.getArrays('angstrom', 'photlam')
+        newwave = wave.astype(N.float64) * (1.0 + z)
         copy = ArraySourceSpectrum(wave=newwave,
-                                   flux=self.flux,
-                                   waveunits=self.waveunits,
-                                   fluxunits=self.fluxunits,
+                                   flux=flux,
+                                   waveunits='angstrom',
+                                   fluxunits='photlam',
                                    name="%s at z=%g" % (self.name, z))
 
-        self.convert(waveunits)
-        self.convert(fluxunits)
         return copy
 
     def setMagnitude(self, band, value):
@@ -761,7 +1019,7 @@ class SourceSpectrum(Integrator):
             "Ticket #140: calcphot.effstim functionality")
 
 
-class CompositeSourceSpectrum(SourceSpectrum):
+class CompositeSourceSpectrum(CompositeCache, SourceSpectrum):
     """Class to handle :ref:`composite spectrum <pysynphot-composite-spectrum>`
     involving source spectra.
 
@@ -798,6 +1056,7 @@ class CompositeSourceSpectrum(SourceSpectrum):
 
     wave, flux : array_like
         Wavelength set and associated flux in user units.
+        Both are memoized; see `CompositeCache`.
 
     Raises
     ------
@@ -809,6 +1068,7 @@ class CompositeSourceSpectrum(SourceSpectrum):
         self.component1 = source1
         self.component2 = source2
         self.operation = operation
+        self._clearCache()
 
         self.name = str(self)
 
@@ -869,11 +1129,42 @@ class CompositeSourceSpectrum(SourceSpectrum):
         """Add or multiply components, delegating the function calculation
         to the individual objects.
         """
+        return self._cachedCall(wavelength)
+
+    def _evaluate(self, wavelength):
         if self.operation == 'add':
-            return self.component1(wavelength) + self.component2(wavelength)
+            return (_evaluateComponent(self.component1, wavelength) +
+                    _evaluateComponent(self.component2, wavelength))
 
         if self.operation == 'multiply':
-            return self.component1(wavelength) * self.component2(wavelength)
+            return (_evaluateComponent(self.component1, wavelength) *
+                    _evaluateComponent(self.component2, wavelength))
+
+    def _integral(self, lo, hi):
+        if self.operation == 'add':
+            parts = [comp._integral(lo, hi) for comp in self._children()]
+            if None in parts:
+                return None
+            return sum(parts)
+
+        if isinstance(self.component1, SpectralElement):
+            band, source = self.component1, self.component2
+        else:
+            band, source = self.component2, self.component1
+
+        segments = band._segments()
+        if segments is None:
+            return None
+
+        total = 0.0
+        for a, b, value in segments:
+            a, b = max(a, lo), min(b, hi)
+            if a < b:
+                part = source._integral(a, b)
+                if part is None:
+                    return None
+                total += value * part
+        return total
 
     def __iter__(self):
         """Allow iteration over each component."""
@@ -896,7 +1187,8 @@ class CompositeSourceSpectrum(SourceSpectrum):
     def GetWaveSet(self):
         """Obtain the wavelength set for the composite spectrum.
         This is done by using :func:`MergeWaveSets` to form a union of
-        wavelength sets from its components.
+        wavelength sets from all its components and sub-components
+        in one pass.
 
         Returns
         -------
@@ -904,9 +1196,25 @@ class CompositeSourceSpectrum(SourceSpectrum):
             Composite wavelength set.
 
         """
-        waveset1 = self.component1.GetWaveSet()
-        waveset2 = self.component2.GetWaveSet()
-        return MergeWaveSets(waveset1, waveset2)
+        return self._cachedWaveSet()
+
+    def _children(self):
+        return (self.component1, self.component2)
+
+    def convert(self, targetunits):
+        """Set new user unit, for either wavelength or flux.
+        Memoized results are discarded if the unit changes.
+
+        Parameters
+        ----------
+        targetunits : str
+            New unit name, as accepted by `~pysynphot.units.Units`.
+
+        """
+        oldunits = (self.waveunits.name, self.fluxunits.name)
+        SourceSpectrum.convert(self, targetunits)
+        if (self.waveunits.name, self.fluxunits.name) != oldunits:
+            self._clearCache()
 
     def tabulate(self):
         """Return a simplified version of the spectrum.
@@ -1245,6 +1553,65 @@ class ArraySourceSpectrum(TabularSourceSpectrum):
         self.ToInternal()
 
 
+def _loadDiskCache(sp, filename, variant, tablename):
+    """Restore the tables and units of a file-based spectrum or
+    bandpass from the on-disk cache (see `~pysynphot.Cache`).
+
+    Returns the cached metadata, or `None` if there is no entry.
+
+    """
+    entry = Cache.disk_cache_load(filename, variant)
+    if entry is None:
+        return None
+
+    arrays, meta = entry
+    sp._wavetable = arrays['wave']
+    setattr(sp, tablename, arrays['values'])
+    sp.waveunits = units.Units(meta['waveunits'])
+    if 'fluxunits' in meta:
+        sp.fluxunits = units.Units(meta['fluxunits'])
+    if 'fheaders' in meta:
+        sp.fheader = _mergeHeaders(
+            *[pyfits.Header.fromstring(h) for h in meta['fheaders']])
+    elif 'fheader' in meta:
+        sp.fheader = meta['fheader']
+    return meta
+
+
+def _mergeHeaders(primary, extension):
+    """Merge the headers of a spectrum or bandpass file into a
+    dictionary. If duplicate keywords exist, the value in the
+    extension header will override that in the primary.
+
+    """
+    fheader = dict(primary)
+    fheader.update(dict(extension))
+    return fheader
+
+
+def _saveDiskCache(sp, filename, variant, tablename, **meta):
+    """Store the tables and units of a file-based spectrum or
+    bandpass in the on-disk cache, if it is enabled.
+
+    """
+    if Cache.DISK_CACHE_DIR is None:
+        return
+
+    meta['waveunits'] = sp.waveunits.name
+    if hasattr(sp, 'fluxunits'):
+        meta['fluxunits'] = sp.fluxunits.name
+    if '_fitsheaders' in sp.__dict__:
+        # FITS headers are stored as cards, so that they are restored
+        # with their COMMENT and HISTORY cards and value types.
+        meta['fheaders'] = sp.__dict__.pop('_fitsheaders')
+    elif hasattr(sp, 'fheader'):
+        meta['fheader'] = sp.fheader
+    Cache.disk_cache_save(filename, variant,
+                          {'wave': sp._wavetable,
+                           'values': getattr(sp, tablename)},
+                          meta)
+
+
 class FileSourceSpectrum(TabularSourceSpectrum):
     """Class to handle
     :ref:`source spectrum loaded from ASCII or FITS table <pysynphot-source-from-file>`.
@@ -1286,12 +1653,19 @@ class FileSourceSpectrum(TabularSourceSpectrum):
     """
     def __init__(self, filename, fluxname=None, keepneg=False):
         self.name = locations.irafconvert(filename)
-        self._readSpectrumFile(self.name, fluxname)
-        self.validate_units()
-        self.validate_wavetable()
-        if not keepneg:
-            self.validate_fluxtable()
-        self.ToInternal()
+
+        # Tables are cached after validation and conversion to
+        # internal units, so a cache hit skips all of it.
+        variant = 'FileSourceSpectrum:%s:%s' % (fluxname, keepneg)
+        if _loadDiskCache(self, self.name, variant, '_fluxtable') is None:
+            self._readSpectrumFile(self.name, fluxname)
+            self.validate_units()
+            self.validate_wavetable()
+            if not keepneg:
+                self.validate_fluxtable()
+            self.ToInternal()
+            _saveDiskCache(self, self.name, variant, '_fluxtable')
+
         self.isAnalytic = False
         self.warnings = {}
 
@@ -1314,10 +1688,10 @@ class FileSourceSpectrum(TabularSourceSpectrum):
         self.fluxunits = units.Units(fs[1].header['tunit2'].lower())
 
         # Retain the header information as a convenience for the user.
-        # If duplicate keywords exist, the value in the extension
-        # header will override that in the primary.
-        self.fheader = dict(fs[0].header)
-        self.fheader.update(dict(fs[1].header))
+        self.fheader = _mergeHeaders(fs[0].header, fs[1].header)
+        if Cache.DISK_CACHE_DIR is not None:
+            self._fitsheaders = [fs[0].header.tostring(),
+                                 fs[1].header.tostring()]
 
         fs.close()
 
@@ -1373,13 +1747,29 @@ class AnalyticSpectrum(SourceSpectrum):
     def GetWaveSet(self):
         """Return the wavelength set for the spectrum.
 
+        With adaptive sampling (see
+        :func:`~pysynphot.refs.set_adaptive_waveset`), a coarse grid over
+        the range of the default wavelength table is refined where the
+        curvature of the spectrum needs it.
+
         Returns
         -------
         waveset : array_like
-            Wavelength set (a copy of the default wavelength table).
+            Wavelength set (a copy of the default wavelength table, or
+            the adaptive grid).
 
         """
-        return refs._default_waveset.copy()
+        tolerance = refs._waveset_tolerance
+        if tolerance is None:
+            return refs._default_waveset.copy()
+
+        wmin, wmax = AnalyticSpectrum._waveRange(self)
+        wave = N.logspace(N.log10(wmin), N.log10(wmax), 33)
+        return _refineWaveSet(self, wave, tolerance)
+
+    def _waveRange(self):
+        # Without copying the default wavelength table
+        return refs._default_waveset.min(), refs._default_waveset.max()
 
 
 class GaussianSource(AnalyticSpectrum):
@@ -1480,18 +1870,61 @@ class GaussianSource(AnalyticSpectrum):
 
             \\delta x = 0.1 \\; \\sigma
 
+        With adaptive sampling (see
+        :func:`~pysynphot.refs.set_adaptive_waveset`), the grid is centred
+        on the line and extends to where the curve is below the tolerance
+        of its peak, with points added near the peak as needed.
+
         Returns
         -------
         waveset : array_like
             Wavelength set in internal unit.
 
         """
+        tolerance = refs._waveset_tolerance
+        if tolerance is not None:
+            return self._adaptiveWaveSet(tolerance)
+
         increment = 0.1*self.sigma
         first = self.center - 50.0*increment
         last = self.center + 50.0*increment
         waveset = N.arange(first, last, increment)
         return self._input_wave_units.Convert(waveset, 'angstrom')
 
+    def _adaptiveWaveSet(self, tolerance):
+        # Grid centred on the line, out to where it drops below the
+        # square of the tolerance so that interpolating from there over
+        # a wide bandpass is still within it, then refined as needed.
+        nsigma = max(2.0 * math.sqrt(math.log(1.0 / tolerance)), 1.0)
+        npts = 2 * int(math.ceil(nsigma)) + 1
+        waveset = self.center + self.sigma * N.linspace(-nsigma, nsigma, npts)
+        waveset = N.sort(self._input_wave_units.Convert(waveset, 'angstrom'))
+        return _refineWaveSet(self, waveset, tolerance)
+
+    def _waveRange(self):
+        return Integrator._waveRange(self)
+
+    def _integral(self, lo, hi):
+        if self._input_wave_units.name != 'angstrom':
+            return None
+
+        root2sigma = math.sqrt(2.0) * self.sigma
+        xlo = (lo - self.center) / root2sigma
+        xhi = (hi - self.center) / root2sigma
+        total = 0.5 * self.total_flux * (math.erf(xhi) - math.erf(xlo))
+
+        fluxname = self._input_flux_units.name
+        if fluxname == 'photlam':
+            return total
+        elif fluxname == 'flam':
+            # photlam = flam * wave / HC, and the integral of
+            # (wave - center) * gaussian is analytic.
+            offset = self.factor * self.sigma**2 * (
+                math.exp(-xlo * xlo) - math.exp(-xhi * xhi))
+            return (self.center * total + offset) / units.HC
+        else:
+            return None
+
 
 class FlatSpectrum(AnalyticSpectrum):
     """Class to handle a :ref:`flat source spectrum <pysynphot-flat-spec>`.
@@ -1573,6 +2006,25 @@ class FlatSpectrum(AnalyticSpectrum):
         ans = FlatSpectrum(tmp.flux.max(), fluxunits=tmp.fluxunits)
         return ans
 
+    def _integral(self, lo, hi):
+        if self.waveunits.name != 'angstrom':
+            return None
+
+        fluxname = self._input_flux_units.name
+        if fluxname in _PHOTLAM_POWERS:
+            factor, power = _PHOTLAM_POWERS[fluxname]
+            factor *= self._fluxdensity
+        elif fluxname == 'abmag':
+            factor = 10.0**(-0.4 * (self._fluxdensity - units.ABZERO)) / units.H
+            power = -1
+        elif fluxname == 'stmag':
+            factor = 10.0**(-0.4 * (self._fluxdensity - units.STZERO)) / units.HC
+            power = 1
+        else:
+            return None
+
+        return factor * _powerIntegral(lo, hi, power)
+
 # This change produces 5 errors and 17 failures in cos_etc_test.py
 #     def GetWaveSet(self):
 #         return N.array([_default_waveset[0],_default_waveset[-1]])
@@ -1648,6 +2100,16 @@ class Powerlaw(AnalyticSpectrum):
         # convert flux to photlam before returning
         return self._input_flux_units.ToPhotlam(wave, flux, area=area)
 
+    def _integral(self, lo, hi):
+        fluxname = self._input_flux_units.name
+        if (self._input_wave_units.name != 'angstrom' or
+                fluxname not in _PHOTLAM_POWERS):
+            return None
+
+        factor, power = _PHOTLAM_POWERS[fluxname]
+        return (factor * float(self._refwave) ** -self._index *
+                _powerIntegral(lo, hi, power + self._index))
+
 
 class BlackBody(AnalyticSpectrum):
     """Class to handle a :ref:`blackbody source <pysynphot-planck-law>`.
@@ -1750,7 +2212,7 @@ class SpectralElement(Integrator):
     def __rmul__(self, other):
         return self.__mul__(other)
 
-    def integrate(self, wave=None):
+    def integrate(self, wave=None, analytic=True):
         """Integrate the throughput over the specified wavelength set.
         If no wavelength set is specified, the built-in one is used.
 
@@ -1763,6 +2225,11 @@ class SpectralElement(Integrator):
         wave : array_like or `None`
             Wavelength set for integration.
 
+        analytic : bool
+            If no wavelength set is given, integrate piecewise-constant
+            bandpasses in closed form, as in :meth:`sumfilt`.
+            Default is `True`.
+
         Returns
         -------
         ans : float
@@ -1771,10 +2238,121 @@ class SpectralElement(Integrator):
         """
 
         if wave is None:
+            if analytic:
+                ans = self._analyticSumfilt(0)
+                if ans is not None:
+                    return ans
             wave = self.wave
         ans = self.trapezoidIntegration(wave, self(wave))
         return ans
 
+    def sumfilt(self, npow, analytic=False):
+        """Integrate the throughput times a power of the wavelength
+        over the built-in wavelength set, like SYNPHOT's ``SUMFILT``.
+
+        .. math::
+
+            \\textnormal{SUMFILT} = \\int P_{\\lambda} \\; \\lambda^{n} \\; d\\lambda
+
+        This is used by the ``unitResponse`` methods of
+        :ref:`pysynphot-flux-units`.
+
+        Parameters
+        ----------
+        npow : int
+            Power of the wavelength, :math:`n`.
+
+        analytic : bool
+            Integrate piecewise-constant bandpasses (`Box`,
+            `UniformTransmission`, and their products) in closed form,
+            for use with closed-form integrals of analytic spectra
+            (see :meth:`SourceSpectrum.integrate`). Otherwise, or for
+            other bandpasses, :meth:`~Integrator.trapezoidIntegration`
+            is used. Default is `False`.
+
+        Returns
+        -------
+        ans : float
+            Integrated sum.
+
+        """
+        if analytic:
+            ans = self._analyticSumfilt(npow)
+            if ans is not None:
+                return ans
+
+        weight = None
+        if npow not in (0, 1):
+            weight = lambda w: w**float(npow)
+        wave, thru = self._refinedArrays(weight)
+        wave = units.Angstrom().Convert(wave, self.waveunits.name)
+
+        if npow >= 0:
+            thru = thru * wave**npow
+        else:
+            thru = thru / wave**(-npow)
+        return self.trapezoidIntegration(wave, thru)
+
+    def _refinedArrays(self, weight=None):
+        """Return the wavelength set in Angstrom and the throughput on
+        it, for integrals of the throughput times ``weight``.
+
+        With adaptive sampling (see
+        :func:`~pysynphot.refs.set_adaptive_waveset`), the bandpass may
+        only be sampled for its own shape (e.g., a `Box` only has its
+        edges), so the wavelength set is refined for ``weight``.
+
+        """
+        wave = self.GetWaveSet()
+        if refs._waveset_tolerance is not None and weight is not None:
+            wave = _refineWaveSet(weight, wave, refs._waveset_tolerance)
+        return wave, self(wave)
+
+    def _analyticSumfilt(self, npow):
+        """Closed-form counterpart of :meth:`sumfilt`, or `None`."""
+        if not self.isAnalytic or self.waveunits.name != 'angstrom':
+            return None
+
+        segments = self._segments()
+        if segments is None:
+            return None
+        wrange = self._waveRange()
+        if wrange is None:
+            return None
+
+        total = 0.0
+        for a, b, value in segments:
+            a, b = max(a, wrange[0]), min(b, wrange[1])
+            if a < b:
+                total += value * _powerIntegral(a, b, npow)
+        return total
+
+    def _segments(self):
+        """Return the throughput as a list of ``(lo, hi, value)``
+        intervals in Angstrom, outside of which it is zero, or `None`
+        if it is not piecewise constant. Such bandpasses override this.
+
+        """
+        return None
+
+    def _support(self):
+        """Return the ``(min, max)`` wavelength range in Angstrom outside
+        of which the throughput is zero, including the zero points at
+        its ends, or `None` if there is no such range.
+
+        """
+        wave = self.GetWaveSet()
+        if wave is None:
+            return None
+
+        nonzero = N.flatnonzero(self(wave))
+        if nonzero.size == 0:
+            return None
+
+        lo = wave[max(nonzero[0] - 1, 0)]
+        hi = wave[min(nonzero[-1] + 1, wave.size - 1)]
+        return min(lo, hi), max(lo, hi)
+
 # ..................................................................
 # Methods to implement bandpar functionality go here
 # ..................................................................
@@ -1787,12 +2365,7 @@ class SpectralElement(Integrator):
             Average wavelength.
 
         """
-        mywaveunits = self.waveunits.name
-        self.convert('angstroms')
-
-        wave = self.wave
-        thru = self.throughput
-        self.convert(mywaveunits)
+        wave, thru = self.getArrays('angstrom')
 
         num = self.trapezoidIntegration(wave, thru*wave)
         den = self.trapezoidIntegration(wave, thru)
@@ -1832,7 +2405,8 @@ class SpectralElement(Integrator):
                 raise AttributeError('Class ' + str(type(self)) +
                                      ' does not support binning.')
         else:
-            wave = self.wave
+            wave = self._refinedArrays(lambda w: 1.0 / w)[0]
+            wave = units.Angstrom().Convert(wave, self.waveunits.name)
 
         countmulwave = self(wave)*wave
         countdivwave = self(wave)/wave
@@ -1861,19 +2435,15 @@ class SpectralElement(Integrator):
             RMS band width.
 
         """
-        mywaveunits = self.waveunits.name
-        self.convert('angstroms')
-
-        wave = self.wave
-        thru = self.throughput
-        self.convert(mywaveunits)
+        avg_wave = self.avgwave()
+        wave, thru = self._refinedArrays(lambda w: (w - avg_wave)**2)
 
         if floor != 0:
             idx = N.where(thru >= floor)
             wave = wave[idx]
             thru = thru[idx]
 
-        integrand = (wave-self.avgwave())**2 * thru
+        integrand = (wave-avg_wave)**2 * thru
         num = self.trapezoidIntegration(wave, integrand)
         den = self.trapezoidIntegration(wave, thru)
 
@@ -1899,12 +2469,7 @@ class SpectralElement(Integrator):
             RMS band width (deprecated).
 
         """
-        mywaveunits = self.waveunits.name
-        self.convert('angstroms')
-
-        wave = self.wave
-        thru = self.throughput
-        self.convert(mywaveunits)
+        wave, thru = self._refinedArrays(lambda w: N.log(w) / w)
 
         # calculate the average wavelength
         num = self.trapezoidIntegration(wave, thru * N.log(wave) / wave)
@@ -1914,6 +2479,8 @@ class SpectralElement(Integrator):
             return 0.0
 
         avg_wave = N.exp(num/den)
+        wave, thru = self._refinedArrays(
+            lambda w: N.log(w / avg_wave)**2 / w)
 
         if floor != 0:
             idx = N.where(thru >= floor)
@@ -1938,12 +2505,7 @@ class SpectralElement(Integrator):
             Bandpass rectangular width.
 
         """
-        mywaveunits = self.waveunits.name
-        self.convert('angstroms')
-
-        wave = self.wave
-        thru = self.throughput
-        self.convert(mywaveunits)
+        wave, thru = self.getArrays('angstrom')
 
         num = self.trapezoidIntegration(wave, thru)
         den = thru.max()
@@ -1974,12 +2536,7 @@ class SpectralElement(Integrator):
             Bandpass dimensionless efficiency.
 
         """
-        mywaveunits = self.waveunits.name
-        self.convert('angstroms')
-
-        wave = self.wave
-        thru = self.throughput
-        self.convert(mywaveunits)
+        wave, thru = self._refinedArrays(lambda w: 1.0 / w)
 
         ans = self.trapezoidIntegration(wave, thru/wave)
         return ans
@@ -2014,15 +2571,22 @@ class SpectralElement(Integrator):
         lorange = sorted([s1, o1])
         hirange = sorted([s2, o2])
 
-        # Get the full throughput
-        total = self.integrate()
+        # Get the full throughput, summed like the pieces below
+        total = self.integrate(analytic=False)
 
         # Now get the other two pieces
         # We cannot yet do
         # low = self[slice(*lowrange)].integrate()
         wave = self.wave
-        idxs = [N.searchsorted(wave, lorange, 'left'),
-                N.searchsorted(wave, hirange, 'left')]
+        side = 'left'
+        if refs._waveset_tolerance is not None:
+            # The adaptive wavelength set may not have points near the
+            # ends of the pieces, so they are added and included.
+            wave = MergeWaveSets(wave, N.array(lorange + hirange))
+            side = 'right'
+        idxs = [[N.searchsorted(wave, r[0], 'left'),
+                 N.searchsorted(wave, r[1], side)]
+                for r in (lorange, hirange)]
 
         excluded = 0.0
         for idx in idxs:
@@ -2448,6 +3012,34 @@ class SpectralElement(Integrator):
         """
         return self._wavetable
 
+    def getArrays(self, waveunits=None):
+        """Return wavelength and throughput arrays.
+
+        This does not change ``self.waveunits``.
+
+        Parameters
+        ----------
+        waveunits : str or `None`
+            Wavelength unit. If `None`, ``self.waveunits`` is used.
+
+        Returns
+        -------
+        wave : array_like
+            Wavelength array in ``waveunits``.
+
+        throughput : array_like
+            Throughput values.
+
+        """
+        if waveunits is None:
+            waveunits = self.waveunits
+
+        wave = self.GetWaveSet()
+        thru = self(wave)
+        wave = units.Angstrom().Convert(wave, units.Units(waveunits).name)
+
+        return wave, thru
+
     # Define properties for consistent UI
     def _getWaveProp(self):
         """Return wavelength in user units."""
@@ -2480,7 +3072,7 @@ class SpectralElement(Integrator):
         raise NotImplementedError("#139: Implement calcband functionality")
 
 
-class CompositeSpectralElement(SpectralElement):
+class CompositeSpectralElement(CompositeCache, SpectralElement):
     """Class to handle :ref:`composite spectrum <pysynphot-composite-spectrum>`
     involving bandpasses.
 
@@ -2517,6 +3109,7 @@ class CompositeSpectralElement(SpectralElement):
 
     wave, throughput : array_like
         Wavelength set in user unit and associated unitless throughput.
+        Both are memoized; see `CompositeCache`.
 
     Raises
     ------
@@ -2539,6 +3132,7 @@ class CompositeSpectralElement(SpectralElement):
 
         self.component1 = component1
         self.component2 = component2
+        self._clearCache()
 
         self.isAnalytic = component1.isAnalytic and component2.isAnalytic
 
@@ -2590,7 +3184,27 @@ class CompositeSpectralElement(SpectralElement):
 
     def __call__(self, wavelength):
         """This is where the throughput calculation is delegated."""
-        return self.component1(wavelength) * self.component2(wavelength)
+        return self._cachedCall(wavelength)
+
+    def _evaluate(self, wavelength):
+        return (_evaluateComponent(self.component1, wavelength) *
+                _evaluateComponent(self.component2, wavelength))
+
+    def _segments(self):
+        segments1 = self.component1._segments()
+        if segments1 is None:
+            return None
+        segments2 = self.component2._segments()
+        if segments2 is None:
+            return None
+
+        ans = []
+        for a1, b1, value1 in segments1:
+            for a2, b2, value2 in segments2:
+                a, b = max(a1, a2), min(b1, b2)
+                if a < b:
+                    ans.append((a, b, value1 * value2))
+        return ans
 
     def __str__(self):
         return self.name
@@ -2608,7 +3222,8 @@ class CompositeSpectralElement(SpectralElement):
     def GetWaveSet(self):
         """Obtain the wavelength set for the composite spectrum.
         This is done by using :func:`MergeWaveSets` to form a union of
-        wavelength sets from its components.
+        wavelength sets from all its components and sub-components
+        in one pass.
 
         Returns
         -------
@@ -2616,12 +3231,28 @@ class CompositeSpectralElement(SpectralElement):
             Composite wavelength set.
 
         """
-        wave1 = self.component1.GetWaveSet()
-        wave2 = self.component2.GetWaveSet()
-        return MergeWaveSets(wave1, wave2)
+        return self._cachedWaveSet()
+
+    def _children(self):
+        return (self.component1, self.component2)
 
     wave = property(GetWaveSet, doc='Wavelength property.')
 
+    def convert(self, targetunits):
+        """Set new user unit, for wavelength only.
+        Memoized results are discarded if the unit changes.
+
+        Parameters
+        ----------
+        targetunits : str
+            New unit name, as accepted by `~pysynphot.units.Units`.
+
+        """
+        oldunits = self.waveunits.name
+        SpectralElement.convert(self, targetunits)
+        if self.waveunits.name != oldunits:
+            self._clearCache()
+
 
 class UniformTransmission(SpectralElement):
     """Class to handle a :ref:`uniform bandpass <pysynphot-bandpass-uniform>`.
@@ -2724,6 +3355,9 @@ class UniformTransmission(SpectralElement):
         """
         pass
 
+    def _segments(self):
+        return [(-N.inf, N.inf, float(self.value))]
+
     def __call__(self, wavelength):
         """__call__ returns the constant value as an array, given a
         wavelength array as argument.
@@ -2780,10 +3414,18 @@ class TabularSpectralElement(SpectralElement):
         self.isAnalytic = False
         self.warnings = {}
         if fileName:
-            if fileName.endswith('.fits') or fileName.endswith('.fit'):
+            variant = 'TabularSpectralElement:%s' % thrucol
+            meta = _loadDiskCache(self, fileName, variant, '_throughputtable')
+            if meta is not None:
+                self.throughputunits = 'none'
+                if 'header' in meta:
+                    self.getHeaderKeywords(
+                        pyfits.Header.fromstring(meta['header']))
+            elif fileName.endswith('.fits') or fileName.endswith('.fit'):
                 self._readFITS(fileName, thrucol)
             else:
                 self._readASCII(fileName)
+                _saveDiskCache(self, fileName, variant, '_throughputtable')
             self.name = fileName
 
         else:
@@ -2831,6 +3473,11 @@ class TabularSpectralElement(SpectralElement):
 
         self.getHeaderKeywords(fs[1].header)
 
+        # The header is kept with the cached tables for
+        # getHeaderKeywords in subclasses.
+        _saveDiskCache(self, filename, 'TabularSpectralElement:%s' % thrucol,
+                       '_throughputtable', header=fs[1].header.tostring())
+
         fs.close()
 
     def getHeaderKeywords(self, header):
@@ -2942,11 +3589,16 @@ class FileSpectralElement(TabularSpectralElement):
     """
     def __init__(self, filename, thrucol=None):
         self.name = locations.irafconvert(filename)
-        self._readThroughputFile(self.name, thrucol)
 
-        self.validate_units()
-        self.validate_wavetable()
-        self.ToInternal()
+        variant = 'FileSpectralElement:%s' % thrucol
+        if _loadDiskCache(self, self.name, variant,
+                          '_throughputtable') is None:
+            self._readThroughputFile(self.name, thrucol)
+            self.validate_units()
+            self.validate_wavetable()
+            self.ToInternal()
+            _saveDiskCache(self, self.name, variant, '_throughputtable')
+
         self.isAnalytic = False
         self.warnings = {}
 
@@ -2968,10 +3620,10 @@ class FileSpectralElement(TabularSpectralElement):
         self.waveunits = units.Units(fs[1].header['tunit1'].lower())
 
         # Retain the header information as a convenience for the user.
-        # If duplicate keywords exist, the value in the extension
-        # header will override that in the primary.
-        self.fheader = dict(fs[0].header)
-        self.fheader.update(dict(fs[1].header))
+        self.fheader = _mergeHeaders(fs[0].header, fs[1].header)
+        if Cache.DISK_CACHE_DIR is not None:
+            self._fitsheaders = [fs[0].header.tostring(),
+                                 fs[1].header.tostring()]
 
         fs.close()
 
@@ -3285,10 +3937,30 @@ class Box(SpectralElement):
         self.lower = self.center - self.width / 2.0
         self.upper = self.center + self.width / 2.0
         step = 0.01  # fixed step for now (in A)
+        self._step = step
         self._wavetable = N.arange(
             self.lower - step, self.upper + step + step, step)
         self._throughputtable = self(self._wavetable)
 
+    def GetWaveSet(self):
+        """Obtain the wavelength set for the box.
+
+        With adaptive sampling (see
+        :func:`~pysynphot.refs.set_adaptive_waveset`), this only has
+        the edges of the box, and a step outside of each.
+
+        Returns
+        -------
+        wave : array_like
+            Wavelength set in internal unit.
+
+        """
+        if refs._waveset_tolerance is None:
+            return self._wavetable
+
+        return N.array([self.lower - self._step, self.lower,
+                        self.upper, self.upper + self._step])
+
     def __call__(self, wave):
         """Input wavelengths assumed to be in Angstrom."""
 
@@ -3304,6 +3976,9 @@ class Box(SpectralElement):
 
         return thru
 
+    def _segments(self):
+        return [(self.lower, self.upper, 1.0)]
+
     def sample(self, wavelength):
         """Input wavelengths assumed to be in user unit."""
         wave = self.waveunits.Convert(wavelength, 'angstrom')
@@ -3330,4 +4005,53 @@ class Box(SpectralElement):
             throughput=self(resampledWaveTab).copy())
 
 
-Vega = FileSourceSpectrum(locations.VegaFile)
+# Held while a _LazyFileSourceSpectrum reads its file, so that other
+# threads wait for it.
+_lazy_lock = threading.RLock()
+
+
+class _LazyFileSourceSpectrum(FileSourceSpectrum):
+    """`FileSourceSpectrum` that reads its file the first time it is
+    used rather than when it is created. The file name is fixed at
+    creation.
+
+    """
+    def __init__(self, filename, fluxname=None, keepneg=False):
+        self._lazyargs = (filename, fluxname, keepneg)
+
+    def _load(self):
+        """Read the file if not done yet. Return whether attributes
+        that were missing may now be set.
+
+        """
+        if '_lazyargs' not in self.__dict__:
+            return False
+        with _lazy_lock:
+            args = self.__dict__.get('_lazyargs')
+            if args is None:
+                # Read by another thread meanwhile.
+                return True
+            if self.__dict__.get('_loading'):
+                # Attributes looked up while reading are not set yet.
+                return False
+            self._loading = True
+            try:
+                FileSourceSpectrum.__init__(self, *args)
+                del self._lazyargs
+            finally:
+                del self._loading
+        return True
+
+    def __getattr__(self, name):
+        # This is only called for attributes that are not set,
+        # i.e., before the file is read.
+        if name.startswith('__') or not self._load():
+            raise AttributeError(name)
+        return getattr(self, name)
+
+    def convert(self, targetunits):
+        self._load()
+        FileSourceSpectrum.convert(self, targetunits)
+
+
+Vega = _LazyFileSourceSpectrum(locations.VegaFile)
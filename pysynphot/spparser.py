@@ -4,13 +4,18 @@ This file implements the pysynphot language parser.
 The language definition is in the docstring of class BaseParser,
 function p_top.  The parser code in spark.py builds its internal
 tables by reading the docstring, so you can't put anything else
-(like documentation) there.
+(like documentation) there.  The SPARK Earley parser is slow on long
+expressions, so parse() uses DescentParser, a recursive-descent parser
+for the same grammar that builds the same AST; parse_spark() is kept
+as a reference.
 ::
 
   l = scan('text') returns a list of tokens
 
   t = parse(l) converts the list of tokens into an Abstract Syntax Tree
 
+  t = parse_text('text') does both, reusing the trees of earlier calls
+
   r = interpret(t) converts that abstract syntax tree into a (tree
     of?) pysynphot object, based on the conversion rules in class Interpreter
 
@@ -18,12 +23,20 @@ In class Interpreter, the docstring of every function named with p\_
 is part of the instructions to the parser.
 """
 from __future__ import absolute_import, division, print_function
+import copy
+
+import numpy as np
+
 from .spark import GenericScanner, GenericASTBuilder, GenericASTMatcher
 from . import spectrum
 from . import reddening
 from . import locations
 from . import catalog
+from . import refs
+from . import Cache
+from .optimize import optimize as _optimize
 from .obsbandpass import ObsBandpass
+from .batch import SpectrumBatch
 from .exceptions import DisjointError, OverlapError
 
 syfunctions = [
@@ -187,9 +200,95 @@ class BaseParser(GenericASTBuilder):
             return args[0]
         return GenericASTBuilder.nonterminal(self, type, args)
 
+class DescentParser(object):
+    """Recursive-descent parser for the grammar of `BaseParser`.
+
+    It builds the same `AST` as the SPARK parser, with one node per
+    rule that has more than one symbol, in time linear in the number
+    of tokens. Left-recursive rules are parsed as loops, so that
+    ``a + b + c`` is still ``expr(expr(a + b) + c)``.
+    """
+    def __init__(self, ASTclass=None):
+        self.AST = AST if ASTclass is None else ASTclass
+    def parse(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        if len(tokens) == 1 and tokens[0].type == 'FILELIST':
+            return self.terminal(tokens[0])
+        tree = self.expr()
+        if self.pos < len(tokens):
+            self.error(tokens[self.pos])
+        return tree
+    def error(self, token):
+        s = "Pysynphot syntax error at or near '%s' token" % token
+        raise ValueError(s)
+    def terminal(self, token):
+        rv = self.AST(token.type)
+        rv.attr = token.attr
+        return rv
+    def nonterminal(self, type, args):
+        rv = self.AST(type)
+        rv[:len(args)] = args
+        return rv
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos].type
+        return None
+    def take(self, *types):
+        if self.pos >= len(self.tokens):
+            self.error(self.tokens[-1] if self.tokens else 'EOF')
+        token = self.tokens[self.pos]
+        if types and token.type not in types:
+            self.error(token)
+        self.pos += 1
+        return self.terminal(token)
+    def expr(self):
+        # expr ::= expr + term | expr - term | term
+        tree = self.term()
+        while self.peek() in ('+', '-'):
+            op = self.take()
+            tree = self.nonterminal('expr', [tree, op, self.term()])
+        return tree
+    def term(self):
+        # term ::= term * factor | term / factor | factor
+        tree = self.factor()
+        while self.peek() in ('*', '/'):
+            op = self.take()
+            tree = self.nonterminal('term', [tree, op, self.factor()])
+        return tree
+    def factor(self):
+        # factor ::= unaryop value | value
+        if self.peek() in ('+', '-'):
+            op = self.take()
+            return self.nonterminal('factor', [op, self.value()])
+        return self.value()
+    def value(self):
+        # value ::= LPAREN expr RPAREN | INTEGER | FLOAT | IDENTIFIER
+        #         | function_call
+        if self.peek() == 'LPAREN':
+            return self.nonterminal('value', [self.take(), self.expr(),
+                                              self.take('RPAREN')])
+        tree = self.take('INTEGER', 'FLOAT', 'IDENTIFIER')
+        if tree.type == 'IDENTIFIER' and self.peek() == 'LPAREN':
+            # function_call ::= IDENTIFIER LPAREN arglist RPAREN
+            lparen = self.take()
+            args = self.arglist()
+            tree = self.nonterminal('function_call',
+                                    [tree, lparen, args,
+                                     self.take('RPAREN')])
+        return tree
+    def arglist(self):
+        # arglist ::= arglist , expr | expr
+        tree = self.expr()
+        while self.peek() == ',':
+            comma = self.take()
+            tree = self.nonterminal('arglist', [tree, comma, self.expr()])
+        return tree
+
 class Interpreter(GenericASTMatcher):
-    def __init__(self, ast):
+    def __init__(self, ast, optimize=False):
         GenericASTMatcher.__init__(self, 'V', ast)
+        self.optimize = optimize
     def error(self, token):
         raise ValueError("problems in interpreting AST")
     def p_int(self, tree):
@@ -286,6 +385,8 @@ class Interpreter(GenericASTMatcher):
                 if not isinstance(sp,spectrum.SourceSpectrum):
                     name=_handleIRAFName(args[0])
                     sp = spectrum.TabularSourceSpectrum(name)
+                elif self.optimize:
+                    sp = _optimize(sp)
                 #
                 # Always force the renormalization to occur: prevent exceptions
                 #in case of partial overlap. Less robust but duplicates synphot.
@@ -304,7 +405,10 @@ class Interpreter(GenericASTMatcher):
                 # redshift
                 if args[0] != 'null': # the ETC generates junk sometimes....
                     try:
-                        tree.value = args[0].redshift(args[1])
+                        sp = args[0]
+                        if self.optimize:
+                            sp = _optimize(sp)
+                        tree.value = sp.redshift(args[1])
                     except AttributeError:
                         try:
                             #name = getName(args[0])
@@ -346,14 +450,48 @@ def scan(input):
     return scanner.tokenize(input)
 
 def parse(tokens):
+    parser = DescentParser(AST)
+    return parser.parse(tokens)
+
+def parse_spark(tokens):
+    """Parse with the SPARK Earley parser, which `parse` replaced.
+    It builds the same `AST`, and is kept as a reference."""
     parser = BaseParser(AST)
     return parser.parse(tokens)
 
-def interpret(ast):
-    interpreter = Interpreter(ast)
+def copy_ast(tree):
+    """Copy the nodes of an `AST`, without the values set on them
+    by the `Interpreter`."""
+    rv = AST(tree.type)
+    if hasattr(tree, 'attr'):
+        rv.attr = tree.attr
+    rv[:len(tree)] = [copy_ast(kid) for kid in tree]
+    return rv
+
+def parse_text(syncommand):
+    """Scan and parse a synphot-classic command, reusing the `AST` of
+    an earlier call with the same text from
+    ``pysynphot.Cache.AST_CACHE``.
+
+    Returns
+    -------
+    ast : `AST`
+        A copy of the cached tree, which the caller may interpret.
+
+    """
+    tree = Cache.AST_CACHE.get(syncommand)
+    if tree is None:
+        tree = parse(scan(syncommand))
+        Cache.AST_CACHE[syncommand] = tree
+    return copy_ast(tree)
+
+def interpret(ast, optimize=False):
+    interpreter = Interpreter(ast, optimize=optimize)
     interpreter.match()
-    value = ast.value
-    return convertstr(value)
+    value = convertstr(ast.value)
+    if optimize:
+        value = _optimize(value)
+    return value
 
 def ptokens(tlist):
     for token in tlist:
@@ -373,7 +511,429 @@ def _handleThroughputFiles(name):
         return spectrum.TabularSourceSpectrum(_handleIRAFName(name))
 
 #Convenience function
-def parse_spec(syncommand):
-    """Parse the synphot-classic command and return the resulting spectrum"""
-    sp = interpret(parse(scan(syncommand)))
+def parse_spec(syncommand, optimize=False):
+    """Parse the synphot-classic command and return the resulting spectrum.
+
+    If ``optimize`` is `True`, composite spectra are passed through
+    :func:`pysynphot.optimize.optimize` before they are renormalized,
+    redshifted, or returned.
+    """
+    sp = interpret(parse_text(syncommand), optimize=optimize)
     return sp
+
+
+# Text of the tokens that do not keep it. Division needs the blanks
+# around it, or it scans as part of a file name.
+_TOKEN_TEXT = {'LPAREN': '(', 'RPAREN': ')', '/': ' / '}
+
+
+def canonical_spec(syncommand):
+    """Return the synphot-classic command in a canonical form, for
+    cache keys: the text of its tokens without the blanks between them.
+
+    Raises
+    ------
+    Exception
+        If the command cannot be scanned, as with :func:`parse_spec`.
+
+    """
+    return ''.join(t.attr if t.attr is not None
+                   else _TOKEN_TEXT.get(t.type, t.type)
+                   for t in scan(syncommand))
+
+
+def parse_spec_cached(syncommand, optimize=False):
+    """Like :func:`parse_spec`, but reuse the result of an earlier call
+    with the same command, up to blanks, and the same reference data
+    (see `~pysynphot.refs.fingerprint`).
+
+    The spectra are kept in ``pysynphot.Cache.SPECTRUM_CACHE``, and a
+    copy is returned, which the caller can modify. Concurrent calls
+    for the same command parse it only once.
+
+    """
+    key = '%s\n%s\n%s' % (refs.fingerprint(), bool(optimize),
+                           canonical_spec(syncommand))
+    sp = Cache.SPECTRUM_CACHE.call(key, parse_spec, syncommand,
+                                   optimize=optimize)
+    return copy.deepcopy(sp)
+
+
+# Interpreter rule for each AST node, given its type and, for
+# operators, the type of its second or first child.
+_RULES = {'INTEGER': 'p_int',
+          'FLOAT': 'p_float',
+          'IDENTIFIER': 'p_identifier',
+          ('factor', '+'): 'p_factor_unary_plus',
+          ('factor', '-'): 'p_factor_unary_minus',
+          ('expr', '+'): 'p_expr_plus',
+          ('expr', '-'): 'p_expr_minus',
+          ('term', '*'): 'p_term_mult',
+          ('term', '/'): 'p_term_div',
+          'value': 'p_value_paren',
+          'arglist': 'p_arglist',
+          'function_call': 'p_functioncall'}
+
+
+def _number(tree):
+    """Value of an INTEGER or FLOAT node."""
+    return int(tree.attr) if tree.type == 'INTEGER' else float(tree.attr)
+
+
+class _Leaf(object):
+    """Interpreted child of a node, as the Interpreter rules expect it."""
+    def __init__(self, value, svalue=None):
+        self.value = value
+        if svalue is not None:
+            self.svalue = svalue
+
+
+class _Node(object):
+    """Node of a compiled expression. Nodes that do not depend on the
+    parameters keep their value; parameters keep their index."""
+    def __init__(self, tree, kids, rule=None, slot=None):
+        self.type = tree.type
+        self.kids = kids
+        self.rule = rule
+        self.slot = slot
+        self.const = slot is None and all(k.const for k in kids)
+        self.value = None
+        self.svalue = None
+
+
+class _NoBatch(Exception):
+    """The expression cannot be evaluated on a whole batch at once."""
+    pass
+
+
+class _BatchExtinction(object):
+    """``ebmvx`` with one E(B-V) per spectrum, applied by multiplication."""
+    def __init__(self, extval, name):
+        self.extval = extval
+        self.name = name
+
+
+class CompiledSpec(object):
+    """Synphot-classic expression compiled once, and evaluated for
+    many parameter values. See :func:`compile_spec`.
+
+    Attributes
+    ----------
+    template : str
+        The expression.
+
+    params : tuple of str
+        Names of the parameters, in the order of positional arguments.
+
+    defaults : tuple
+        Default values of the parameters: the numbers in the expression
+        if ``params`` were not given, else `None`.
+
+    """
+    def __init__(self, template, params=None, optimize=False):
+        self.template = template
+        self.optimize = optimize
+        self.interpreter = Interpreter(None, optimize=optimize)
+
+        tree = parse(scan(template))
+        if params is None:
+            self._numbers = []
+            self.root = self._compile(tree, auto=True)
+            self.params = tuple('p%d' % i for i in range(len(self._numbers)))
+            self.defaults = tuple(self._numbers)
+        else:
+            self.params = tuple(params)
+            self.defaults = None
+            self.root = self._compile(tree)
+
+    def _compile(self, tree, auto=False, inband=False):
+        if (auto and not inband and tree.type == 'factor' and
+                tree[0].type == '-' and tree[1].type in ('INTEGER', 'FLOAT')):
+            # A negative number is one parameter, not minus a parameter.
+            slot = len(self._numbers)
+            self._numbers.append(-_number(tree[1]))
+            node = _Node(tree[1], [], _RULES[tree[1].type], slot)
+            node.attr = '-' + tree[1].attr
+            return node
+
+        if len(tree) == 0:
+            slot = None
+            if (auto and not inband and
+                    tree.type in ('INTEGER', 'FLOAT')):
+                slot = len(self._numbers)
+                self._numbers.append(_number(tree))
+            elif (not auto and tree.type == 'IDENTIFIER' and
+                    tree.attr in self.params):
+                slot = self.params.index(tree.attr)
+            node = _Node(tree, [], _RULES.get(tree.type), slot)
+            node.attr = tree.attr
+        else:
+            if tree.type == 'function_call':
+                inband = inband or tree[0].attr == 'band'
+            kids = [self._compile(k, auto, inband) for k in tree]
+            if tree.type == 'factor':
+                rule = _RULES[(tree.type, tree[0].type)]
+            elif tree.type in ('expr', 'term'):
+                rule = _RULES[(tree.type, tree[1].type)]
+            else:
+                rule = _RULES[tree.type]
+            node = _Node(tree, kids, rule)
+
+        if node.const:
+            # Bands, files, and everything else that does not depend
+            # on the parameters are only built once.
+            node.value, node.svalue = self._apply(
+                node, [(k.value, k.svalue) for k in node.kids])
+        return node
+
+    def _apply(self, node, kids):
+        """Run the Interpreter rule of a node on interpreted children."""
+        if len(node.kids) == 0:
+            shell = AST(node.type)
+            shell.attr = node.attr
+        else:
+            shell = AST(node.type)
+            shell[:len(kids)] = [_Leaf(v, sv) for v, sv in kids]
+        if node.rule is not None:
+            getattr(self.interpreter, node.rule)(shell)
+        return getattr(shell, 'value', None), getattr(shell, 'svalue', None)
+
+    def _values(self, args, kwargs):
+        values = list(args)
+        if len(values) > len(self.params):
+            raise TypeError('Expected at most %d parameters, got %d' %
+                            (len(self.params), len(values)))
+        for name in self.params[len(values):]:
+            if name in kwargs:
+                values.append(kwargs.pop(name))
+            elif self.defaults is not None:
+                values.append(self.defaults[len(values)])
+            else:
+                raise TypeError('Missing parameter: %s' % name)
+        if kwargs:
+            raise TypeError('Unknown parameters: %s' %
+                            ', '.join(sorted(kwargs)))
+        return values
+
+    def _evaluate(self, node, values):
+        if node.const:
+            return node.value, node.svalue
+        if node.slot is not None:
+            v = values[node.slot]
+            return v, str(v)
+        return self._apply(node, [self._evaluate(k, values)
+                                  for k in node.kids])
+
+    def __call__(self, *args, **kwargs):
+        """Evaluate the expression.
+
+        Parameters
+        ----------
+        args, kwargs
+            Parameter values, by position or by name.
+
+        Returns
+        -------
+        sp
+            The result, as from :func:`parse_spec`.
+
+        """
+        values = self._values(args, kwargs)
+        value = convertstr(self._evaluate(self.root, values)[0])
+        # Parts that do not depend on the parameters are shared between
+        # calls, so the caller gets a copy it can modify, as from
+        # parse_spec_cached().
+        value = copy.deepcopy(value)
+        if self.optimize:
+            value = _optimize(value)
+        return value
+
+    def batch(self, *args, **kwargs):
+        """Evaluate the expression for arrays of parameter values.
+
+        Renormalization, redshift, reddening, and scaling with one value
+        per spectrum are applied to all the spectra at once with
+        `~pysynphot.batch.SpectrumBatch`. Other expressions are
+        evaluated one set of values at a time.
+
+        Parameters
+        ----------
+        args, kwargs
+            Parameter values, by position or by name. They are
+            broadcast against each other to 1D arrays.
+
+        Returns
+        -------
+        batch : `~pysynphot.batch.SpectrumBatch`
+            One spectrum per set of values.
+
+        """
+        columns = [np.atleast_1d(np.asarray(v))
+                   for v in self._values(args, kwargs)]
+        columns = np.broadcast_arrays(*columns) if columns else []
+        if any(c.ndim != 1 for c in columns):
+            raise ValueError('Parameter values must be scalars or 1D.')
+        n = len(columns[0]) if columns else 1
+
+        try:
+            value = self._evaluateBatch(self.root, columns, n)[0]
+            return self._tile(convertstr(value), n)
+        except _NoBatch:
+            # Python numbers, as parse_spec() would give.
+            rows = zip(*[c.tolist() for c in columns]) if columns else [()]
+            return SpectrumBatch.from_spectra([self(*row) for row in rows])
+
+    def _tile(self, sp, n):
+        """Batch of ``n`` copies of a source spectrum."""
+        if isinstance(sp, SpectrumBatch):
+            return sp
+        if not isinstance(sp, spectrum.SourceSpectrum):
+            raise _NoBatch()
+        one = SpectrumBatch.from_spectra([sp])
+        return SpectrumBatch(one.wave, np.repeat(one.flux, n, axis=0),
+                             names=one.names * n)
+
+    def _evaluateBatch(self, node, columns, n):
+        if node.const:
+            return node.value, node.svalue
+        if node.slot is not None:
+            return columns[node.slot], None
+
+        kids = [self._evaluateBatch(k, columns, n) for k in node.kids]
+        values = [v for v, sv in kids]
+        batched = [isinstance(v, (SpectrumBatch, _BatchExtinction))
+                   for v in values]
+        arrays = [isinstance(v, np.ndarray) for v in values]
+
+        if node.rule == 'p_functioncall':
+            return self._batchCall(node, kids, n), None
+        if node.rule in ('p_arglist', 'p_value_paren'):
+            return self._apply(node, kids)
+        if not any(batched):
+            if not any(arrays) or len(values) < 3:
+                return self._apply(node, kids)
+            left, right = convertstr(values[0]), convertstr(values[2])
+            if not (isinstance(left, spectrum.SourceSpectrum) or
+                    isinstance(right, spectrum.SourceSpectrum)):
+                # Arithmetic on the parameter values themselves.
+                return self._apply(node, kids)
+            # Scaling a spectrum by one value per spectrum.
+            if (isinstance(left, spectrum.SourceSpectrum) and
+                    isinstance(right, np.ndarray)):
+                if node.rule == 'p_term_mult':
+                    return self._tile(left, n) * right, None
+                if node.rule == 'p_term_div':
+                    return self._tile(left, n) * (1.0 / right), None
+            if (isinstance(right, spectrum.SourceSpectrum) and
+                    isinstance(left, np.ndarray) and
+                    node.rule == 'p_term_mult'):
+                return self._tile(right, n) * left, None
+            raise _NoBatch()
+
+        if node.rule == 'p_term_mult':
+            left, right = values[0], values[2]
+            if isinstance(left, _BatchExtinction):
+                left, right = right, left
+            left = self._tile(convertstr(left), n)
+            if isinstance(right, _BatchExtinction):
+                return left.redden(right.extval, right.name), None
+            if isinstance(right, SpectrumBatch):
+                raise _NoBatch()
+            return left * convertstr(right), None
+        if node.rule == 'p_term_div' and batched[0] and not batched[2]:
+            return values[0] * (1.0 / np.asarray(values[2])), None
+        if node.rule == 'p_factor_unary_plus':
+            return values[1], None
+        raise _NoBatch()
+
+    def _batchCall(self, node, kids, n):
+        fname = kids[0][0]
+        args = kids[2][0]
+        if not isinstance(args, list):
+            args = [args]
+
+        if fname == 'rn':
+            sp = args[0]
+            if isinstance(sp, str):
+                sp = spectrum.TabularSourceSpectrum(_handleIRAFName(sp))
+            elif self.optimize and not isinstance(sp, SpectrumBatch):
+                sp = _optimize(sp)
+            batch = self._tile(sp, n)
+            if any(isinstance(a, (np.ndarray, SpectrumBatch))
+                   for a in args[1:2] + args[3:]):
+                raise _NoBatch()
+            try:
+                return batch.renorm(args[2], args[3], args[1])
+            except OverlapError:
+                ans = batch.renorm(args[2], args[3], args[1], force=True)
+                ans.warnings['force_renorm'] = (
+                    'Warning: Renormalization of the spectrum, to the '
+                    'specified value, in the specified units, exceeds the '
+                    'limit of the specified passband.')
+                return ans
+
+        if fname == 'z' and not isinstance(args[0], (str, np.ndarray)):
+            if self.optimize and not isinstance(args[0], SpectrumBatch):
+                args[0] = _optimize(args[0])
+            z = args[1]
+            # A single redshift keeps the wavelength set of the spectrum,
+            # as for one call.
+            if isinstance(z, np.ndarray) and (z == z.flat[0]).all():
+                z = z.flat[0].item()
+            return self._tile(args[0], n).redshift(z)
+
+        if fname == 'ebmvx' and not isinstance(args[1], np.ndarray):
+            return _BatchExtinction(args[0], args[1])
+
+        if any(isinstance(a, SpectrumBatch) for a in args) or fname == 'band':
+            raise _NoBatch()
+
+        # Other functions are called once per set of values.
+        spectra = []
+        for i in range(n):
+            row = [a[i].item() if isinstance(a, np.ndarray) else a
+                   for a in args]
+            spectra.append(self._apply(
+                node, [kids[0], kids[1], (row, None), kids[3]])[0])
+        if not all(isinstance(sp, spectrum.SourceSpectrum)
+                   for sp in spectra):
+            raise _NoBatch()
+        return SpectrumBatch.from_spectra(spectra)
+
+
+def compile_spec(template, params=None, optimize=False):
+    """Compile a synphot-classic command into a function of its numbers.
+
+    The command is parsed once, and the parts that do not depend on
+    the parameters, such as bandpasses and spectra read from files,
+    are only built once.
+
+    Parameters
+    ----------
+    template : str
+        Command, as for :func:`parse_spec`.
+
+    params : list of str or `None`
+        Names that stand for parameters in ``template``, e.g.,
+        ``['T', 'M']`` in ``rn(bb(T),band(johnson,v),M,vegamag)``.
+        If `None`, every number in ``template`` is a parameter, in order,
+        except in ``band()``, and defaults to its value.
+
+    optimize : bool
+        As for :func:`parse_spec`.
+
+    Returns
+    -------
+    func : `CompiledSpec`
+        Evaluate with ``func(5000, 15)`` or ``func(T=5000, M=15)``, or
+        for many values with ``func.batch(T=[4000, 5000], M=15)``.
+
+    Examples
+    --------
+    >>> f = compile_spec('rn(icat(k93models,T,0,4.5),band(johnson,v),'
+    ...                  'M,vegamag)*ebmvx(E,mwavg)', ['T', 'M', 'E'])
+    >>> sp = f(5000, 15, 0.1)  # doctest: +SKIP
+    >>> batch = f.batch(5000, [14, 15, 16], [0, 0.1, 0.2])  # doctest: +SKIP
+
+    """
+    return CompiledSpec(template, params, optimize=optimize)
@@ -0,0 +1,95 @@
+from __future__ import division
+
+import numpy as np
+import testutil
+
+from pysynphot import refs, spectrum
+from pysynphot.observation import Observation
+
+TOLERANCE = 1e-4
+
+SOURCES = [spectrum.BlackBody(5000),
+           spectrum.Powerlaw(5000, -1.5),
+           spectrum.FlatSpectrum(1e-27, fluxunits='fnu'),
+           spectrum.GaussianSource(1e-13, 5500, 50)]
+
+
+class TestAdaptiveWaveset(testutil.FPTestCase):
+    def setUp(self):
+        self.band = spectrum.Box(5500, 2000)
+        self.ref = [(sp * self.band).integrate(analytic=False)
+                    for sp in SOURCES]
+        refs.set_adaptive_waveset(TOLERANCE)
+
+    def tearDown(self):
+        refs.set_adaptive_waveset()
+
+    def testgrids(self):
+        for sp in SOURCES:
+            wave = sp.GetWaveSet()
+            self.assertTrue(wave.size < 1000, sp.name)
+            self.assertTrue((np.diff(wave) > 0).all(), sp.name)
+
+        wave = SOURCES[3].GetWaveSet()
+        self.assertTrue(5500 in wave)
+        self.assertApproxFP(wave[0] + wave[-1], 11000.0)
+        self.assertEqual(self.band.GetWaveSet().tolist(),
+                         [4499.99, 4500.0, 6500.0, 6500.01])
+
+    def testintegrate(self):
+        for sp, ref in zip(SOURCES, self.ref):
+            self.assertApproxFP((sp * self.band).integrate(analytic=False),
+                                ref, accuracy=2 * TOLERANCE)
+
+    def testsumfilt(self):
+        for npow in (0, 1, -1, -2):
+            ans = self.band.sumfilt(npow)
+            refs.set_adaptive_waveset()
+            self.assertApproxFP(ans, self.band.sumfilt(npow),
+                                accuracy=TOLERANCE)
+            refs.set_adaptive_waveset(TOLERANCE)
+
+    def testbandpar(self):
+        for band in (spectrum.Box(5500, 100), self.band):
+            ans = [band.avgwave(), band.pivot(), band.rmswidth(),
+                   band.photbw(), band.efficiency(), band.rmswidth(0.5)]
+            refs.set_adaptive_waveset()
+            ref = [band.avgwave(), band.pivot(), band.rmswidth(),
+                   band.photbw(), band.efficiency(), band.rmswidth(0.5)]
+            for a, r in zip(ans, ref):
+                self.assertApproxFP(a, r, accuracy=2 * TOLERANCE)
+            refs.set_adaptive_waveset(TOLERANCE)
+
+    def testchecksig(self):
+        # 0.85% and 1.15% of the band are not covered.
+        for start, sig in ((4517, True), (4523, False)):
+            wave = np.linspace(start, 7000, 100)
+            sp = spectrum.ArraySourceSpectrum(wave=wave,
+                                              flux=np.ones_like(wave))
+            self.assertEqual(self.band.check_sig(sp), sig)
+
+    def testobservation(self):
+        wave = np.linspace(5000, 5200, 50)
+        band = spectrum.ArraySpectralElement(
+            wave, np.sin(np.linspace(0, np.pi, 50)))
+        obs = Observation(SOURCES[0], band, binset=band.wave)
+        self.assertTrue(obs.wave.min() >= 5000 and obs.wave.max() <= 5200)
+
+        refs.set_adaptive_waveset()
+        ref = Observation(SOURCES[0], band, binset=band.wave)
+        self.assertApproxFP(obs.countrate(), ref.countrate(),
+                            accuracy=TOLERANCE)
+
+    def testcache(self):
+        sp = SOURCES[0] * self.band
+        nadaptive = sp.wave.size
+        refs.set_adaptive_waveset()
+        self.assertTrue(sp.wave.size > 100 * nadaptive)
+        refs.set_adaptive_waveset(TOLERANCE)
+        self.assertEqual(sp.wave.size, nadaptive)
+
+    def testerrors(self):
+        for tolerance in (0, -1e-3):
+            self.assertRaises(ValueError, refs.set_adaptive_waveset,
+                              tolerance)
+        self.assertEqual(refs._waveset_tolerance, TOLERANCE)
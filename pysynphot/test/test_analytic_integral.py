@@ -0,0 +1,62 @@
+from __future__ import division
+
+import testutil
+
+from pysynphot import spectrum
+from pysynphot.observation import Observation
+
+SOURCES = [spectrum.FlatSpectrum(2),
+           spectrum.FlatSpectrum(1e-15, fluxunits='flam'),
+           spectrum.FlatSpectrum(3e-3, fluxunits='jy'),
+           spectrum.FlatSpectrum(18, fluxunits='abmag'),
+           spectrum.FlatSpectrum(18, fluxunits='stmag'),
+           spectrum.Powerlaw(5000, -1.5),
+           spectrum.Powerlaw(4000, -1, fluxunits='flam'),
+           spectrum.GaussianSource(1e-13, 5500, 250),
+           spectrum.GaussianSource(2.0, 5450, 25, fluxunits='photlam')]
+
+# The trapezoid sums differ from the closed forms at the Box edges,
+# by about half a step of its table times the integrand.
+BANDS = [None,
+         spectrum.Box(5500, 1000),
+         spectrum.Box(5500, 1000) * 0.5,
+         spectrum.Box(5500, 1000) * spectrum.Box(5400, 300)]
+
+
+class TestAnalyticIntegral(testutil.FPTestCase):
+    def testsources(self):
+        for sp in SOURCES:
+            for band in BANDS:
+                x = sp if band is None else sp * band
+                self.assertApproxFP(x.integrate(),
+                                    x.integrate(analytic=False),
+                                    accuracy=1e-4)
+
+    def testsum(self):
+        sp = (SOURCES[1] * 3.0 + SOURCES[7]) * BANDS[1]
+        ans = sp.integrate()
+        self.assertTrue(sp._tabulation_cache is None)
+        self.assertApproxFP(ans, sp.integrate(analytic=False), accuracy=1e-5)
+
+    def testfallback(self):
+        for sp in (spectrum.BlackBody(5000),
+                   spectrum.FlatSpectrum(1, fluxunits='counts'),
+                   spectrum.FlatSpectrum(1, waveunits='nm')):
+            self.assertTrue(spectrum._analyticIntegral(sp) is None)
+        self.assertEqual(spectrum.BlackBody(5000).integrate(),
+                         spectrum.BlackBody(5000).integrate(analytic=False))
+
+    def testband(self):
+        for band in BANDS[1:]:
+            for npow in (0, 1, -1, -2):
+                self.assertApproxFP(band.sumfilt(npow, analytic=True),
+                                    band.sumfilt(npow), accuracy=1e-5)
+        self.assertEqual(spectrum.Box(800, 200).integrate(), 200.0)
+
+    def testrenorm(self):
+        band = spectrum.Box(5500, 1)
+        sp = spectrum.FlatSpectrum(1, fluxunits='flam')
+        for unit, value in (('flam', 1e-15), ('fnu', 1e-27), ('jy', 1e-3),
+                            ('vegamag', 15)):
+            obs = Observation(sp.renorm(value, unit, band), band)
+            self.assertApproxFP(obs.effstim(unit), value, accuracy=1e-6)
@@ -0,0 +1,172 @@
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import numpy.testing as nptest
+from astropy.io import fits as pyfits
+
+from pysynphot import Cache, catalog, exceptions, locations
+from pysynphot.batch import SpectrumBatch
+
+# An irregular grid, like the real ones: log g depends on Teff.
+GRID = {5000: [3.0, 4.0, 5.0],
+        6000: [4.0, 5.0],
+        7000: [3.5, 4.5]}
+METALS = [-1.0, 0.0]
+
+
+def _model(wave, teff, z, logg):
+    return (1e-12 * (teff / 5000.0)**4 * (1 + 0.1 * z) *
+            np.exp(-((wave - teff / 1.5) / 3000.0)**2) * (1 + 0.01 * logg))
+
+
+class TestAtlas(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        catdir = os.path.join(self.dir, 'grid', 'tstmodels')
+        os.makedirs(catdir)
+
+        wave = np.linspace(1000, 10000, 200).astype(np.float32)
+        index, names = [], []
+        for teff, loggs in sorted(GRID.items()):
+            for z in METALS:
+                fname = 'tst_%d_%g.fits' % (teff, z)
+                cols = [pyfits.Column(name='WAVELENGTH', format='E',
+                                      unit='ANGSTROMS', array=wave)]
+                for logg in loggs:
+                    col = 'g%02d' % int(logg * 10)
+                    cols.append(pyfits.Column(
+                        name=col, format='E', unit='FLAM',
+                        array=_model(wave, teff, z, logg)))
+                    index.append('%g,%g,%g' % (teff, z, logg))
+                    names.append('%s[%s]' % (fname, col))
+                pyfits.HDUList([
+                    pyfits.PrimaryHDU(),
+                    pyfits.BinTableHDU.from_columns(cols)]).writeto(
+                        os.path.join(catdir, fname))
+
+        pyfits.HDUList([pyfits.PrimaryHDU(), pyfits.BinTableHDU.from_columns([
+            pyfits.Column(name='INDEX', format='20A', array=index),
+            pyfits.Column(name='FILENAME', format='40A', array=names)])
+        ]).writeto(os.path.join(catdir, 'catalog.fits'))
+
+        self.templates = locations.CAT_TEMPLATE, locations.KUR_TEMPLATE
+        locations.CAT_TEMPLATE = os.path.join(self.dir, 'grid', '*',
+                                              'catalog.fits')
+        locations.KUR_TEMPLATE = os.path.join(self.dir, 'grid', '*')
+        Cache.reset_catalog_cache()
+        Cache.reset_atlas_cache()
+
+    def tearDown(self):
+        locations.CAT_TEMPLATE, locations.KUR_TEMPLATE = self.templates
+        Cache.reset_catalog_cache()
+        Cache.reset_atlas_cache()
+        Cache.set_disk_cache(None)
+        shutil.rmtree(self.dir)
+
+    def testsingle(self):
+        for params in [(5500, -0.5, 4.2), (6000, 0, 4.5), (6500, -1, 4.0),
+                       (5000, 0, 5.0), (6999, -0.1, 4.4)]:
+            ref = catalog.Icat('tstmodels', *params)
+            sp = catalog.Icat('tstmodels', *params, atlas=True)
+            nptest.assert_array_equal(sp.wave, ref.wave)
+            nptest.assert_allclose(sp.flux, ref.flux, rtol=1e-12)
+            self.assertEqual(sp.name, ref.name)
+            self.assertEqual(sp.fluxunits.name, ref.fluxunits.name)
+
+    def testbatch(self):
+        teff = [5500, 6000, 6500]
+        batch = catalog.Icat.batch('tstmodels', teff, -0.5, [4.2, 4.5, 4.0])
+        self.assertTrue(isinstance(batch, SpectrumBatch))
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.fluxunits.name, 'flam')
+        for i, params in enumerate(zip(teff, [-0.5] * 3, [4.2, 4.5, 4.0])):
+            ref = catalog.Icat('tstmodels', *params)
+            nptest.assert_allclose(batch.flux[i], ref.flux, rtol=1e-12)
+            self.assertEqual(batch.names[i], ref.name)
+
+        self.assertEqual(list(Cache.ATLAS_CACHE), ['tstmodels'])
+
+    def testbounds(self):
+        for params in [(4000, 0, 4), (6000, 1, 4), (6000, 0, 3)]:
+            self.assertRaises(exceptions.ParameterOutOfBounds,
+                              catalog.Icat.batch, 'tstmodels', *params)
+
+    def testdiskcache(self):
+        Cache.set_disk_cache(os.path.join(self.dir, 'cache'))
+        first = catalog.Atlas('tstmodels')
+        second = catalog.Atlas('tstmodels')
+        self.assertTrue(isinstance(second.flux, np.memmap))
+        nptest.assert_array_equal(first.flux, second.flux)
+        self.assertEqual(second.fluxunits.name, 'flam')
+
+
+def _breakList(entries, i, par):
+    # The list scans that CatalogIndex replaced.
+    values = [e[i] for e in entries]
+    upper = min(v for v in values if v >= par)
+    lower = max(v for v in values if v <= par)
+    return ([e for e in entries if e[i] == upper],
+            [e for e in entries if e[i] == lower])
+
+
+def _cascade(entries, teff, z, logg):
+    corners = []
+    for tlist in _breakList(entries, 0, teff):
+        for zlist in _breakList(tlist, 1, z):
+            for glist in _breakList(zlist, 2, logg):
+                corners.append(glist[0][3])
+    return corners
+
+
+class TestCatalogIndex(unittest.TestCase):
+    def setUp(self):
+        index, names = [], []
+        for teff, loggs in sorted(GRID.items(), reverse=True):
+            for z in METALS:
+                for logg in loggs:
+                    index.append('%g,%g,%g' % (teff, z, logg))
+                    names.append('f%d' % len(names))
+        self.index = catalog.CatalogIndex(index, names)
+        self.entries = [self.index.entry(i) for i in range(len(index))]
+
+    def testparse(self):
+        self.assertEqual(self.index.entry(0), [7000.0, -1.0, 3.5, 'f0'])
+        nptest.assert_array_equal(self.index.teff, [5000, 6000, 7000])
+        self.assertEqual(self.index.params['log_g'][2], 3.5)
+
+    def testbracket(self):
+        rng = np.random.RandomState(42)
+        teff = np.concatenate([rng.uniform(5000, 7000, 200),
+                               [5000, 6000, 7000, 6000]])
+        z = np.concatenate([rng.uniform(-1, 0, 200), [-1, 0, -1, -0.5]])
+        logg = np.concatenate([rng.uniform(4, 4.5, 200), [4, 4, 4.5, 4.5]])
+
+        rows, weights = self.index.bracket(teff, z, logg)
+        self.assertEqual(rows.shape, (204, 8))
+        nptest.assert_allclose(weights.sum(axis=1), 1.0, rtol=1e-12)
+        for i in range(len(teff)):
+            self.assertEqual(
+                [self.entries[r][3] for r in rows[i]],
+                _cascade(self.entries, teff[i], z[i], logg[i]))
+
+        # The weights reproduce each parameter.
+        params = self.index.params[rows]
+        for name, par in zip(self.index.names, (teff, z, logg)):
+            nptest.assert_allclose((weights * params[name]).sum(axis=1), par)
+
+    def testerrors(self):
+        for params, msg in [((8000, 0, 4), "'Teff' exceeds data. Max"),
+                            ((6000, -2, 4), "'metallicity' exceeds data. Min"),
+                            ((6500, 0, 5.5), "'log G' exceeds data. Max")]:
+            try:
+                self.index.bracket([6000, params[0]], [0, params[1]],
+                                   [4.5, params[2]])
+            except exceptions.ParameterOutOfBounds as e:
+                self.assertTrue(msg in str(e), str(e))
+            else:
+                self.fail(params)
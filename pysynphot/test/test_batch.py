@@ -0,0 +1,192 @@
+from __future__ import division
+
+import os
+import tempfile
+
+import numpy as np
+import numpy.testing as nptest
+import testutil
+
+import pysynphot as S
+from pysynphot.batch import SpectrumBatch, BandpassBank, SensitivityKernel
+from pysynphot.observation import BatchObservation
+
+
+class TestBatch(testutil.FPTestCase):
+    def setUp(self):
+        self.spectra = [S.BlackBody(t) for t in (4000, 5000, 6000)]
+        self.batch = SpectrumBatch.from_spectra(self.spectra)
+        self.band = S.Box(5500, 1000)
+
+    def testrows(self):
+        self.assertEqual(len(self.batch), 3)
+        for sp, row in zip(self.spectra, self.batch):
+            nptest.assert_allclose(row.flux, sp(row.wave), rtol=1e-12)
+
+    def testslice(self):
+        sub = self.batch[1:]
+        self.assertEqual(len(sub), 2)
+        self.assertEqualNumpy(sub.flux, self.batch.flux[1:])
+
+    def testconvert(self):
+        ref = S.units.Photlam().Convert(self.batch.wave, self.batch.flux,
+                                        'flam')
+        self.batch.convert('flam')
+        self.assertEqualNumpy(self.batch.flux, ref)
+        self.assertEqualNumpy(self.batch[2].flux, ref[2])
+
+    # The batch holds tabulated fluxes, so comparisons with analytic
+    # spectra off its wavelength set differ by interpolation error.
+    def testmul(self):
+        prod = self.batch * self.band
+        for sp, row in zip(self.spectra, prod):
+            ref = sp * self.band
+            nptest.assert_allclose(row(ref.wave), ref(ref.wave),
+                                   rtol=1e-6)
+
+    def testscalar(self):
+        self.assertEqualNumpy((self.batch * np.int64(2)).flux,
+                              self.batch.flux * 2)
+
+    def testnegative(self):
+        batch = SpectrumBatch.from_spectra([S.BlackBody(5000) * -1])
+        self.assertEqualNumpy(batch[0].flux, batch.flux[0])
+        self.assertTrue(batch[0].flux.min() < 0)
+
+    def testintegrate(self):
+        ref = [(sp * self.band).integrate() for sp in self.spectra]
+        nptest.assert_allclose((self.batch * self.band).integrate(), ref,
+                               rtol=1e-6)
+
+    def testrenorm(self):
+        vals = np.array([10.0, 11.0, 12.0])
+        ans = self.batch.renorm(vals, 'vegamag', self.band)
+        for i, sp in enumerate(self.spectra):
+            ref = sp.renorm(vals[i], 'vegamag', self.band)
+            nptest.assert_allclose(ans[i].flux, ref(ans.wave), rtol=1e-6)
+
+    def testredshift(self):
+        ans = self.batch.redshift(0.1)
+        ref = self.spectra[0].redshift(0.1)
+        nptest.assert_allclose(ans[0].flux, ref(ans.wave), rtol=1e-10)
+
+        z = [0.1, 0.5, 0.3]
+        ans = self.batch.redshift(z)
+        self.assertApproxFP(ans.wave[0], self.batch.wave[0] * 1.1)
+        self.assertApproxFP(ans.wave[-1], self.batch.wave[-1] * 1.5)
+        for i, zi in enumerate(z):
+            ref = self.batch[i].redshift(zi)
+            inside = (ans.wave >= ref.wave[0]) & (ans.wave <= ref.wave[-1])
+            nptest.assert_allclose(ans[i].flux[inside], ref(ans.wave[inside]),
+                                   rtol=1e-12)
+            self.assertFalse(ans[i].flux[~inside].any())
+            # The ends of the row now drop to zero flux over one interval.
+            self.assertApproxFP(ans[i].integrate(), ref.integrate(),
+                                accuracy=1e-4)
+
+    def testredden(self):
+        ebmv = [0.0, 0.1, 0.2]
+        ans = self.batch.redden(ebmv, 'gal3')
+        for i, sp in enumerate(self.batch):
+            ref = sp * S.Extinction(ebmv[i], 'gal3')
+            nptest.assert_allclose(ans[i].flux, ref(ans.wave), rtol=1e-6)
+
+
+class TestBatchObservation(testutil.FPTestCase):
+    def setUp(self):
+        self.spectra = [S.BlackBody(t) for t in (4000, 5000, 6000)]
+        self.batch = SpectrumBatch.from_spectra(self.spectra)
+        self.band = S.Box(5500, 1000)
+        self.binset = np.arange(4900, 6100, 10.0)
+        self.obs = S.Observation(self.batch, self.band, binset=self.binset)
+        self.refs = [S.Observation(sp, self.band, binset=self.binset)
+                     for sp in self.batch]
+
+    def testtype(self):
+        self.assertTrue(isinstance(self.obs, BatchObservation))
+
+    def testcountrate(self):
+        ref = [obs.countrate() for obs in self.refs]
+        nptest.assert_allclose(self.obs.countrate(), ref, rtol=1e-12)
+
+    def testeffstim(self):
+        for unit in ('flam', 'abmag', 'counts', 'obmag'):
+            ref = [obs.effstim(unit) for obs in self.refs]
+            nptest.assert_allclose(self.obs.effstim(unit), ref, rtol=1e-12)
+
+
+class TestBandpassBank(testutil.FPTestCase):
+    def setUp(self):
+        self.spectra = [S.BlackBody(t) for t in (4000, 5000, 6000)]
+        self.batch = SpectrumBatch.from_spectra(self.spectra)
+        self.bands = [S.Box(4500, 1000), S.Box(5500, 1000),
+                      S.Box(6500, 500)]
+        self.bank = BandpassBank(self.bands)
+
+    def testshape(self):
+        self.assertEqual(len(self.bank), 3)
+        self.assertEqual(self.bank.throughput.shape,
+                         (3, self.bank.wave.size))
+
+    def testeffstim(self):
+        for unit in ('flam', 'abmag', 'stmag', 'counts', 'obmag'):
+            ans = self.bank.effstim(self.batch, unit)
+            self.assertEqual(ans.shape, (3, 3))
+            for i, sp in enumerate(self.spectra):
+                for j, bp in enumerate(self.bands):
+                    ref = S.Observation(sp, bp, binset=bp.wave).effstim(unit)
+                    nptest.assert_allclose(ans[i, j], ref, rtol=1e-5)
+
+    def testspectra(self):
+        nptest.assert_allclose(self.bank.effstim(self.spectra, 'abmag'),
+                               self.bank.effstim(self.batch, 'abmag'),
+                               rtol=1e-6)
+        nptest.assert_allclose(self.bank.countrate(self.spectra[1]),
+                               self.bank.countrate(self.batch[1:2]),
+                               rtol=1e-6)
+
+    def testunitresponse(self):
+        ref = [bp.unit_response() for bp in self.bands]
+        self.assertEqualNumpy(self.bank.unit_response(), ref)
+
+
+class TestSensitivityKernel(testutil.FPTestCase):
+    def setUp(self):
+        self.bp = S.Box(5500, 1000)
+        self.binset = np.arange(4800, 6300, 7.3)
+        self.kernel = SensitivityKernel(self.bp, binset=self.binset)
+        self.spectra = [S.BlackBody(t) for t in (4000, 6000)]
+
+    def testcountrate(self):
+        for sp in self.spectra:
+            obs = S.Observation(sp, self.bp, binset=self.binset)
+            nptest.assert_allclose(self.kernel.countrate(sp),
+                                   obs.countrate(), rtol=1e-12)
+
+    def testnative(self):
+        kernel = SensitivityKernel(self.bp, binset=self.bp.wave)
+        sp = self.spectra[0]
+        obs = S.Observation(sp, self.bp, binset=self.bp.wave)
+        nptest.assert_allclose(kernel.countrate(sp, binned=False),
+                               obs.countrate(binned=False), rtol=1e-5)
+
+    def testspectra(self):
+        ans = self.kernel.countrate(self.spectra)
+        self.assertEqual(ans.shape, (2,))
+        nptest.assert_allclose(
+            ans, self.kernel.countrate(SpectrumBatch.from_spectra(self.spectra)),
+            rtol=1e-6)
+
+    def testsave(self):
+        fd, fname = tempfile.mkstemp(suffix='.npz')
+        os.close(fd)
+        try:
+            self.kernel.save(fname)
+            kernel = SensitivityKernel.load(fname)
+        finally:
+            os.unlink(fname)
+        self.assertEqual(kernel.name, self.kernel.name)
+        self.assertEqual(kernel.primary_area, self.kernel.primary_area)
+        self.assertEqualNumpy(kernel.weights, self.kernel.weights)
+        self.assertEqual(kernel.countrate(self.spectra[0]),
+                         self.kernel.countrate(self.spectra[0]))
@@ -138,3 +138,35 @@ def test_center_edge_center_roundtrip():
     calc_centers = binning.calculate_bin_centers(calc_edges)
 
     np.testing.assert_array_equal(calc_centers, centers)
+
+
+def test_rebin_plan():
+    """
+    Test that a rebinning plan agrees with direct binning.
+
+    """
+    wave = np.linspace(1000, 2000, 301)
+    binwave = np.linspace(1100, 1900, 41)
+    plan = binning.RebinPlan(wave, binwave)
+
+    flux = np.vstack([np.sin(plan.wave / 50.) + 1, plan.wave ** -2])
+
+    ref = np.empty((2, binwave.size))
+    for i, (first, last) in enumerate(zip(plan.edges[:-1], plan.edges[1:])):
+        w = (plan.wave >= first) & (plan.wave <= last)
+        ref[:, i] = np.trapz(flux[:, w], plan.wave[w]) / (last - first)
+
+    np.testing.assert_allclose(plan.rebin(flux), ref, rtol=1e-12)
+    np.testing.assert_allclose(plan.rebin(flux[0]), ref[0], rtol=1e-12)
+    np.testing.assert_allclose(plan.intwave, np.diff(plan.edges),
+                               rtol=1e-12)
+
+
+def test_get_rebin_plan_cached():
+    wave = np.linspace(1000, 2000, 301)
+    binwave = np.linspace(1100, 1900, 41)
+
+    plan = binning.get_rebin_plan(wave, binwave)
+
+    assert binning.get_rebin_plan(wave.copy(), binwave.copy()) is plan
+    assert binning.get_rebin_plan(wave, binwave[1:]) is not plan
@@ -0,0 +1,214 @@
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import testutil
+
+from pysynphot import Cache, refs
+
+
+class TestLRUCache(testutil.FPTestCase):
+    def setUp(self):
+        self.cache = Cache.LRUCache(maxsize=3, maxbytes=24)
+
+    def testbytes(self):
+        self.cache['a'] = np.zeros(2)
+        self.cache['b'] = np.zeros(1)
+        self.assertEqual(self.cache.nbytes, 24)
+
+        self.cache['a']
+        self.cache['c'] = np.zeros(1)
+        self.assertEqual(self.cache.keys(), ['a', 'c'])
+        self.assertEqual(self.cache.nbytes, 24)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def testcount(self):
+        for k in 'abcd':
+            self.cache[k] = None
+        self.assertEqual(self.cache.keys(), ['b', 'c', 'd'])
+
+    def testoversize(self):
+        self.cache['a'] = np.zeros(10)
+        self.assertEqual(self.cache.keys(), ['a'])
+
+    def teststats(self):
+        self.cache['a'] = np.zeros(1)
+        self.cache.get('a')
+        self.cache.get('b')
+        self.assertEqual(self.cache.stats(),
+                         dict(hits=1, misses=1, evictions=0, items=1,
+                              nbytes=8))
+
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(),
+                         dict(hits=0, misses=0, evictions=0, items=0,
+                              nbytes=0))
+
+    def testthreads(self):
+        cache = Cache.LRUCache(maxsize=50, maxbytes=8 * 40)
+        cache['x'] = np.zeros(1)
+        errors = []
+
+        def run(seed):
+            rng = np.random.RandomState(seed)
+            try:
+                for i in range(2000):
+                    cache[rng.randint(100)] = np.zeros(1)
+                    cache['x']
+                    cache['x'] = np.zeros(1)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(cache.nbytes, 8 * len(cache))
+        self.assertEqual(cache.hits, 8000)
+        self.assertEqual(cache.misses, 0)
+
+
+def test_setref_clears_components():
+    Cache.COMPONENT_CACHE['x'] = object()
+    refs.setref()
+    assert len(Cache.COMPONENT_CACHE) == 0
+
+
+class TestResultCache(testutil.FPTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'results.db')
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _compute(self, x):
+        self.calls.append(x)
+        time.sleep(0.05)
+        return x * 2
+
+    def testcall(self):
+        cache = Cache.ResultCache(maxsize=1)
+        self.assertEqual(cache.call('a', self._compute, 1), 2)
+        self.assertEqual(cache.call('a', self._compute, 1), 2)
+        self.assertEqual(cache.call('b', self._compute, 2), 4)
+        self.assertEqual(cache.call('a', self._compute, 1), 2)
+        self.assertEqual(self.calls, [1, 2, 1])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'],
+                          stats['evictions'], stats['items']),
+                         (1, 3, 2, 1))
+        self.assertTrue(stats['saved'] >= 0.05)
+
+    def testpersistent(self):
+        cache = Cache.ResultCache(path=self.path)
+        cache.call('a', self._compute, 1)
+        cache.close()
+
+        cache = Cache.ResultCache(path=self.path)
+        self.assertEqual(cache.call('a', self._compute, 1), 2)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+
+        cache.clear()
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.stats()['misses'], 1)
+        cache.close()
+
+    def testcoalesce(self):
+        cache = Cache.ResultCache()
+        results = []
+
+        def work():
+            results.append(cache.call('a', self._compute, 1))
+
+        threads = [threading.Thread(target=work) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, [2] * 4)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(cache.coalesced + cache.hits, 3)
+
+    def testerror(self):
+        cache = Cache.ResultCache()
+        self.assertRaises(ZeroDivisionError, cache.call, 'a',
+                          lambda: 1 / 0)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.call('a', self._compute, 1), 2)
+
+
+def test_fingerprint():
+    key = refs.fingerprint()
+    assert refs.fingerprint() == key
+    try:
+        refs.setref(area=1.0)
+        assert refs.fingerprint() != key
+    finally:
+        refs.setref()
+    assert refs.fingerprint() == key
+
+
+class TestVegaCache(testutil.FPTestCase):
+    def setUp(self):
+        from pysynphot import spectrum
+        self.vega = spectrum.Vega
+        self.cache = Cache.VegaCache()
+        self.wave = np.linspace(4000, 8000, 101)
+
+    def testflux(self):
+        flux = self.cache.flux(self.vega, self.wave)
+        self.assertEqualNumpy(flux, self.vega.resample(self.wave)._fluxtable)
+        self.assertTrue(self.cache.flux(self.vega, self.wave.copy()) is flux)
+        self.assertFalse(flux.flags.writeable)
+
+        flam = self.cache.flux(self.vega, self.wave, 'flam')
+        self.assertEqualNumpy(flam, self.vega.resample(self.wave).flux)
+        self.assertEqual(len(self.cache.fluxes), 2)
+
+    def testintegral(self):
+        from pysynphot import spectrum
+        band = spectrum.Box(5500, 1000)
+        total = self.cache.integral(self.vega, band)
+        self.assertEqual(total, (self.vega * band).integrate())
+
+        self.cache.integral(self.vega, spectrum.Box(5500, 1000))
+        self.cache.integral(self.vega, spectrum.Box(5500, 900))
+        self.assertEqual((self.cache.integrals.hits,
+                          self.cache.integrals.misses), (1, 2))
+
+    def testswap(self):
+        from pysynphot import spectrum
+        other = spectrum.ArraySourceSpectrum(
+            wave=self.wave, flux=np.ones_like(self.wave), fluxunits='photlam')
+        for i in range(2):
+            self.assertEqualNumpy(
+                self.cache.flux(self.vega, self.wave),
+                self.vega.resample(self.wave)._fluxtable)
+            self.assertEqualNumpy(self.cache.flux(other, self.wave), 1.0)
+        # Both are kept, rather than one replacing the other.
+        self.assertEqual(len(self.cache.fluxes), 2)
+        self.assertEqual(self.cache.fluxes.hits, 2)
+
+    def testvegamag(self):
+        from pysynphot import spectrum, units
+        flux = units.VegaMag().ToPhotlam(self.wave, np.zeros_like(self.wave))
+        self.assertEqualNumpy(flux, self.vega.resample(self.wave).flux)
+
+        sp = spectrum.BlackBody(6000).renorm(10, 'vegamag',
+                                             spectrum.Box(5500, 1000))
+        band = spectrum.Box(5500, 1000)
+        self.assertApproxFP((sp * band).integrate() /
+                            (self.vega * band).integrate(), 1e-4)
@@ -128,7 +128,7 @@ class TestCatalogCache(testutil.FPTestCase):
         self.tra['cache_expect'] = f
         fail = True
 
-    if not isinstance(Cache.CATALOG_CACHE[k],list) :
+    if not isinstance(Cache.CATALOG_CACHE[k],S.catalog.CatalogIndex) :
         self.tra['cache_type_mismatch'] = str(type(Cache.CATALOG_CACHE[k]))
         fail = True
 
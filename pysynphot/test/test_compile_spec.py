@@ -0,0 +1,122 @@
+from __future__ import division
+
+import unittest
+
+import numpy as np
+import numpy.testing as nptest
+
+from pysynphot import spparser
+from pysynphot.batch import SpectrumBatch
+
+# gal3 is mwavg; test_locations checks that mwavg is still a file name.
+TEMPLATE = 'rn(bb(%s),box(5500,1000),%s,abmag)*ebmvx(%s,gal3)'
+
+
+class TestCompileSpec(unittest.TestCase):
+    def setUp(self):
+        self.func = spparser.compile_spec(TEMPLATE % ('T', 'M', 'E'),
+                                          ['T', 'M', 'E'])
+        self.wave = np.linspace(3000, 9000, 101)
+
+    def _reference(self, *values):
+        return spparser.parse_spec(TEMPLATE % values)(self.wave)
+
+    def testcall(self):
+        nptest.assert_array_equal(self.func(5000, 15, 0.1)(self.wave),
+                                  self._reference(5000, 15, 0.1))
+        nptest.assert_array_equal(
+            self.func(E=0.2, M=14, T=6000)(self.wave),
+            self._reference(6000, 14, 0.2))
+
+    def testconstant(self):
+        def calls(node):
+            if node.type == 'function_call':
+                yield node
+            for k in node.kids:
+                for c in calls(k):
+                    yield c
+
+        found = dict((c.kids[0].value, c) for c in calls(self.func.root))
+        # The box does not depend on the parameters, so it is built once.
+        self.assertTrue(found['box'].const)
+        self.assertEqual(found['box'].value.__class__.__name__, 'Box')
+        self.assertFalse(found['rn'].const)
+
+    def testbatch(self):
+        values = [(5000, 14, 0.0), (5000, 15, 0.1), (6000, 16, 0.2)]
+        batch = self.func.batch(*[list(v) for v in zip(*values)])
+        self.assertTrue(isinstance(batch, SpectrumBatch))
+        self.assertEqual(len(batch), 3)
+        for i, v in enumerate(values):
+            nptest.assert_allclose(batch[i](self.wave),
+                                   self._reference(*v), rtol=1e-4)
+
+    def testbroadcast(self):
+        batch = self.func.batch(5000, [14, 15], 0.1)
+        self.assertEqual(len(batch), 2)
+        nptest.assert_allclose(batch[1](self.wave),
+                               self._reference(5000, 15, 0.1), rtol=1e-4)
+
+    def testfallback(self):
+        # Sums are evaluated one set of values at a time.
+        func = spparser.compile_spec('bb(T)+bb(6000)*S', ['T', 'S'])
+        batch = func.batch([4000, 5000], [1.0, 2.0])
+        ref = spparser.parse_spec('bb(5000)+bb(6000)*2.0')
+        nptest.assert_allclose(batch[1](self.wave), ref(self.wave),
+                               rtol=1e-4)
+
+    def testredshift(self):
+        func = spparser.compile_spec('z(bb(T),Z)', ['T', 'Z'])
+        for z in (0.5, [0.5, 0.2]):
+            batch = func.batch(T=[5000, 6000], Z=z)
+            for i, zi in enumerate(np.broadcast_to(z, (2,))):
+                ref = func(T=[5000, 6000][i], Z=zi)
+                self.assertAlmostEqual(batch[i].integrate() / ref.integrate(),
+                                       1, places=4)
+        batch = func.batch(T=[5000, 6000], Z=0.5)
+        nptest.assert_allclose(batch.wave, func(5000, 0.5).wave)
+        nptest.assert_allclose(batch[1].flux,
+                               func(6000, 0.5)(batch.wave), rtol=1e-4)
+
+    def testintegers(self):
+        # Rows are passed on as Python numbers, which spectra accept.
+        func = spparser.compile_spec('bb(5000)*X+bb(6000)', ['X'])
+        batch = func.batch(X=np.array([1, 2]))
+        ref = spparser.parse_spec('bb(5000)*2+bb(6000)')
+        nptest.assert_allclose(batch[1](self.wave), ref(self.wave),
+                               rtol=1e-4)
+
+    def testcopy(self):
+        func = spparser.compile_spec('bb(5000)*2', [])
+        first, second = func(), func()
+        self.assertFalse(first is second)
+        first.convert('flam')
+        self.assertEqual(second.fluxunits.name, 'photlam')
+        self.assertEqual(func().fluxunits.name, 'photlam')
+
+    def testnumbers(self):
+        func = spparser.compile_spec('z(bb(5000)*0.5,0.1)')
+        self.assertEqual(func.params, ('p0', 'p1', 'p2'))
+        self.assertEqual(func.defaults, (5000, 0.5, 0.1))
+        nptest.assert_array_equal(
+            func()(self.wave),
+            spparser.parse_spec('z(bb(5000)*0.5,0.1)')(self.wave))
+        nptest.assert_array_equal(
+            func(p2=0.2)(self.wave),
+            spparser.parse_spec('z(bb(5000)*0.5,0.2)')(self.wave))
+        batch = func.batch(p1=[0.3, 0.4], p2=[0.1, 0.2])
+        nptest.assert_allclose(
+            batch[1](self.wave),
+            spparser.parse_spec('z(bb(5000)*0.4,0.2)')(self.wave), rtol=1e-4)
+
+    def testnegative(self):
+        func = spparser.compile_spec('pl(4000.0,-1.0,flam)*-2')
+        self.assertEqual(func.defaults, (4000.0, -1.0, -2))
+        nptest.assert_array_equal(
+            func(4000, -2.0, 3)(self.wave),
+            spparser.parse_spec('pl(4000,-2.0,flam)*3')(self.wave))
+
+    def testerrors(self):
+        self.assertRaises(TypeError, self.func, 5000, 15)
+        self.assertRaises(TypeError, self.func, 5000, 15, 0.1, 1)
+        self.assertRaises(TypeError, self.func, 5000, 15, 0.1, X=1)
@@ -0,0 +1,52 @@
+from __future__ import division, print_function
+
+import unittest
+
+from pysynphot import graphtab, locations, tables
+
+GT_FILE = locations.irafconvert('mtab$n9i1408hm_tmg.fits')
+
+SIMPLE = """clear  acs  1  20  clear
+clear  default  1  100  clear
+hst_ota  default  20  30  clear
+clear  acs  30  10000  clear
+clear  wfc1  10000  10100  clear
+clear  hrc  10000  10150  clear
+acs_wfc_im123  default  10100  10130  clear
+acs_f555w  f555w  10130  10140  clear
+acs_f606w  f606w  10130  10140  clear
+acs_f606w  f606w  10150  10160  clear
+acs_f606w_dup  f606w  10150  10160  clear
+"""
+
+
+def test_fits_table():
+    gt = tables.GraphTable(GT_FILE)
+    comps, thcomps = gt.GetComponentsFromGT(['acs', 'hrc', 'f555w'], 1)
+    assert any(str(c).startswith('acs_f555w') for c in comps)
+    assert len(comps) == len(thcomps)
+
+
+class TestCompiledGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = graphtab.CompiledGraph()
+        for line in SIMPLE.splitlines():
+            compname, kwd, innode, outnode, thcompname = line.split()
+            self.graph.add_row(kwd, innode, outnode, compname, thcompname)
+
+    def test_resolve(self):
+        comps, thcomps = self.graph.resolve(['acs', 'wfc1', 'f555w'])
+        self.assertEqual(comps, ['clear', 'hst_ota', 'clear', 'clear',
+                                 'acs_wfc_im123', 'acs_f555w'])
+
+    def test_unused(self):
+        self.assertRaises(ValueError, self.graph.resolve,
+                          ['acs', 'wfc1', 'f555w', 'f999w'])
+
+    def test_incomplete(self):
+        self.assertRaises(ValueError, self.graph.resolve,
+                          ['acs', 'wfc1'])
+
+    def test_ambiguous(self):
+        self.assertRaises(KeyError, self.graph.resolve,
+                          ['acs', 'hrc', 'f606w'])
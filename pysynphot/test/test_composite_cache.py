@@ -0,0 +1,72 @@
+from __future__ import division
+
+import testutil
+
+import pysynphot as S
+from pysynphot import refs
+
+
+class TestSourceCache(testutil.FPTestCase):
+    def setUp(self):
+        self.sp = S.BlackBody(5000) * S.Box(5500, 1000)
+
+    def testwaveset(self):
+        ref = S.spectrum.MergeWaveSets(S.BlackBody(5000).GetWaveSet(),
+                                       S.Box(5500, 1000).GetWaveSet())
+        self.assertEqualNumpy(self.sp.GetWaveSet(), ref)
+        self.assertEqualNumpy(self.sp.GetWaveSet(), ref)
+
+    def testcopy(self):
+        wave = self.sp.wave
+        wave[0] = -1
+        self.assertTrue(self.sp.wave[0] > 0)
+
+        flux = self.sp.flux
+        flux[:] = -1
+        self.assertTrue((self.sp.flux >= 0).all())
+
+    def testflux(self):
+        wave = self.sp.GetWaveSet()
+        ref = S.BlackBody(5000)(wave) * S.Box(5500, 1000)(wave)
+        self.assertEqualNumpy(self.sp(wave), ref)
+        self.assertEqualNumpy(self.sp(wave), ref)
+
+        # A different wavelength array is not served from the cache
+        self.assertEqualNumpy(self.sp(wave[:10]), ref[:10])
+
+    def testconvert(self):
+        ref = self.sp.flux
+        self.sp.convert('flam')
+        self.assertEqualNumpy(
+            self.sp.flux,
+            S.units.Photlam().Convert(self.sp.wave, ref, 'flam'))
+        self.sp.convert('photlam')
+        self.assertEqualNumpy(self.sp.flux, ref)
+
+
+class TestBandpassCache(testutil.FPTestCase):
+    def setUp(self):
+        self.bp = S.Box(5500, 1000) * S.Box(5000, 1000)
+
+    def testthroughput(self):
+        ref = self.bp.throughput
+        self.assertEqualNumpy(self.bp.throughput, ref)
+        self.assertEqual(ref.max(), 1)
+
+    def testscalar(self):
+        self.assertEqual(self.bp(5250), 1)
+        self.assertEqual(self.bp(4000), 0)
+
+
+class TestDefaultWavesetChange(testutil.FPTestCase):
+    def tearDown(self):
+        refs.set_default_waveset()
+
+    def testinvalidate(self):
+        sp = S.FlatSpectrum(1) * S.Box(5500, 1000)
+        sp.GetWaveSet()
+
+        refs.set_default_waveset(500, 26000, 100)
+        ref = S.spectrum.MergeWaveSets(refs._default_waveset,
+                                       S.Box(5500, 1000).GetWaveSet())
+        self.assertEqualNumpy(sp.GetWaveSet(), ref)
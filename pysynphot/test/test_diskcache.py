@@ -0,0 +1,84 @@
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import testutil
+from astropy.io import fits
+
+import pysynphot as S
+from pysynphot import Cache
+
+
+class TestDiskCache(testutil.FPTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(suffix='pysynphot')
+        self.fname = os.path.join(self.tmpdir, 'spec.fits')
+        self.bname = os.path.join(self.tmpdir, 'band.fits')
+        S.BlackBody(5000).writefits(self.fname)
+        S.Box(5500, 1000).writefits(self.bname)
+        Cache.set_disk_cache(os.path.join(self.tmpdir, 'cache'))
+
+    def tearDown(self):
+        Cache.set_disk_cache(None)
+        shutil.rmtree(self.tmpdir)
+
+    def testspectrum(self):
+        ref = S.FileSpectrum(self.fname)
+        sp = S.FileSpectrum(self.fname)
+        self.assertTrue(isinstance(sp._fluxtable, np.memmap))
+        self.assertEqualNumpy(sp.wave, ref.wave)
+        self.assertEqualNumpy(sp.flux, ref.flux)
+        self.assertEqual(sp.fheader, ref.fheader)
+
+    def testbandpass(self):
+        for cls in (S.FileBandpass, S.spectrum.TabularSpectralElement):
+            ref = cls(self.bname)
+            bp = cls(self.bname)
+            self.assertTrue(isinstance(bp._throughputtable, np.memmap))
+            self.assertEqualNumpy(bp.throughput, ref.throughput)
+
+    def testheader(self):
+        with fits.open(self.fname, mode='update') as fs:
+            fs[1].header['HISTORY'] = 'first'
+            fs[1].header['HISTORY'] = 'second'
+            fs[1].header['COMMENT'] = 'note'
+        ref = S.FileSpectrum(self.fname)
+        sp = S.FileSpectrum(self.fname)
+        self.assertEqual(sorted(sp.fheader), sorted(ref.fheader))
+        self.assertEqual(list(sp.fheader['HISTORY']), ['first', 'second'])
+        self.assertEqual(str(sp.fheader['COMMENT']), 'note')
+        self.assertEqual(sp.fheader['TUNIT1'], ref.fheader['TUNIT1'])
+
+        headers = []
+
+        class Element(S.spectrum.TabularSpectralElement):
+            def getHeaderKeywords(self, header):
+                headers.append(header)
+
+        Element(self.bname)
+        Element(self.bname)
+        self.assertTrue(isinstance(headers[1], fits.Header))
+        self.assertEqual(headers[1]['tunit1'], headers[0]['TUNIT1'])
+
+    def testwritable(self):
+        S.FileSpectrum(self.fname)
+        sp = S.FileSpectrum(self.fname)
+        sp._fluxtable[:] = 0
+        self.assertTrue(S.FileSpectrum(self.fname).flux.all())
+
+    def testmodified(self):
+        S.FileSpectrum(self.fname)
+        S.FlatSpectrum(1).writefits(self.fname)
+        os.utime(self.fname, (0, 0))
+        self.assertEqualNumpy(S.FileSpectrum(self.fname).flux,
+                              S.FlatSpectrum(1)(S.FileSpectrum(self.fname).wave))
+
+    def testreset(self):
+        S.FileSpectrum(self.fname)
+        Cache.reset_disk_cache()
+        self.assertEqual(os.listdir(Cache.DISK_CACHE_DIR), [])
+        sp = S.FileSpectrum(self.fname)
+        self.assertFalse(isinstance(sp._fluxtable, np.memmap))
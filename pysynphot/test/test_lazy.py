@@ -0,0 +1,78 @@
+from __future__ import division
+
+import threading
+
+import numpy as np
+
+from pysynphot import locations, spectrum, units
+
+
+def test_lazy_dict():
+    calls = []
+
+    def loader(d):
+        calls.append(1)
+        d['a'] = 1
+
+    d = locations._LazyDict(loader)
+    assert calls == []
+    assert 'a' in d
+    assert d['a'] == 1
+    assert sorted(d.keys()) == ['a']
+    assert calls == [1]
+
+
+def test_lazy_spectrum():
+    sp = spectrum._LazyFileSourceSpectrum(locations.VegaFile)
+    assert '_wavetable' not in sp.__dict__
+
+    ref = spectrum.FileSourceSpectrum(locations.VegaFile)
+    np.testing.assert_array_equal(sp.wave, ref.wave)
+    np.testing.assert_array_equal(sp.flux, ref.flux)
+    assert str(sp) == str(ref)
+
+
+def test_lazy_spectrum_convert():
+    sp = spectrum._LazyFileSourceSpectrum(locations.VegaFile)
+    sp.convert('flam')
+    assert sp.fluxunits.name == 'flam'
+
+
+def test_std_spectrum():
+    assert units.Flam.StdSpectrum.fluxunits.name == 'flam'
+    assert units.VegaMag.StdSpectrum is spectrum.Vega
+    assert not hasattr(units.nJy, 'StdSpectrum')
+
+
+def _concurrent(func, nthreads=8):
+    barrier = threading.Barrier(nthreads)
+    errors = []
+
+    def run():
+        barrier.wait()
+        try:
+            func()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for i in range(nthreads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_lazy_threads():
+    if not hasattr(threading, 'Barrier'):
+        return
+    for i in range(5):
+        sp = spectrum._LazyFileSourceSpectrum(locations.VegaFile)
+        assert _concurrent(lambda: sp.waveunits and sp.wave) == []
+
+        def loader(d):
+            for j in range(1000):
+                d[j] = j
+
+        d = locations._LazyDict(loader)
+        assert _concurrent(lambda: d[999]) == []
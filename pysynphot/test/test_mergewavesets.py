@@ -18,3 +18,31 @@ class TestMergeWaveSets(testutil.FPTestCase):
         self.assertTrue((delta > S.spectrum.MERGETHRESH).all(),
                         msg='Deltas should be < %g, min delta = %f' %
                             (S.spectrum.MERGETHRESH, delta.min()))
+
+
+class TestMergeManyWaveSets(testutil.FPTestCase):
+    def setUp(self):
+        self.w1 = S.BlackBody(20000).wave
+        self.w2 = S.Extinction(0.04, 'gal1').wave
+        self.w3 = S.Box(5500, 100).wave
+
+    def test_pairwise(self):
+        ref = S.spectrum.MergeWaveSets(
+            S.spectrum.MergeWaveSets(self.w1, self.w2), self.w3)
+        tst = S.spectrum.MergeWaveSets(self.w1, None, self.w2, self.w3)
+        self.assertEqualNumpy(tst, ref)
+
+    def test_none(self):
+        self.assertTrue(S.spectrum.MergeWaveSets(None, None, None) is None)
+        self.assertTrue(S.spectrum.MergeWaveSets(None, self.w3) is self.w3)
+
+    def test_thresh(self):
+        tst = S.spectrum.MergeWaveSets([1., 2., 3.], [2. + 1e-13, 3.], [4.])
+        self.assertEqualNumpy(tst, [1., 2. + 1e-13, 3., 4.])
+
+    def test_composite(self):
+        bp = S.Box(5500, 100) * S.Extinction(0.04, 'gal1')
+        sp = S.BlackBody(20000) * bp
+        tst = sp.GetWaveSet()
+        ref = S.spectrum.MergeWaveSets(self.w1, self.w2, self.w3)
+        self.assertEqualNumpy(tst, ref)
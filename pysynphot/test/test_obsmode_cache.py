@@ -0,0 +1,89 @@
+from __future__ import division, print_function
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from astropy.io import fits as pyfits
+
+from pysynphot import Cache, locations, observationmode, refs, tables
+
+GT_FILE = locations.irafconvert('mtab$n9i1408hm_tmg.fits')
+
+
+def _obsmode(obsmode):
+    return observationmode.BaseObservationMode(obsmode, graphtable=GT_FILE)
+
+
+class TestResolutionCache(unittest.TestCase):
+    def setUp(self):
+        Cache.reset_obsmode_cache()
+
+    def tearDown(self):
+        Cache.reset_obsmode_cache()
+
+    def testreuse(self):
+        a = _obsmode('acs,wfc1,fr388n#3900')
+        b = _obsmode('wfc1,acs,fr388n#4000')
+        self.assertTrue(a._resolved is b._resolved)
+        self.assertEqual(a.compnames, b.compnames)
+        self.assertEqual(b.pardict, {'fr388n': 4000.0})
+        self.assertEqual(a.binset, b.binset)
+        self.assertEqual(a.primary_area, b.primary_area)
+
+    def testcopy(self):
+        a = _obsmode('acs,hrc,f555w')
+        a.compnames.append('junk')
+        self.assertNotEqual(_obsmode('acs,hrc,f555w').compnames, a.compnames)
+
+    def testsamenode(self):
+        # Both filters are keywords at the same node, so the last
+        # one wins and the order is part of the key.
+        gt = tables.GraphTable(GT_FILE)
+        for modes in (['acs', 'wfc1', 'f555w', 'f814w'],
+                      ['acs', 'wfc1', 'f814w', 'f555w']):
+            ref, thref = gt.GetComponentsFromGT(modes, 1)
+            om = _obsmode(','.join(modes))
+            self.assertEqual(om.compnames, list(ref))
+            self.assertEqual(om.thcompnames, list(thref))
+
+    def testerror(self):
+        self.assertRaises(ValueError, _obsmode, 'acs,wfc1,f555w,mjd#55000')
+        self.assertEqual(len(Cache.OBSMODE_CACHE), 0)
+
+
+def test_setref_clears_obsmodes():
+    _obsmode('acs,hrc,f555w')
+    refs.setref()
+    assert len(Cache.OBSMODE_CACHE) == 0
+
+
+class TestFileNames(unittest.TestCase):
+    def setUp(self):
+        fd, self.fname = tempfile.mkstemp(suffix='_tmc.fits')
+        os.close(fd)
+        cols = [pyfits.Column(name='compname', format='20A',
+                              array=np.array(['acs_a', 'acs_b', 'acs_a'])),
+                pyfits.Column(name='filename', format='40A',
+                              array=np.array(['/data/a1.fits', '/data/b.fits',
+                                              '/data/a2.fits']))]
+        hdu = pyfits.BinTableHDU.from_columns(cols)
+        pyfits.HDUList([pyfits.PrimaryHDU(), hdu]).writeto(
+            self.fname, overwrite=True)
+        self.ct = tables.CompTable(self.fname)
+        Cache.reset_obsmode_cache()
+        self.om = _obsmode('acs,hrc,f555w')
+
+    def tearDown(self):
+        os.unlink(self.fname)
+        Cache.reset_obsmode_cache()
+
+    def testfirstmatch(self):
+        files = self.om._getFileNames(self.ct, ['acs_a', 'clear', 'acs_b'])
+        self.assertEqual(files, ['/data/a1.fits', 'clear', '/data/b.fits'])
+        self.assertEqual(len(self.om._resolved.filenames), 1)
+
+    def testmissing(self):
+        self.assertRaises(IndexError, self.om._getFileNames, self.ct,
+                          ['acs_c'])
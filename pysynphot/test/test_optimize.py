@@ -0,0 +1,63 @@
+from __future__ import division
+
+import numpy.testing as nptest
+import testutil
+
+import pysynphot as S
+from pysynphot.optimize import (optimize, OptimizedSourceSpectrum,
+                                OptimizedSpectralElement)
+
+
+class TestFolding(testutil.FPTestCase):
+    def setUp(self):
+        self.ext = S.Extinction(0.1, 'gal1')
+        self.band = S.Box(5500, 1000)
+        self.sp = S.BlackBody(5000) * 2 * 0.5 * self.ext * self.band
+        self.opt = optimize(self.sp)
+
+    def testtype(self):
+        self.assertTrue(isinstance(self.opt, OptimizedSourceSpectrum))
+
+    def testfold(self):
+        self.assertEqual(len(self.opt._root.terms), 1)
+        term = self.opt._root.terms[0]
+        self.assertEqual(term.coef, 1.0)
+        self.assertEqual(len(term.factors), 3)
+
+    def testvalues(self):
+        self.assertEqualNumpy(self.opt.wave, self.sp.wave)
+        nptest.assert_allclose(self.opt.flux, self.sp.flux, rtol=1e-12)
+
+    def testcse(self):
+        sp = self.sp + S.BlackBody(5000) * self.ext * self.band
+        opt = optimize(sp)
+        self.assertEqual(len(opt._root.terms), 1)
+        self.assertEqual(opt._root.terms[0].coef, 2.0)
+        self.assertEqual(len(opt.complist()), 3)
+        nptest.assert_allclose(opt.flux, sp.flux, rtol=1e-12)
+
+    def testsubtract(self):
+        sp = S.BlackBody(5000) - S.BlackBody(5000)
+        self.assertEqual(optimize(sp).flux.max(), 0)
+
+
+class TestBandpass(testutil.FPTestCase):
+    def setUp(self):
+        self.bp = S.Box(5500, 1000) * 0.5 * S.Box(5000, 1000)
+        self.opt = optimize(self.bp)
+
+    def testtype(self):
+        self.assertTrue(isinstance(self.opt, OptimizedSpectralElement))
+
+    def testvalues(self):
+        self.assertEqualNumpy(self.opt.wave, self.bp.wave)
+        self.assertEqualNumpy(self.opt.throughput, self.bp.throughput)
+
+
+class TestParser(testutil.FPTestCase):
+    def testparse(self):
+        expr = 'bb(5000)*ebmvx(0.1,gal1)*box(5500,1000)*2'
+        ref = S.parse_spec(expr)
+        opt = S.parse_spec(expr, optimize=True)
+        self.assertTrue(isinstance(opt, OptimizedSourceSpectrum))
+        nptest.assert_allclose(opt.flux, ref.flux, rtol=1e-12)
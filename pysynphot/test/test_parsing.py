@@ -36,3 +36,54 @@ class TestParsing(unittest.TestCase):
         #This should work with a warning
         sp = parser.parse_spec(self.partial_str)
         assert 'force_renorm' in sp.warnings
+
+def test_canonical_spec():
+    assert (parser.canonical_spec("rn( bb(5000) , box(5500,1) / 2 ,15, vegamag)")
+            == "rn(bb(5000),box(5500,1) / 2,15,vegamag)")
+
+def test_parse_spec_cached():
+    from pysynphot import Cache
+    Cache.reset_spectrum_cache()
+    sp1 = parser.parse_spec_cached("rn(bb(5000),box(5500,1),1e-14,flam)")
+    sp1.convert('fnu')
+    sp2 = parser.parse_spec_cached("rn(bb(5000), box(5500,1), 1e-14, flam)")
+    assert sp2.fluxunits.name == 'photlam'
+    assert Cache.SPECTRUM_CACHE.stats()['hits'] == 1
+    assert (sp2.flux == parser.parse_spec(
+        "rn(bb(5000),box(5500,1),1e-14,flam)").flux).all()
+
+def _dump(tree):
+    return (tree.type, getattr(tree, 'attr', None),
+            tuple(_dump(kid) for kid in tree))
+
+def test_descent_parser():
+    # Same trees as the SPARK parser, including associativity.
+    for s in ["rn(unit(1.0,flam),band(johnson,v),15,vegamag)",
+              "spec(earthshine.fits)*0.5+rn(spec(Zodi.fits),band(johnson,v),22.7,vegamag)",
+              "1+2-3*4 / 5",
+              "-bb(5000)*(box(5500,1)+ +3)",
+              "z(em(3000,10,1e-16,flam)+em(4000,10,1e-16,flam)+em(5000,10,1e-16,flam),0.1)",
+              "ebmvx(0.1,gal1)*icat(k93models,5000,0.0,4.0)",
+              "rn(unit(1.,flam),band(acs,wfc1,fr388n#3881.0),10.000000,abmag)",
+              "@filelist"]:
+        tokens = parser.scan(s)
+        assert _dump(parser.parse(tokens)) == _dump(parser.parse_spark(tokens)), s
+
+def test_descent_errors():
+    for s in ["rn(bb(5000)", "1 2", "f()", ")", "x,y", ""]:
+        try:
+            parser.parse(parser.scan(s))
+        except ValueError as e:
+            assert 'syntax error' in str(e)
+        else:
+            raise AssertionError(s)
+
+def test_ast_cache():
+    from pysynphot import Cache
+    Cache.reset_ast_cache()
+    a = parser.parse_text("bb(5000)*2")
+    a.value = 'junk'
+    b = parser.parse_text("bb(5000)*2")
+    assert a is not b and not hasattr(b, 'value')
+    assert _dump(a) == _dump(b)
+    assert Cache.AST_CACHE.stats()['hits'] == 1
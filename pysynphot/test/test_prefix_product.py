@@ -0,0 +1,106 @@
+from __future__ import division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import numpy.testing as nptest
+from astropy.io import fits as pyfits
+
+from pysynphot import Cache, obsbandpass, spectrum
+
+# Two filters behind the same optics, in front of the same detector.
+GRAPH = [('default', 1, 2, 'tst_ota'),
+         ('default', 2, 3, 'tst_mirror'),
+         ('f1', 3, 4, 'tst_f1'),
+         ('f2', 3, 4, 'tst_f2'),
+         ('default', 4, 5, 'tst_window'),
+         ('default', 5, 6, 'tst_ccd')]
+
+THRU = {'tst_ota': (3000, 9000, 0.9),
+        'tst_mirror': (3500, 8500, 0.8),
+        'tst_f1': (4000, 5000, 0.7),
+        'tst_f2': (6000, 7000, 0.6),
+        'tst_window': (3000, 9500, 0.95),
+        'tst_ccd': (2500, 10000, 0.5)}
+
+
+class TestPrefixProduct(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        compnames, filenames = [], []
+        for i, (name, (w1, w2, t)) in enumerate(sorted(THRU.items())):
+            wave = np.linspace(w1, w2, 500 + 7 * i)
+            thru = t * np.sin(np.pi * (wave - w1) / (w2 - w1))
+            fname = os.path.join(self.dir, name + '.dat')
+            np.savetxt(fname, np.column_stack((wave, thru)))
+            compnames.append(name)
+            filenames.append(fname)
+
+        self.comptable = os.path.join(self.dir, 'tst_tmc.fits')
+        self._writeTable(self.comptable, [
+            pyfits.Column(name='compname', format='20A', array=compnames),
+            pyfits.Column(name='filename', format='200A', array=filenames)])
+
+        self.graphtable = os.path.join(self.dir, 'tst_tmg.fits')
+        kw, inn, outn, comp = zip(*GRAPH)
+        self._writeTable(self.graphtable, [
+            pyfits.Column(name='keyword', format='20A', array=kw),
+            pyfits.Column(name='innode', format='J', array=inn),
+            pyfits.Column(name='outnode', format='J', array=outn),
+            pyfits.Column(name='compname', format='20A', array=comp),
+            pyfits.Column(name='thcompname', format='20A',
+                          array=['clear'] * len(GRAPH))])
+
+        self.prefixes = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        Cache.reset_obsmode_cache()
+
+    def _writeTable(self, fname, cols):
+        hdu = pyfits.BinTableHDU.from_columns(cols)
+        pyfits.HDUList([pyfits.PrimaryHDU(), hdu]).writeto(fname)
+
+    def _bandpass(self, obsmode):
+        return obsbandpass.ObsBandpass(
+            obsmode, graphtable=self.graphtable, comptable=self.comptable,
+            component_dict={}, prefix_dict=self.prefixes)
+
+    def _reference(self, bp):
+        chain = None
+        for c in bp.obsmode.components:
+            chain = c.throughput if chain is None else chain * c.throughput
+        return chain
+
+    def testvalues(self):
+        bp = self._bandpass('f1')
+        ref = self._reference(bp)
+        self.assertTrue(isinstance(bp.component1,
+                                   spectrum.TabularSpectralElement))
+        nptest.assert_array_equal(bp.wave, ref.wave)
+        # The tabulated products are interpolated linearly between
+        # points, where the exact product is quadratic.
+        nptest.assert_allclose(bp.throughput, ref.throughput,
+                               rtol=1e-3, atol=1e-3 * ref.throughput.max())
+        nptest.assert_allclose(bp.equivwidth(), ref.equivwidth(), rtol=1e-4)
+
+    def testshared(self):
+        self._bandpass('f1')
+        self.assertEqual(len(self.prefixes), 3)
+
+        # Only the filter and the window are multiplied in again.
+        self._bandpass('f2')
+        self.assertEqual(len(self.prefixes), 5)
+        keys = [k[-1][0] for k in self.prefixes]
+        self.assertEqual(sorted(os.path.basename(k) for k in keys),
+                         ['tst_f1.dat', 'tst_f2.dat', 'tst_mirror.dat',
+                          'tst_window.dat', 'tst_window.dat'])
+
+    def testreuse(self):
+        bp1 = self._bandpass('f1')
+        bp2 = self._bandpass('f1')
+        self.assertTrue(bp1.component1 is bp2.component1)
+        nptest.assert_array_equal(bp1.throughput, bp2.throughput)
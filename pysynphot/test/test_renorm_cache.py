@@ -0,0 +1,79 @@
+from __future__ import division
+
+import numpy as np
+import testutil
+
+from pysynphot import Cache, refs, renorm, spectrum, units
+
+
+class TestRenormCache(testutil.FPTestCase):
+    def setUp(self):
+        Cache.reset_renorm_cache()
+        self.band = spectrum.Box(5500, 100)
+        self.sp = spectrum.BlackBody(6000)
+
+    def tearDown(self):
+        Cache.reset_renorm_cache()
+
+    def teststd(self):
+        for name in ('flam', 'abmag', 'counts', 'vegamag'):
+            u = units.Units(name)
+            if u.isDensity:
+                ref = (u.StdSpectrum * self.band).integrate(analytic=False)
+            else:
+                ref = u.StdSpectrum.integrate(analytic=False)
+            self.assertEqual(renorm.StdIntegral(u, self.band), ref)
+            self.assertEqual(
+                renorm.StdIntegral(u, spectrum.Box(5500, 100)), ref)
+
+        # Counts and obmag do not depend on the band.
+        renorm.StdIntegral(units.Units('counts'), spectrum.Box(6000, 10))
+        self.assertEqual(Cache.RENORM_CACHE.misses, 3)
+        self.assertEqual(Cache.RENORM_CACHE.hits, 4)
+
+    def testwaveset(self):
+        u = units.Units('counts')
+        ref = renorm.StdIntegral(u, self.band)
+        try:
+            refs.set_default_waveset(minwave=1000, maxwave=20000, num=500)
+            self.assertNotEqual(renorm.StdIntegral(u, self.band),
+                                ref)
+        finally:
+            refs.set_default_waveset()
+        self.assertEqual(renorm.StdIntegral(u, self.band), ref)
+
+    def testoverlap(self):
+        wave = np.linspace(5455, 6000, 100)
+        sp = spectrum.ArraySourceSpectrum(wave=wave, flux=np.ones_like(wave))
+        ans = renorm.BandOverlap(sp, self.band)
+        self.assertEqual(ans, (self.band.check_overlap(sp),
+                               self.band.check_sig(sp)))
+        self.assertEqual(ans[0], 'partial')
+
+        # Only the wavelength range of the spectrum matters.
+        other = spectrum.ArraySourceSpectrum(wave=wave, flux=wave)
+        self.assertEqual(renorm.BandOverlap(other, self.band), ans)
+        self.assertEqual(Cache.RENORM_CACHE.hits, 1)
+
+        self.assertEqual(renorm.BandOverlap(self.sp, self.band),
+                         ('full', None))
+
+    def testrenorm(self):
+        for name, value in (('flam', 1e-15), ('abmag', 15), ('vegamag', 15)):
+            u = units.Units(name)
+            std = (u.StdSpectrum * self.band).integrate(analytic=False)
+            for i in range(2):
+                sp = self.sp.renorm(value, name, self.band)
+                ratio = (sp * self.band).integrate(analytic=False) / std
+                if u.isMag:
+                    self.assertApproxFP(-2.5 * np.log10(ratio), value)
+                else:
+                    self.assertApproxFP(ratio, value)
+
+    def testpartial(self):
+        wave = np.linspace(5450.3, 6000, 100)
+        sp = spectrum.ArraySourceSpectrum(wave=wave, flux=np.ones_like(wave))
+        for i in range(2):
+            sp.warnings = {}
+            sp.renorm(1, 'flam', self.band)
+            self.assertTrue(sp.warnings['PartialRenorm'])
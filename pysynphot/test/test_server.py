@@ -0,0 +1,200 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# The server needs Python 3.7; its module cannot even be parsed before.
+if sys.version_info < (3, 7):
+    raise unittest.SkipTest('pysynphot.server requires Python 3.7')
+
+import asyncio  # noqa: E402
+from pysynphot import server  # noqa: E402
+
+
+class TestParseRequest(unittest.TestCase):
+    def testrequest(self):
+        task, params = server.parse_request(
+            'SpecSourcerateSpec&spectrum="rn(unit(1.0,flam),band(johnson,v),'
+            '15,vegamag)"&instrument="wfc3,uvis1,g280"&area="45238.93416"\n')
+        self.assertEqual(task, 'specsourceratespec')
+        self.assertEqual(params, {
+            'spectrum': 'rn(unit(1.0,flam),band(johnson,v),15,vegamag)',
+            'instrument': 'wfc3,uvis1,g280',
+            'area': '45238.93416'})
+
+    def testnoparams(self):
+        self.assertEqual(server.parse_request('ping'), ('ping', {}))
+
+    def testbad(self):
+        self.assertRaises(ValueError, server.parse_request, '')
+        self.assertRaises(ValueError, server.parse_request,
+                          'calcphot&spectrum=bb(5000)')
+
+
+class TestOutputPath(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testpath(self):
+        self.assertEqual(server.output_path(self.dir, 'a/sp.fits'),
+                         os.path.join(os.path.realpath(self.dir),
+                                      'a', 'sp.fits'))
+
+    def testbad(self):
+        os.symlink('/tmp', os.path.join(self.dir, 'link'))
+        for name in ('', '/tmp/sp.fits', '../sp.fits', 'a/../../sp.fits',
+                     'link/sp.fits'):
+            self.assertRaises(ValueError, server.output_path, self.dir, name)
+        self.assertRaises(ValueError, server.output_path, None, 'sp.fits')
+
+
+def _slowThermback(params):
+    time.sleep(0.3)
+    return str(os.getpid())
+
+
+def _crash(params):
+    os._exit(1)
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _run(self, requests, timeout=30.0, workers=1, concurrent=(),
+             **kwargs):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        srv = server.ETCServer(workers=workers, timeout=timeout,
+                               output_dir=self.dir, **kwargs)
+
+        def send(r):
+            return loop.run_in_executor(
+                None, server.request, '127.0.0.1', srv.port, r, 30)
+
+        try:
+            loop.run_until_complete(srv.start())
+            replies = []
+            if concurrent:
+                replies.extend(loop.run_until_complete(asyncio.gather(
+                    *[send(r) for r in concurrent])))
+            for r in requests:
+                replies.append(loop.run_until_complete(send(r)))
+        finally:
+            loop.run_until_complete(srv.stop())
+            # E.g., the pool replacement or the stop after quit.
+            pending = asyncio.all_tasks(loop)
+            if pending:
+                loop.run_until_complete(asyncio.wait(pending))
+            asyncio.set_event_loop(None)
+            loop.close()
+        return replies
+
+    def testrequests(self):
+        replies = self._run([
+            'ping',
+            'calcspec&spectrum="rn(pl(4000.0,-1.0,flam),box(1500,1.0),'
+            '1.00E-14,flam)"&output="sp.fits"&area="45238.93416"',
+            'calcspec&spectrum="bogus(1)"&output="sp.fits"',
+            'nosuchtask',
+            'metrics'])
+
+        self.assertEqual(replies[0], 'pong')
+        self.assertTrue(replies[1].startswith('Power law'))
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'sp.fits')))
+        self.assertTrue(replies[2].startswith('Error: '))
+        self.assertEqual(replies[3], 'Error: Unknown task nosuchtask')
+
+        metrics = json.loads(replies[4])
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['errors'], 2)
+        self.assertEqual(metrics['workers'], 1)
+        self.assertEqual(metrics['restarts'], 0)
+        self.assertEqual(metrics['tasks']['calcspec']['count'], 2)
+        self.assertEqual(metrics['cache']['items'], 0)
+
+    def testoutput(self):
+        output = os.path.join(self.dir, 'sp.fits')
+        replies = self._run(
+            ['calcspec&spectrum="bb(5000)"&output="%s"' % output,
+             'calcspec&spectrum="bb(5000)"&output="../sp.fits"',
+             'showfiles&obsmode="acs,hrc"&output="../files.txt"',
+             'quit', 'ping'])
+        for reply in replies[:3]:
+            self.assertTrue(reply.startswith('Error: Invalid output file'))
+        self.assertFalse(os.path.exists(output))
+        self.assertEqual(replies[3],
+                         'Error: This server cannot be shut down by clients')
+        self.assertEqual(replies[4], 'pong')
+
+    def testquit(self):
+        self.assertEqual(self._run(['quit'], allow_quit=True), ['bye'])
+
+    def testtimeout(self):
+        replies = self._run(
+            ['calcspec&spectrum="bb(5000)*ebmvx(0.1,mwavg)"&output="sp.fits"',
+             'metrics'], timeout=1e-3)
+        self.assertTrue(replies[0].startswith('Error: Request timed out'))
+        metrics = json.loads(replies[1])
+        self.assertEqual(metrics['timeouts'], 1)
+        # The worker was replaced.
+        self.assertEqual(metrics['restarts'], 1)
+
+    def testbroken(self):
+        real = server.TASKS['showfiles']
+        server.TASKS['showfiles'] = _crash
+        try:
+            replies = self._run(
+                ['showfiles&obsmode="acs,hrc"',
+                 'calcspec&spectrum="bb(5000)"&output="sp.fits"', 'metrics'])
+        finally:
+            server.TASKS['showfiles'] = real
+
+        self.assertTrue(replies[0].startswith('Error: BrokenProcessPool'))
+        # The next request is served by a new pool.
+        self.assertFalse(replies[1].startswith('Error'))
+        self.assertEqual(json.loads(replies[2])['restarts'], 1)
+
+    def testcoalesce(self):
+        # The workers are forked with the slow task in place.
+        real = server.TASKS['thermback']
+        server.TASKS['thermback'] = _slowThermback
+        try:
+            replies = self._run(
+                ['thermback&obsmode="acs,hrc"&area="1"', 'metrics'],
+                workers=2,
+                concurrent=['thermback&obsmode="acs,hrc"',
+                            'thermback&obsmode="ACS,HRC" ',
+                            'thermback&obsmode="acs,hrc"'])
+        finally:
+            server.TASKS['thermback'] = real
+
+        # All the requests got the reply of one worker.
+        self.assertEqual(len(set(replies[:4])), 1)
+        cache = json.loads(replies[4])['cache']
+        self.assertEqual(cache['coalesced'], 2)
+        self.assertEqual(cache['hits'], 1)
+        self.assertEqual(cache['items'], 1)
+        self.assertTrue(cache['saved'] > 0.2)
+
+    def testcachekey(self):
+        key = server.cache_key(
+            'calcphot', {'obsmode': ' ACS,HRC,F555W',
+                         'spectrum': 'rn(bb(5000), band(johnson,v), 15, '
+                                     'vegamag)'})
+        self.assertEqual(
+            key, 'calcphot\nacs,hrc,f555w\n'
+            'rn(bb(5000),band(johnson,v),15,vegamag)')
+        self.assertEqual(server.cache_key('thermback', {'instrument': 'x'}),
+                         'thermback\nx')
@@ -0,0 +1,101 @@
+from __future__ import division
+
+# Calculations in explicit units must leave the user units of shared
+# spectra, bandpasses and observations alone.
+
+import threading
+import unittest
+
+import numpy as np
+import numpy.testing as nptest
+
+import pysynphot as S
+
+
+class TestNoMutation(unittest.TestCase):
+    def setUp(self):
+        self.bp = S.Box(5500, 1000)
+        self.bp.convert('nm')
+        self.sp = S.BlackBody(5000)
+        self.sp.convert('fnu')
+        self.obs = S.Observation(S.BlackBody(5000), S.Box(5500, 1000),
+                                 binset=np.arange(4900, 6100, 10.0))
+        self.obs.convert('abmag')
+
+    def _checkUnits(self):
+        self.assertEqual(self.bp.waveunits.name, 'nm')
+        self.assertEqual(self.sp.fluxunits.name, 'fnu')
+        self.assertEqual(self.obs.fluxunits.name, 'abmag')
+
+    def testgetarrays(self):
+        wave, flux = self.sp.getArrays('nm', 'flam')
+        self._checkUnits()
+        ref = S.BlackBody(5000)
+        ref.convert('nm')
+        ref.convert('flam')
+        nptest.assert_array_equal(wave, ref.wave)
+        nptest.assert_array_equal(flux, ref.flux)
+
+        wave, thru = self.bp.getArrays('angstrom')
+        nptest.assert_array_equal(wave, S.Box(5500, 1000).wave)
+        nptest.assert_array_equal(thru, self.bp.throughput)
+
+    def testspectrum(self):
+        self.assertEqual(self.sp.integrate(),
+                         S.BlackBody(5000).integrate())
+        z = self.sp.redshift(0.1)
+        self.assertEqual(z.fluxunits.name, 'photlam')
+        self._checkUnits()
+
+    def testbandpar(self):
+        ref = S.Box(5500, 1000)
+        for name in ('avgwave', 'rmswidth', 'photbw', 'rectwidth',
+                     'efficiency'):
+            self.assertEqual(getattr(self.bp, name)(),
+                             getattr(ref, name)(), name)
+        self._checkUnits()
+
+    def testobservation(self):
+        ref = S.Observation(S.BlackBody(5000), S.Box(5500, 1000),
+                            binset=np.arange(4900, 6100, 10.0))
+        self.assertEqual(self.obs.countrate(), ref.countrate())
+        self.assertEqual(self.obs.countrate(binned=False),
+                         ref.countrate(binned=False))
+        for unit in ('flam', 'abmag', 'counts', 'obmag'):
+            self.assertEqual(self.obs.effstim(unit), ref.effstim(unit))
+        self.assertEqual(self.obs.efflam(), ref.efflam())
+        self.assertEqual(self.obs.efflam(binned=False),
+                         ref.efflam(binned=False))
+        self.assertEqual(self.obs.sample(5500), ref.sample(5500))
+        self.assertEqual(self.obs.sample(5500, binned=False),
+                         ref.sample(5500, binned=False))
+        self._checkUnits()
+
+        binwave, binflux = self.obs.getBinArrays()
+        nptest.assert_array_equal(binflux, self.obs.binflux)
+
+
+def test_shared_observation_threads():
+    obs = S.Observation(S.BlackBody(5000), S.Box(5500, 1000))
+    units = ['flam', 'abmag', 'counts', 'obmag', 'vegamag', 'fnu']
+    expected = dict((u, obs.effstim(u)) for u in units)
+    expected['countrate'] = obs.countrate()
+
+    errors = []
+
+    def work(unit):
+        try:
+            for i in range(20):
+                assert obs.effstim(unit) == expected[unit]
+                assert obs.countrate() == expected['countrate']
+                obs.convert(unit)
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(u,)) for u in units]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
@@ -9,6 +9,7 @@ from __future__ import absolute_import, division
 import math
 import numpy as N
 from . import binning
+from . import Cache
 from . import refs  # needed for PRIMARY_AREA
 
 # cannot just import the constant because it won't get updated
@@ -212,6 +213,27 @@ class WaveUnits(BaseUnit):
         raise NotImplementedError("Required method ToAngstrom not yet implemented")
 
 
+class _LazyStdSpectrum(object):
+    """Descriptor that defines the ``StdSpectrum`` attributes of all flux
+    units with :func:`~pysynphot.renorm.DefineStdSpectraForUnits`
+    the first time one of them is looked up, instead of on import.
+
+    """
+    defined = False
+
+    def __get__(self, obj, cls):
+        if not self.defined:
+            from . import renorm
+            renorm.DefineStdSpectraForUnits()
+            self.defined = True
+
+        for klass in cls.__mro__:
+            value = klass.__dict__.get('StdSpectrum', self)
+            if value is not self:
+                return value
+        raise AttributeError("'%s' has no StdSpectrum" % cls.__name__)
+
+
 class FluxUnits(BaseUnit):
     """Base unit for :ref:`flux <pysynphot-flux-units>`.
 
@@ -225,7 +247,8 @@ class FluxUnits(BaseUnit):
         To support source spectrum :ref:`renormalization <pysynphot-renorm>`
         without introducing circular import, all supported flux units
         must have their ``StdSpectrum`` attributes defined separately
-        in :func:`~pysynphot.renorm.DefineStdSpectraForUnits`.
+        in :func:`~pysynphot.renorm.DefineStdSpectraForUnits`. This is
+        done the first time any ``StdSpectrum`` is used.
 
     Attributes
     ----------
@@ -261,6 +284,8 @@ class FluxUnits(BaseUnit):
         # because of a circular import problem. If you add a new fluxunit
         # in this file, you must define its StdSpectrum in renorm.py.
 
+    StdSpectrum = _LazyStdSpectrum()
+
     def Convert(self, wave, flux, target_units, area=None):
         """Perform unit conversion.
 
@@ -585,13 +610,15 @@ class Photlam(FluxUnits):
                          'counts': self.ToCounts}
         self.nativewave = Angstrom
 
-    def unitResponse(self, band):
+    def unitResponse(self, band, analytic=False):
         """Put a flat spectrum of 1 photlam through this band and integrate.
         This is used internally for :ref:`pysynphot-formula-effstim`
-        calculations."""
+        calculations. With ``analytic``, piecewise-constant bands are
+        integrated in closed form (see
+        :meth:`~pysynphot.spectrum.SpectralElement.sumfilt`)."""
         #sumfilt(wave,0,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        total = band.trapezoidIntegration(band.wave, band.throughput)
+        total = band.sumfilt(0, analytic)
         return 1.0/total
 
     def ToFlam(self, wave, flux, **kwargs):
@@ -892,7 +919,8 @@ class Photlam(FluxUnits):
 
         where :math:`f_{\\textnormal{Vega}}` is the flux of
         :ref:`pysynphot-vega-spec` resampled at given wavelength values
-        and converted to ``photlam``.
+        and converted to ``photlam``. The resampled flux is kept in
+        ``pysynphot.Cache.VEGA_CACHE``.
 
         Parameters
         ----------
@@ -909,8 +937,8 @@ class Photlam(FluxUnits):
 
         """
         from . import spectrum
-        resampled = spectrum.Vega.resample(wave)
-        normalized = flux / resampled._fluxtable
+        vegaflux = Cache.VEGA_CACHE.flux(spectrum.Vega, wave)
+        normalized = flux / vegaflux
         return -2.5 * N.log10(normalized)
 
     def ToCounts(self, wave, flux, area=None):
@@ -1253,13 +1281,12 @@ class Flam(FluxUnits):
         """
         return flux * wave / HC
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sumfilt(wave,1,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput*wave)
+        total = band.sumfilt(1, analytic)
         modtot = total / (H*C)
         return 1.0/modtot
 
@@ -1319,13 +1346,12 @@ class Photnu(FluxUnits):
         """
         return C * flux / (wave * wave)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sumfilt(wave,-2,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput/(wave*wave))
+        total = band.sumfilt(-2, analytic)
         modtot = total/C
         return 1.0/modtot
 
@@ -1385,13 +1411,12 @@ class Fnu(FluxUnits):
         """
         return flux /wave / H
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sumfilt(wave,-1,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput/wave)
+        total = band.sumfilt(-1, analytic)
         modtot = total/H
         return 1.0/modtot
 
@@ -1451,13 +1476,12 @@ class Jy(FluxUnits):
         """
         return flux / wave * (1.0e-23 / H)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sumfilt(wave,-1,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput/wave)
+        total = band.sumfilt(-1, analytic)
         modtot = total * (1.0e-23/H)
         return 1.0/modtot
 
@@ -1517,13 +1541,12 @@ class mJy(FluxUnits):
         """
         return flux / wave * (1.0e-26 / H)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sumfilt(wave,-1,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput/wave)
+        total = band.sumfilt(-1, analytic)
         modtot = total * (1.0e-26/H)
         return 1.0/modtot
 
@@ -1583,11 +1606,10 @@ class muJy(FluxUnits):	# New
         """
         return flux / wave * (1.0e-29 / H)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput/wave)
+        total = band.sumfilt(-1, analytic)
         modtot = total * (1.0e-29/H)
         return 1.0/modtot
 
@@ -1647,11 +1669,10 @@ class nJy(FluxUnits):  # New
         """
         return flux / wave * (1.0e-32 / H)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput/wave)
+        total = band.sumfilt(-1, analytic)
         modtot = total * (1.0e-32/H)
         return 1.0/modtot
 
@@ -1714,13 +1735,12 @@ class ABMag(LogFluxUnits):
         """
         return 1.0 / (H * wave) * 10.0**(-0.4 * (flux - ABZERO))
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sumfilt(wave,-1,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput/wave)
+        total = band.sumfilt(-1, analytic)
         modtot = total/H
         return 2.5*math.log10(modtot) + ABZERO
 
@@ -1784,13 +1804,12 @@ class STMag(LogFluxUnits):
         """
         return wave / H / C * 10.0**(-0.4 * (flux - STZERO))
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sumfilt(wave,1,band)
         # SUMFILT = Sum [ FILT(I) * WAVE(I) ** NPOW * DWAVE(I) ]
-        wave=band.wave
-        total = band.trapezoidIntegration(wave,band.throughput*wave)
+        total = band.sumfilt(1, analytic)
         modtot = total/(H*C)
         return 2.5*math.log10(modtot) + STZERO
 
@@ -1863,7 +1882,7 @@ class OBMag(LogFluxUnits):
 
         return 10.0**(-0.4 * flux) / (bin_widths * area)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sum = asumr(band,nwave)
@@ -1911,7 +1930,8 @@ class VegaMag(LogFluxUnits):
 
         where :math:`f_{\\textnormal{Vega}}` is the flux of
         :ref:`pysynphot-vega-spec` resampled at given wavelength values
-        and converted to ``photlam``.
+        and converted to ``photlam``. The resampled flux is kept in
+        ``pysynphot.Cache.VEGA_CACHE``.
 
         Parameters
         ----------
@@ -1927,14 +1947,14 @@ class VegaMag(LogFluxUnits):
             Converted values.
 
         """
-        resampled = self.vegaspec.resample(wave)
-        return resampled.flux * 10.0**(-0.4 * flux)
+        vegaflux = Cache.VEGA_CACHE.flux(self.vegaspec, wave,
+                                         self.vegaspec.fluxunits.name)
+        return vegaflux * 10.0**(-0.4 * flux)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
-        sp=band*self.vegaspec
-        total=sp.integrate()
+        total = Cache.VEGA_CACHE.integral(self.vegaspec, band)
         return 2.5*math.log10(total)
 
 
@@ -1998,7 +2018,7 @@ class Counts(FluxUnits):
 
         return flux / (bin_widths * area)
 
-    def unitResponse(self,band):
+    def unitResponse(self, band, analytic=False):
         """This is used internally for :ref:`pysynphot-formula-effstim`
         calculations."""
         #sum = asumr(band,nwave)
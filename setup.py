@@ -1,8 +1,6 @@
 #!/usr/bin/env python
 import sys
-from glob import glob
-from numpy import get_include as np_include
-from setuptools import setup, Extension
+from setuptools import setup
 
 # Use submodule
 sys.path.insert(1, 'relic')
@@ -48,12 +46,6 @@ setup(
                                      'data/cdbs/jref/*', 'data/cdbs/mtab/*'],
                   'pysynphot.test.from_commissioning': ['data/*'],
                   'pysynphot.test.from_commissioning.stis': ['*ref.fits']},
-    ext_modules=[
-        Extension('pysynphot.pysynphot_utils',
-                  glob('pysynphot/src/*.c'),
-                  include_dirs=[np_include()],
-                  optional=True)
-    ],
     use_2to3=False,
     zip_safe=False
 )